@@ -0,0 +1,253 @@
+"""End-to-end latency and throughput of gramregex against the local fake endpoint.
+
+Scenarios (select with ``--scenario``, repeatable):
+
+- ``sdk``: the bare OpenAI SDK call, as a baseline for gramregex overhead
+- ``generate``: sequential ``api.generate`` calls
+- ``prepared``: sequential calls of an ``api.prepare`` generator
+- ``stream``: sequential ``api.generate_stream`` calls (time to first delta and total)
+- ``batch``: ``api.generate_many`` with ``--concurrency`` requests in flight
+- ``async``: ``api.agenerate_many`` with ``--concurrency`` requests in flight
+- ``cli``: one ``gramregex`` process per request (cold start included)
+
+Usage::
+
+    python benchmarks/bench_generate.py --requests 200 --latency 0.02 --error-rate 0.05
+    python benchmarks/bench_generate.py --scenario generate --scenario sdk --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fake_responses import FakeConfig, FakeResponsesServer
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+from gramregex import api  # noqa: E402
+from gramregex.settings import Settings  # noqa: E402
+
+GRAMMAR = "start: /x+/\n"
+SCENARIOS = ("sdk", "generate", "prepared", "stream", "batch", "async", "cli")
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of ``samples`` (``fraction`` in 0..1)."""
+    if not samples:
+        return math.nan
+    ordered = sorted(samples)
+    rank = max(math.ceil(fraction * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+@dataclass(slots=True)
+class Result:
+    """Measurements of one scenario."""
+
+    scenario: str
+    requests: int
+    errors: int
+    seconds: float
+    latencies_ms: list[float] = field(default_factory=list)
+    first_delta_ms: list[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Return completed requests per second."""
+        return self.requests / self.seconds if self.seconds else math.nan
+
+    def summary(self) -> dict[str, object]:
+        """Return the percentiles and throughput as a flat mapping."""
+        summary: dict[str, object] = {
+            "scenario": self.scenario,
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput_rps": round(self.throughput, 2),
+        }
+        for name, samples in (("latency", self.latencies_ms), ("first_delta", self.first_delta_ms)):
+            if samples:
+                for label, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                    summary[f"{name}_{label}_ms"] = round(percentile(samples, fraction), 3)
+        return summary
+
+
+def _timed_loop(scenario: str, count: int, call: Callable[[], object]) -> Result:
+    result = Result(scenario, count, 0, 0.0)
+    started = time.perf_counter()
+    for _ in range(count):
+        begin = time.perf_counter()
+        try:
+            call()
+        except Exception:  # failures are counted, not fatal
+            result.errors += 1
+        result.latencies_ms.append((time.perf_counter() - begin) * 1000)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def bench_sdk(settings: Settings, count: int) -> Result:
+    """Call the OpenAI SDK directly with the request gramregex would send."""
+    from openai import OpenAI
+
+    from gramregex.llm.openai_client import _build_response_kwargs
+
+    client = OpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url, max_retries=0)
+    kwargs = _build_response_kwargs(
+        settings.openai_model,
+        "prompt",
+        grammar=GRAMMAR,
+        grammar_syntax="lark",
+        verbosity=None,
+        reasoning_effort=None,
+    )
+    try:
+        return _timed_loop("sdk", count, lambda: client.responses.create(**kwargs).output_text)
+    finally:
+        client.close()
+
+
+def bench_generate(settings: Settings, grammar_file: Path, count: int) -> Result:
+    """Call ``api.generate`` sequentially, including grammar loading from a file."""
+    return _timed_loop("generate", count, lambda: api.generate("prompt", grammar_file=grammar_file, settings=settings))
+
+
+def bench_prepared(settings: Settings, grammar_file: Path, count: int) -> Result:
+    """Call a generator from ``api.prepare`` sequentially, resolving options once."""
+    prepared = api.prepare(grammar_file=grammar_file, settings=settings)
+    return _timed_loop("prepared", count, lambda: prepared("prompt"))
+
+
+def bench_stream(settings: Settings, grammar_file: Path, count: int) -> Result:
+    """Consume ``api.generate_stream`` sequentially, recording the time to the first delta."""
+    result = Result("stream", count, 0, 0.0)
+    started = time.perf_counter()
+    for _ in range(count):
+        begin = time.perf_counter()
+        try:
+            for index, _delta in enumerate(api.generate_stream("prompt", grammar_file=grammar_file, settings=settings)):
+                if index == 0:
+                    result.first_delta_ms.append((time.perf_counter() - begin) * 1000)
+        except Exception:  # failures are counted, not fatal
+            result.errors += 1
+        result.latencies_ms.append((time.perf_counter() - begin) * 1000)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def bench_batch(settings: Settings, grammar_file: Path, count: int, concurrency: int) -> Result:
+    """Run ``api.generate_many`` over ``count`` prompts."""
+    started = time.perf_counter()
+    items = api.generate_many(
+        [f"prompt {index}" for index in range(count)],
+        grammar_file=grammar_file,
+        settings=settings,
+        max_in_flight=concurrency,
+    )
+    seconds = time.perf_counter() - started
+    return Result("batch", count, sum(not item.ok for item in items), seconds)
+
+
+def bench_async(settings: Settings, grammar_file: Path, count: int, concurrency: int) -> Result:
+    """Run ``api.agenerate_many`` over ``count`` prompts."""
+
+    async def run() -> Result:
+        # Async clients are pooled per event loop, so warm this loop's client first.
+        await api.agenerate("warm-up", grammar_file=grammar_file, settings=settings)
+        started = time.perf_counter()
+        items = await api.agenerate_many(
+            [f"prompt {index}" for index in range(count)],
+            grammar_file=grammar_file,
+            settings=settings,
+            max_in_flight=concurrency,
+        )
+        return Result("async", count, sum(not item.ok for item in items), time.perf_counter() - started)
+
+    return asyncio.run(run())
+
+
+def bench_cli(settings: Settings, grammar_file: Path, count: int) -> Result:
+    """Spawn the CLI once per request, as shell loops do."""
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(SRC),
+        "OPENAI_API_KEY": settings.openai_api_key,
+        "OPENAI_BASE_URL": settings.openai_base_url or "",
+        "GRAMREGEX_RETRY_BASE_DELAY": str(settings.retry_base_delay),
+    }
+    command = [
+        sys.executable,
+        "-m",
+        "gramregex.cli",
+        "generate",
+        "--no-daemon",
+        "--grammar-file",
+        str(grammar_file),
+        "p",
+    ]
+    return _timed_loop("cli", count, lambda: subprocess.run(command, check=True, capture_output=True, env=env))
+
+
+def main() -> int:
+    """Run the selected scenarios and print a summary table."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="scenario to run (default: all)")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--cli-requests", type=int, default=10, help="requests for the cli scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="in-flight requests for batch/async")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="fake server random extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of fake server failures (retried)")
+    parser.add_argument("--payload-size", type=int, default=32, help="characters of output text")
+    parser.add_argument("--json", type=Path, default=None, help="write the summaries to this file")
+    options = parser.parse_args()
+
+    config = FakeConfig(
+        latency=options.latency,
+        jitter=options.jitter,
+        error_rate=options.error_rate,
+        payload_size=options.payload_size,
+    )
+    scenarios = options.scenario or list(SCENARIOS)
+    summaries: list[dict[str, object]] = []
+    with FakeResponsesServer(config) as server, tempfile.TemporaryDirectory() as directory:
+        grammar_file = Path(directory) / "grammar.lark"
+        grammar_file.write_text(GRAMMAR, encoding="utf-8")
+        # Short backoff so simulated failures measure retry overhead rather than sleep time.
+        settings = Settings(openai_api_key="bench", openai_base_url=server.base_url, retry_base_delay=0.01)
+
+        runners: dict[str, Callable[[], Result]] = {
+            "sdk": lambda: bench_sdk(settings, options.requests),
+            "generate": lambda: bench_generate(settings, grammar_file, options.requests),
+            "prepared": lambda: bench_prepared(settings, grammar_file, options.requests),
+            "stream": lambda: bench_stream(settings, grammar_file, options.requests),
+            "batch": lambda: bench_batch(settings, grammar_file, options.requests, options.concurrency),
+            "async": lambda: bench_async(settings, grammar_file, options.requests, options.concurrency),
+            "cli": lambda: bench_cli(settings, grammar_file, options.cli_requests),
+        }
+        # Warm up the pooled client and grammar cache so the first scenario is not penalised.
+        api.generate("warm-up", grammar_file=grammar_file, settings=settings)
+        summaries.extend(runners[scenario]().summary() for scenario in scenarios)
+
+    for summary in summaries:
+        print(json.dumps(summary))
+    medians = {summary["scenario"]: summary.get("latency_p50_ms") for summary in summaries}
+    if isinstance(medians.get("generate"), float) and isinstance(medians.get("sdk"), float):
+        overhead = medians["generate"] - medians["sdk"]
+        print(f"gramregex overhead per call (p50 generate - p50 sdk): {overhead:.3f} ms")
+    if options.json is not None:
+        options.json.write_text(json.dumps(summaries, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
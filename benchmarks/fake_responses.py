@@ -0,0 +1,203 @@
+"""Local stand-in for the OpenAI Responses API used by the benchmarks.
+
+The server answers ``POST /v1/responses`` with a canned output of a
+configurable size, after a configurable latency, and fails a configurable
+fraction of requests with a retryable status. ``stream: true`` requests get
+a server-sent event stream split into several deltas. Connections are kept
+alive (HTTP/1.1) so client-side connection pooling is measured as well.
+
+Run standalone to point a real CLI at it::
+
+    python benchmarks/fake_responses.py --port 8765 --latency 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=x gramregex --grammar "root ::= 'ok'" hi
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import TracebackType
+from typing import Self
+
+
+@dataclass(frozen=True, slots=True)
+class FakeConfig:
+    """Behaviour of the fake endpoint."""
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    payload_size: int = 32
+    stream_chunks: int = 8
+
+
+def _response_body(model: str, text: str, input_tokens: int) -> dict[str, object]:
+    output_tokens = max(len(text) // 4, 1)
+    return {
+        "id": "resp_fake",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": model,
+        "output": [
+            {
+                "type": "message",
+                "id": "msg_fake",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            },
+        ],
+        "parallel_tool_calls": False,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens_details": {"reasoning_tokens": 0},
+        },
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY delayed ACKs add ~40 ms per call.
+    disable_nagle_algorithm = True
+    server: "FakeResponsesServer"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002 - stdlib signature
+        """Silence per-request logging."""
+
+    def _send_json(self, status: int, body: object, headers: dict[str, str] | None = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        """Answer a Responses API call."""
+        length = int(self.headers.get("Content-Length", "0"))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        config = self.server.config
+        self.server.record_request()
+
+        delay = config.latency + random.uniform(0, config.jitter)  # noqa: S311 - simulated latency
+        if delay > 0:
+            time.sleep(delay)
+
+        if random.random() < config.error_rate:  # noqa: S311 - simulated failures
+            self._send_json(
+                config.error_status,
+                {"error": {"message": "simulated failure", "type": "server_error", "code": None}},
+                {"retry-after-ms": "0"},
+            )
+            return
+
+        text = "x" * config.payload_size
+        input_tokens = max(len(json.dumps(request.get("input", ""))) // 4, 1)
+        body = _response_body(str(request.get("model", "fake")), text, input_tokens)
+        if request.get("stream"):
+            self._send_stream(text, body)
+        else:
+            self._send_json(200, body)
+
+    def _send_stream(self, text: str, body: dict[str, object]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        size = max(len(text) // max(self.server.config.stream_chunks, 1), 1)
+        events: list[dict[str, object]] = [
+            {"type": "response.output_text.delta", "delta": text[start : start + size], "output_index": 0}
+            for start in range(0, len(text), size)
+        ]
+        events.append({"type": "response.completed", "response": body})
+        for event in events:
+            frame = f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+            self.wfile.write(f"{len(frame):x}\r\n".encode() + frame + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class FakeResponsesServer(ThreadingHTTPServer):
+    """Threaded fake Responses API server; use as a context manager to run it in the background."""
+
+    daemon_threads = True
+
+    def __init__(self, config: FakeConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Bind to ``host:port`` (an ephemeral port by default)."""
+        super().__init__((host, port), _Handler)
+        self.config = config or FakeConfig()
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        """Return the ``OPENAI_BASE_URL`` pointing at this server."""
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/v1"
+
+    def record_request(self) -> None:
+        """Count a received request."""
+        with self._lock:
+            self.requests += 1
+
+    def __enter__(self) -> Self:
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop the background thread and close the socket."""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main() -> None:
+    """Run the fake endpoint in the foreground."""
+    parser = argparse.ArgumentParser(description="Fake OpenAI Responses API endpoint")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--payload-size", type=int, default=32, help="characters of output text")
+    options = parser.parse_args()
+
+    config = FakeConfig(
+        latency=options.latency,
+        jitter=options.jitter,
+        error_rate=options.error_rate,
+        payload_size=options.payload_size,
+    )
+    server = FakeResponsesServer(config, port=options.port)
+    print(f"fake Responses API on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
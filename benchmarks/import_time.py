@@ -0,0 +1,93 @@
+"""Measure the cold-start cost of importing gramregex and running the CLI.
+
+Each target is run in a fresh interpreter several times and the median wall
+time is reported. With ``--max-ms`` the script exits non-zero when a median
+exceeds the budget, so it can guard against import-time regressions in CI.
+
+Usage::
+
+    python benchmarks/import_time.py --runs 10 --max-ms 250
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+TARGETS: dict[str, list[str]] = {
+    "import gramregex": ["-c", "import gramregex"],
+    "import gramregex.grammar": ["-c", "import gramregex.grammar"],
+    "import gramregex.cli": ["-c", "import gramregex.cli"],
+    "import gramregex.api": ["-c", "import gramregex.api"],
+    "gramregex --help": ["-m", "gramregex.cli", "--help"],
+}
+
+# Modules that must not be imported by the light entry points.
+HEAVY_MODULES = ("openai", "pydantic_settings", "yaml")
+LIGHT_TARGETS = ("gramregex", "gramregex.cli", "gramregex.grammar")
+
+
+def _environment() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure(args: list[str], runs: int) -> list[float]:
+    """Return wall times in milliseconds for ``runs`` fresh interpreters."""
+    env = _environment()
+    timings: list[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], check=True, capture_output=True, env=env)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def heavy_modules_loaded(module: str) -> list[str]:
+    """Return the heavy modules that importing ``module`` pulls in."""
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=_environment(),
+    )
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+def main() -> int:
+    """Run the benchmark and report medians."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="fresh interpreters per target")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail when the CLI import median exceeds this")
+    options = parser.parse_args()
+
+    baseline = statistics.median(measure(["-c", "pass"], options.runs))
+    print(f"{'python -c pass':<28} {baseline:8.1f} ms")
+    medians: dict[str, float] = {}
+    for name, args in TARGETS.items():
+        medians[name] = statistics.median(measure(args, options.runs))
+        print(f"{name:<28} {medians[name]:8.1f} ms  (+{medians[name] - baseline:.1f} ms)")
+
+    failed = False
+    for module in LIGHT_TARGETS:
+        loaded = heavy_modules_loaded(module)
+        if loaded:
+            print(f"import {module} loads heavy modules: {', '.join(loaded)}")
+            failed = True
+
+    if options.max_ms is not None and medians["import gramregex.cli"] > options.max_ms:
+        print(f"import gramregex.cli exceeded the {options.max_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
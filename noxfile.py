@@ -101,6 +101,20 @@ def test(session: Session) -> None:
     session.run("pytest", "--cov=src", f"--cov-fail-under={COVER_MIN}")
 
 
+@nox.session(python=["3.13"], tags=["bench"])
+def import_time(session: Session) -> None:
+    """Benchmark package import and CLI start-up time."""
+    session.install("-c", constraints(session).as_posix(), ".")
+    session.run("python", "benchmarks/import_time.py", *session.posargs)
+
+
+@nox.session(python=["3.13"], tags=["bench"])
+def bench(session: Session) -> None:
+    """Benchmark latency and throughput against a local fake Responses endpoint."""
+    session.install("-c", constraints(session).as_posix(), ".")
+    session.run("python", "benchmarks/bench_generate.py", *session.posargs)
+
+
 @nox.session(python=["3.13"], tags=["ci"])
 def ci(session: Session) -> None:
     """Run all CI checks: lint, format, typing, test, security."""
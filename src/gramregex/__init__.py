@@ -1,6 +1,36 @@
 """gramregex package exposes CLI utilities for grammar-constrained LLM calls."""
 
-from gramregex.api import generate
-from gramregex.cli import app
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["app", "generate"]
+if TYPE_CHECKING:
+    from gramregex.api import agenerate, generate, generate_many
+    from gramregex.cli import app
+
+# Resolved on first access so that importing the package (or a light submodule
+# such as ``gramregex.grammar``) does not pay for the OpenAI SDK, Typer or Pydantic.
+_LAZY_ATTRIBUTES = {
+    "agenerate": "gramregex.api",
+    "app": "gramregex.cli",
+    "generate": "gramregex.api",
+    "generate_many": "gramregex.api",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import the module providing ``name`` on first access."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List lazy attributes alongside the loaded ones."""
+    return sorted({*globals(), *__all__})
+
+
+__all__ = ["agenerate", "app", "generate", "generate_many"]
@@ -1,12 +1,323 @@
-"""Public Python API for grammar-constrained generation."""
+"""Public Python API for grammar-constrained generation.
 
+Only the core of a call is imported with this module. The settings model,
+the OpenAI client and the optional layers (response cache, request
+coalescing, routing, packing, Batch API jobs) are imported by the first call
+that needs them, so importing the API stays cheap for tools that may not
+generate anything.
+"""
+
+import time
+from collections.abc import AsyncIterator, Callable, Iterable, Iterator, Mapping
+from functools import partial
+from importlib import import_module
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from gramregex.batch import DEFAULT_MAX_IN_FLIGHT, BatchItem, agather_bounded, iter_bounded, iter_packed
+from gramregex.grammar import get_grammar_registry, load_grammar
+from gramregex.instrumentation import (
+    STAGE_CLIENT_ACQUIRE,
+    STAGE_GRAMMAR_LOAD,
+    instrumented_async_client,
+    instrumented_client,
+)
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+from gramregex.validator import GrammarValidationError
+
+if TYPE_CHECKING:
+    from gramregex.cache import ResponseCache
+    from gramregex.config import load_grammar_config
+    from gramregex.llm.openai_client import PreparedTemplate
+    from gramregex.routing import OutputCheck, OutputCheckError, RouteTier
+    from gramregex.settings import Settings, get_settings
+    from gramregex.validator import ValidatorCompiler
+
+# Re-exported names resolved on first access, like the package's lazy attributes.
+_LAZY_ATTRIBUTES = {
+    "OutputCheckError": "gramregex.routing",
+    "ResponseCache": "gramregex.cache",
+    "RouteTier": "gramregex.routing",
+    "Settings": "gramregex.settings",
+    "get_settings": "gramregex.settings",
+    "load_grammar_config": "gramregex.config",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import the module providing ``name`` on first access."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def get_llm_client(settings: "Settings") -> LLMClient:
+    """Return the pooled LLM client for ``settings`` (see ``gramregex.llm.factory``)."""
+    from gramregex.llm.factory import get_llm_client as pooled_client
+
+    return pooled_client(settings)
+
+
+def get_async_llm_client(settings: "Settings") -> AsyncLLMClient:
+    """Return the pooled async LLM client for ``settings``."""
+    from gramregex.llm.factory import get_async_llm_client as pooled_client
+
+    return pooled_client(settings)
+
+
+def _resolve(
+    grammar: str | None,
+    grammar_file: Path | None,
+    model: str | None,
+    settings: "Settings | None",
+) -> tuple["Settings", str]:
+    from gramregex.settings import get_settings
+
+    active_settings = settings or get_settings()
+    cfg = load_grammar(grammar, grammar_file, config_path=active_settings.grammar_config_path)
+    if model:
+        active_settings = active_settings.model_copy(update={"openai_model": model})
+    return active_settings, cfg
+
+
+def _stages(grammar_load: float | None, client_acquire: float) -> dict[str, float] | None:
+    # Batches share one grammar and client, so their per-prompt events carry no set-up stages.
+    if grammar_load is None:
+        return None
+    return {STAGE_GRAMMAR_LOAD: grammar_load, STAGE_CLIENT_ACQUIRE: client_acquire}
+
+
+def _route(settings: "Settings") -> "tuple[RouteTier, ...]":
+    from gramregex.routing import RouteTier, parse_route
+
+    # A check without a configured route runs on a single tier with the request's settings.
+    return parse_route(settings.route) if settings.route else (RouteTier(),)
+
+
+def _route_compiler(settings: "Settings", *, validate: bool) -> "ValidatorCompiler | None":
+    # Grammar validation is what decides escalation, so a configured route always validates.
+    return get_grammar_registry().validator if validate or settings.route else None
+
+
+def _hedge_validated(client: LLMClient, compiler: "ValidatorCompiler | None") -> LLMClient:
+    from gramregex.llm.hedging import HedgedLLMClient
+
+    # A hedged client then treats invalid output as a lost race instead of returning it first.
+    return client.validating(compiler) if compiler is not None and isinstance(client, HedgedLLMClient) else client
+
+
+def _async_hedge_validated(client: AsyncLLMClient, compiler: "ValidatorCompiler | None") -> AsyncLLMClient:
+    from gramregex.llm.hedging import AsyncHedgedLLMClient
+
+    if compiler is not None and isinstance(client, AsyncHedgedLLMClient):
+        return client.validating(compiler)
+    return client
+
+
+def _client(
+    settings: "Settings",
+    cache: "ResponseCache | None",
+    *,
+    validate: bool,
+    check: "OutputCheck | None" = None,
+    grammar_load: float | None = None,
+) -> LLMClient:
+    from gramregex.cache import cached_client
+    from gramregex.coalescing import coalesced_client
+    from gramregex.routing import RoutingLLMClient, tier_settings
+    from gramregex.validator import ValidatingLLMClient
+
+    started = time.perf_counter()
+    if settings.route is None and check is None:
+        compiler = get_grammar_registry().validator if validate else None
+        client = coalesced_client(_hedge_validated(get_llm_client(settings), compiler), settings)
+        if compiler is not None:
+            client = ValidatingLLMClient(client, compiler=compiler)
+        client = cached_client(client, settings, cache, compiler=compiler)
+    else:
+        compiler = _route_compiler(settings, validate=validate)
+        route = [(tier, tier_settings(settings, tier)) for tier in _route(settings)]
+        tiers = [
+            (
+                tier,
+                cached_client(
+                    coalesced_client(_hedge_validated(get_llm_client(config), compiler), config),
+                    config,
+                    cache,
+                    compiler=compiler,
+                ),
+            )
+            for tier, config in route
+        ]
+        client = RoutingLLMClient(tiers, compiler=compiler, check=check)
+    stages = _stages(grammar_load, time.perf_counter() - started)
+    return instrumented_client(client, model=settings.openai_model, stages=stages)
+
+
+def _async_client(
+    settings: "Settings",
+    cache: "ResponseCache | None",
+    *,
+    validate: bool,
+    check: "OutputCheck | None" = None,
+    grammar_load: float | None = None,
+) -> AsyncLLMClient:
+    from gramregex.cache import cached_async_client
+    from gramregex.coalescing import coalesced_async_client
+    from gramregex.routing import AsyncRoutingLLMClient, tier_settings
+    from gramregex.validator import AsyncValidatingLLMClient
+
+    started = time.perf_counter()
+    if settings.route is None and check is None:
+        compiler = get_grammar_registry().validator if validate else None
+        client = coalesced_async_client(_async_hedge_validated(get_async_llm_client(settings), compiler), settings)
+        if compiler is not None:
+            client = AsyncValidatingLLMClient(client, compiler=compiler)
+        client = cached_async_client(client, settings, cache, compiler=compiler)
+    else:
+        compiler = _route_compiler(settings, validate=validate)
+        route = [(tier, tier_settings(settings, tier)) for tier in _route(settings)]
+        tiers = [
+            (
+                tier,
+                cached_async_client(
+                    coalesced_async_client(_async_hedge_validated(get_async_llm_client(config), compiler), config),
+                    config,
+                    cache,
+                    compiler=compiler,
+                ),
+            )
+            for tier, config in route
+        ]
+        client = AsyncRoutingLLMClient(tiers, compiler=compiler, check=check)
+    stages = _stages(grammar_load, time.perf_counter() - started)
+    return instrumented_async_client(client, model=settings.openai_model, stages=stages)
+
+
+class PreparedGenerator:
+    """Generation options resolved once and reused for many prompts.
+
+    Returned by ``prepare``. Settings, grammar and the client stack are fixed
+    at creation, so each call only sends the prompt. The OpenAI request
+    template (``request_template``) is looked up once as well, in the shared
+    template cache, and every call (streams included) reuses it without
+    another lookup.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        *,
+        settings: "Settings",
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None,
+        reasoning_effort: ReasoningEffort | None,
+        instructions: str | None,
+    ) -> None:
+        """Bind ``client`` to the resolved options."""
+        self.settings = settings
+        self.grammar = grammar
+        self._client = client
+        self._options: dict[str, Any] = {
+            "grammar": grammar,
+            "grammar_syntax": grammar_syntax,
+            "verbosity": verbosity,
+            "reasoning_effort": reasoning_effort,
+            "instructions": instructions,
+        }
+        from gramregex.llm.openai_client import prepare_template
+
+        self._template: PreparedTemplate = prepare_template(model=settings.openai_model, **self._options)
+
+    @property
+    def request_template(self) -> Mapping[str, object]:
+        """Return the prompt-independent part of the OpenAI requests (read-only)."""
+        return self._template.template
+
+    def __call__(self, prompt: str) -> str:
+        """Generate output for ``prompt``."""
+        from gramregex.llm.openai_client import using_template
+
+        with using_template(self._template):
+            return self._client.generate(prompt, **self._options)
+
+    def generate_result(self, prompt: str) -> GenerationResult:
+        """Generate output for ``prompt`` with response metadata."""
+        from gramregex.llm.openai_client import using_template
+
+        with using_template(self._template):
+            return self._client.generate_result(prompt, **self._options)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Stream output deltas for ``prompt``."""
+        from gramregex.llm.openai_client import using_template
+
+        deltas = self._client.stream(prompt, **self._options)
+        try:
+            while True:
+                # Entered around each step rather than across ``yield``, so the template never leaks to the caller.
+                with using_template(self._template):
+                    delta = next(deltas, None)
+                if delta is None:
+                    return
+                yield delta
+        finally:
+            close = getattr(deltas, "close", None)
+            if close is not None:
+                close()
+
+    def iter_many(self, prompts: Iterable[str], *, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> Iterator[BatchItem]:
+        """Lazily generate outputs for ``prompts`` concurrently, yielding results in input order."""
+        return iter_bounded(self, prompts, max_in_flight=max_in_flight)
+
+
+def prepare(
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
+) -> PreparedGenerator:
+    """Resolve generation options once and return a reusable generator.
 
-from gramregex.config import load_grammar_config
-from gramregex.grammar import load_grammar
-from gramregex.llm.base import GrammarSyntax, ReasoningEffort, VerbosityLevel
-from gramregex.llm.factory import create_llm_client
-from gramregex.settings import Settings, get_settings
+    Accepts the same options as ``generate`` (without the prompt). Use it in
+    hot loops that call ``generate`` with identical options, where resolving
+    settings, loading the grammar and acquiring the client on every call is
+    pure overhead::
+
+        label = prepare(grammar_file=Path("label.lark"), reasoning_effort="minimal")
+        outputs = [label(row) for row in rows]
+    """
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+    client = _client(active_settings, cache, validate=validate, check=check)
+    return PreparedGenerator(
+        client,
+        settings=active_settings,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
 
 
 def generate(
@@ -17,36 +328,455 @@ def generate(
     grammar_syntax: GrammarSyntax = "lark",
     verbosity: VerbosityLevel | None = None,
     reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
     model: str | None = None,
-    settings: Settings | None = None,
+    settings: "Settings | None" = None,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
 ) -> str:
     """Generate grammar-constrained text directly from Python.
 
     The arguments mirror the CLI options so library users can reuse the same
     feature set programmatically. Grammar can be provided directly or via a
-    file; otherwise the configured default grammar is used.
+    file; otherwise the configured default grammar is used. Pass ``cache`` (or
+    enable it through settings) to serve repeated requests without a model call,
+    and ``validate=True`` to check the output locally against the grammar,
+    raising ``GrammarValidationError`` on a mismatch. ``check`` is a predicate
+    the output must satisfy (``OutputCheckError`` otherwise). When the settings
+    configure a ``route``, rejected outputs are retried on the next, stronger
+    tier before an error is raised.
     """
-    active_settings = settings or get_settings()
-    cfg = load_grammar(grammar, grammar_file, config_path=active_settings.grammar_config_path)
-    if model:
-        active_settings = active_settings.model_copy(update={"openai_model": model})
+    started = time.perf_counter()
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
 
-    client = create_llm_client(active_settings)
+    client = _client(
+        active_settings,
+        cache,
+        validate=validate,
+        check=check,
+        grammar_load=time.perf_counter() - started,
+    )
     return client.generate(
         prompt,
         grammar=cfg,
         grammar_syntax=grammar_syntax,
         verbosity=verbosity,
         reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+
+
+def generate_result(
+    prompt: str,
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
+) -> GenerationResult:
+    """Generate grammar-constrained text and return it with response metadata.
+
+    Accepts the same arguments as ``generate``. The returned
+    ``GenerationResult`` also carries the model, response id, token usage
+    (including reasoning and cached input tokens) and latency; results served
+    from the response cache have ``from_cache`` set and no usage.
+    """
+    started = time.perf_counter()
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+
+    client = _client(
+        active_settings,
+        cache,
+        validate=validate,
+        check=check,
+        grammar_load=time.perf_counter() - started,
+    )
+    return client.generate_result(
+        prompt,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+
+
+def generate_stream(
+    prompt: str,
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+) -> Iterator[str]:
+    """Stream grammar-constrained text, yielding deltas as the model produces them.
+
+    Accepts the same arguments as ``generate``. Settings and grammar are
+    resolved immediately, so configuration errors surface before iteration.
+    With ``validate=True`` the stream is aborted as soon as the received
+    prefix can no longer match the grammar.
+    """
+    started = time.perf_counter()
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+
+    client = _client(active_settings, cache, validate=validate, grammar_load=time.perf_counter() - started)
+    return client.stream(
+        prompt,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+
+
+def iter_generate_many(
+    prompts: Iterable[str],
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
+    pack_size: int = 1,
+) -> Iterator[BatchItem]:
+    """Lazily generate outputs for many prompts, yielding results in input order.
+
+    Settings, grammar and the LLM client are resolved once and shared by every
+    prompt. Per-prompt failures are reported on the yielded ``BatchItem``
+    rather than aborting the remaining prompts.
+
+    With ``pack_size`` above 1, up to that many prompts are sent in a single
+    request whose grammar wraps ``grammar`` once per prompt (see
+    ``gramregex.packing``). Each item of a packed output is checked against
+    ``grammar``; prompts whose item does not match, or whose pack cannot be
+    split, are retried one prompt per request, while provider errors are
+    reported on every prompt of the pack. ``max_in_flight`` then bounds the
+    packs in flight. Packing cannot be combined with ``check``, which judges
+    whole outputs, and lark grammars need ``gramregex[validate]`` to check
+    the items.
+    """
+    from gramregex.packing import PackingError, pack_grammar, pack_prompts, split_output
+
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+    if pack_size > 1:
+        if check is not None:
+            msg = "pack_size cannot be combined with check"
+            raise ValueError(msg)
+        # Reject grammars that cannot be packed or checked before any request is sent.
+        pack_grammar(cfg, grammar_syntax, pack_size)
+        item_validator = get_grammar_registry().validator(cfg, grammar_syntax)
+
+    client = _client(active_settings, cache, validate=validate, check=check)
+    call = partial(
+        client.generate,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+    if pack_size == 1:
+        return iter_bounded(call, prompts, max_in_flight=max_in_flight)
+
+    def call_pack(pack: list[str]) -> list[str | None]:
+        try:
+            output = call(pack_prompts(pack), grammar=pack_grammar(cfg, grammar_syntax, len(pack)))
+            outputs = split_output(output, len(pack))
+        except (PackingError, GrammarValidationError):
+            return [None] * len(pack)
+        return [item if item_validator.is_valid(item) else None for item in outputs]
+
+    return iter_packed(call, call_pack, prompts, pack_size=pack_size, max_in_flight=max_in_flight)
+
+
+def generate_many(
+    prompts: Iterable[str],
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
+    pack_size: int = 1,
+) -> list[BatchItem]:
+    """Generate outputs for many prompts concurrently and return them in input order."""
+    return list(
+        iter_generate_many(
+            prompts,
+            grammar=grammar,
+            grammar_file=grammar_file,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+            model=model,
+            settings=settings,
+            max_in_flight=max_in_flight,
+            cache=cache,
+            validate=validate,
+            check=check,
+            pack_size=pack_size,
+        ),
+    )
+
+
+def iter_generate_batch_job(
+    prompts: Iterable[str],
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    validate: bool = False,
+    poll_interval: float | None = None,
+    on_status: Callable[[str], None] | None = None,
+    job_file: Path | None = None,
+) -> Iterator[BatchItem]:
+    """Generate outputs for many prompts as OpenAI Batch API jobs, yielding results in input order.
+
+    Meant for large offline jobs: requests are billed at the batch rate and
+    complete within the provider's completion window rather than immediately,
+    so the iterator blocks while the jobs run. ``on_status`` receives progress
+    messages. The response cache is not consulted. With ``validate=True`` each
+    output is checked against the grammar and mismatches are reported on the
+    item as ``GrammarValidationError``. With ``job_file``, the submitted jobs
+    are recorded there, and calling again with the same prompts after an
+    interruption reattaches to them instead of submitting new jobs.
+    """
+    from gramregex.llm.openai_batch import DEFAULT_POLL_INTERVAL, OpenAIBatchRunner
+
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+    validator = get_grammar_registry().validator(cfg, grammar_syntax) if validate else None
+    runner = OpenAIBatchRunner(
+        active_settings,
+        poll_interval=DEFAULT_POLL_INTERVAL if poll_interval is None else poll_interval,
+        on_status=on_status,
+        job_file=job_file,
+    )
+
+    def items() -> Iterator[BatchItem]:
+        with runner:
+            for item in runner.run(
+                prompts,
+                grammar=cfg,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ):
+                if validator is None or item.output is None:
+                    yield item
+                    continue
+                try:
+                    validator.validate(item.output)
+                except GrammarValidationError as error:
+                    yield BatchItem(index=item.index, prompt=item.prompt, error=error)
+                else:
+                    yield item
+
+    return items()
+
+
+async def agenerate(
+    prompt: str,
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
+) -> str:
+    """Asynchronously generate grammar-constrained text.
+
+    Accepts the same arguments as ``generate`` but awaits the provider's async
+    client, so many calls can share one event loop without worker threads.
+    """
+    started = time.perf_counter()
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+
+    client = _async_client(
+        active_settings,
+        cache,
+        validate=validate,
+        check=check,
+        grammar_load=time.perf_counter() - started,
+    )
+    return await client.generate(
+        prompt,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+
+
+async def agenerate_result(
+    prompt: str,
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
+) -> GenerationResult:
+    """Asynchronously generate text and return it with response metadata like ``generate_result``."""
+    started = time.perf_counter()
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+
+    client = _async_client(
+        active_settings,
+        cache,
+        validate=validate,
+        check=check,
+        grammar_load=time.perf_counter() - started,
+    )
+    return await client.generate_result(
+        prompt,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+
+
+def agenerate_stream(
+    prompt: str,
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+) -> AsyncIterator[str]:
+    """Asynchronously stream grammar-constrained text deltas.
+
+    Must be called from a running event loop; iterate the result with
+    ``async for``.
+    """
+    started = time.perf_counter()
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+
+    client = _async_client(active_settings, cache, validate=validate, grammar_load=time.perf_counter() - started)
+    return client.stream(
+        prompt,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+
+
+async def agenerate_many(
+    prompts: Iterable[str],
+    *,
+    grammar: str | None = None,
+    grammar_file: Path | None = None,
+    grammar_syntax: GrammarSyntax = "lark",
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+    model: str | None = None,
+    settings: "Settings | None" = None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    cache: "ResponseCache | None" = None,
+    validate: bool = False,
+    check: "OutputCheck | None" = None,
+) -> list[BatchItem]:
+    """Asynchronously generate outputs for many prompts under a concurrency limit.
+
+    A single async client and grammar are shared by every prompt; results are
+    returned in input order with per-prompt errors captured on each item.
+    """
+    active_settings, cfg = _resolve(grammar, grammar_file, model, settings)
+
+    client = _async_client(active_settings, cache, validate=validate, check=check)
+    call = partial(
+        client.generate,
+        grammar=cfg,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
     )
+    return await agather_bounded(call, prompts, max_in_flight=max_in_flight)
 
 
 __all__ = [
+    "BatchItem",
+    "GenerationResult",
     "GrammarSyntax",
+    "GrammarValidationError",
+    "OutputCheckError",
+    "PreparedGenerator",
     "ReasoningEffort",
+    "ResponseCache",
+    "RouteTier",
     "Settings",
     "VerbosityLevel",
+    "agenerate",
+    "agenerate_many",
+    "agenerate_result",
+    "agenerate_stream",
     "generate",
+    "generate_many",
+    "generate_result",
+    "generate_stream",
     "get_settings",
+    "iter_generate_batch_job",
+    "iter_generate_many",
     "load_grammar_config",
+    "prepare",
 ]
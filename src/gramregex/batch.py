@@ -0,0 +1,161 @@
+"""Bounded, order-preserving fan-out helpers for batch generation."""
+
+from collections import deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+
+DEFAULT_MAX_IN_FLIGHT = 8
+
+
+@dataclass(frozen=True, slots=True)
+class BatchItem:
+    """Outcome of a single prompt within a batch."""
+
+    index: int
+    prompt: str
+    output: str | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        """Return True when the prompt produced output without errors."""
+        return self.error is None
+
+
+def _run_item(fn: Callable[[str], str], index: int, prompt: str) -> BatchItem:
+    try:
+        return BatchItem(index=index, prompt=prompt, output=fn(prompt))
+    except Exception as error:
+        return BatchItem(index=index, prompt=prompt, error=error)
+
+
+def iter_bounded(
+    fn: Callable[[str], str],
+    prompts: Iterable[str],
+    *,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> Iterator[BatchItem]:
+    """Apply ``fn`` to each prompt on a thread pool and yield results in input order.
+
+    At most ``max_in_flight`` prompts are submitted at any time and the input
+    iterable is consumed lazily, so arbitrarily long inputs run in constant
+    memory. Exceptions raised by ``fn`` are captured on the returned item
+    instead of aborting the batch.
+    """
+    if max_in_flight < 1:
+        msg = "max_in_flight must be at least 1"
+        raise ValueError(msg)
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gramregex-batch")
+    pending: deque[Future[BatchItem]] = deque()
+    try:
+        for index, prompt in enumerate(prompts):
+            pending.append(executor.submit(_run_item, fn, index, prompt))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_pack(
+    fn: Callable[[str], str],
+    pack_fn: Callable[[list[str]], list[str | None]],
+    index: int,
+    prompts: list[str],
+) -> list[BatchItem]:
+    if len(prompts) == 1:
+        return [_run_item(fn, index, prompts[0])]
+    try:
+        outputs = pack_fn(prompts)
+    except Exception as error:
+        return [BatchItem(index=index + offset, prompt=prompt, error=error) for offset, prompt in enumerate(prompts)]
+    return [
+        _run_item(fn, index + offset, prompt)
+        if output is None
+        else BatchItem(index=index + offset, prompt=prompt, output=output)
+        for offset, (prompt, output) in enumerate(zip(prompts, outputs, strict=True))
+    ]
+
+
+def iter_packed(
+    fn: Callable[[str], str],
+    pack_fn: Callable[[list[str]], list[str | None]],
+    prompts: Iterable[str],
+    *,
+    pack_size: int,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> Iterator[BatchItem]:
+    """Like ``iter_bounded``, but hand ``pack_fn`` up to ``pack_size`` prompts at a time.
+
+    ``pack_fn`` returns one output per prompt of its pack, or None for a
+    prompt that must be retried alone with ``fn``. An exception raised by
+    ``pack_fn`` is recorded on every item of the pack rather than retried, so
+    provider errors such as rate limiting do not multiply the traffic.
+    ``max_in_flight`` bounds the packs running at once.
+    """
+    if pack_size < 1 or max_in_flight < 1:
+        msg = "pack_size and max_in_flight must be at least 1"
+        raise ValueError(msg)
+
+    iterator = iter(prompts)
+    executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gramregex-batch")
+    pending: deque[Future[list[BatchItem]]] = deque()
+    index = 0
+    try:
+        while pack := list(islice(iterator, pack_size)):
+            pending.append(executor.submit(_run_pack, fn, pack_fn, index, pack))
+            index += len(pack)
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def _arun_item(fn: Callable[[str], Awaitable[str]], index: int, prompt: str) -> BatchItem:
+    try:
+        return BatchItem(index=index, prompt=prompt, output=await fn(prompt))
+    except Exception as error:
+        return BatchItem(index=index, prompt=prompt, error=error)
+
+
+async def agather_bounded(
+    fn: Callable[[str], Awaitable[str]],
+    prompts: Iterable[str],
+    *,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+) -> list[BatchItem]:
+    """Await ``fn`` for each prompt on ``max_in_flight`` workers and return results in input order.
+
+    The workers take prompts from the input iterable as they become free, so
+    at most ``max_in_flight`` calls are pending at any time however long the
+    input is. Exceptions raised by ``fn`` are captured on the returned item
+    instead of aborting the batch; cancellation still propagates to the caller.
+    """
+    if max_in_flight < 1:
+        msg = "max_in_flight must be at least 1"
+        raise ValueError(msg)
+
+    # Imported here so the CLI, which only needs the sync helpers, starts faster.
+    import asyncio
+
+    numbered = enumerate(prompts)
+    results: dict[int, BatchItem] = {}
+
+    async def worker() -> None:
+        # The workers share one iterator; each takes the next prompt when its call completes.
+        for index, prompt in numbered:
+            results[index] = await _arun_item(fn, index, prompt)
+
+    async with asyncio.TaskGroup() as group:
+        for _ in range(max_in_flight):
+            group.create_task(worker())
+    return [results[index] for index in range(len(results))]
+
+
+__all__ = ["DEFAULT_MAX_IN_FLIGHT", "BatchItem", "agather_bounded", "iter_bounded", "iter_packed"]
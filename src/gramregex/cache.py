@@ -0,0 +1,640 @@
+"""Content-addressed response cache for grammar-constrained generation."""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import TYPE_CHECKING, Self
+
+from gramregex.instrumentation import record_cache
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+from gramregex.settings import Settings
+
+if TYPE_CHECKING:
+    from gramregex.validator import ValidatorCompiler
+
+DEFAULT_MAX_ENTRIES = 1024
+DISK_CACHE_FILENAME = "responses.sqlite3"
+
+
+def cache_key(
+    model: str,
+    prompt: str,
+    *,
+    grammar: str,
+    grammar_syntax: GrammarSyntax,
+    verbosity: VerbosityLevel | None,
+    reasoning_effort: ReasoningEffort | None,
+    instructions: str | None = None,
+    endpoint: str | None = None,
+) -> str:
+    """Return a stable hash identifying a grammar-constrained request.
+
+    ``endpoint`` identifies the backend serving ``model`` (see
+    ``endpoint_identity``), so the same model name behind different
+    deployments does not share entries.
+    """
+    fields: list[object] = [model, prompt, grammar, grammar_syntax, verbosity, reasoning_effort]
+    # Appended only when set so keys of requests without instructions (or to the OpenAI API) stay valid.
+    if instructions is not None:
+        fields.append(instructions)
+    if endpoint is not None:
+        fields.append({"endpoint": endpoint})
+    payload = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def endpoint_identity(settings: Settings) -> str | None:
+    """Return what identifies the backends answering requests under ``settings``; None for the OpenAI API."""
+    fields = [
+        settings.openai_base_url,
+        sorted(endpoint.base_url or "" for endpoint in settings.openai_endpoints),
+        settings.hedge_base_url,
+        settings.hedge_model,
+    ]
+    if not any(fields):
+        return None
+    return json.dumps(fields, separators=(",", ":"))
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """Hit and miss counters for a ``ResponseCache``."""
+
+    hits: int = 0
+    misses: int = 0
+    memory_hits: int = 0
+    disk_hits: int = 0
+
+
+class _DiskTier:
+    """SQLite-backed cache tier with TTL and size-based LRU eviction."""
+
+    def __init__(self, directory: Path, *, max_bytes: int | None) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        self._conn = sqlite3.connect(directory / DISK_CACHE_FILENAME, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, "
+                "accessed_at REAL NOT NULL, size INTEGER NOT NULL)",
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+
+    def get(self, key: str, *, now: float, ttl: float | None) -> tuple[str, float] | None:
+        row: tuple[str, float] | None = self._conn.execute(
+            "SELECT value, created_at FROM responses WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        with self._conn:
+            if ttl is not None and now - created_at > ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return value, created_at
+
+    def set(self, key: str, value: str, *, now: float, ttl: float | None) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+                (key, value, now, now, len(value.encode("utf-8"))),
+            )
+            if ttl is not None:
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - ttl,))
+            if self._max_bytes is not None:
+                self._evict_to(self._max_bytes)
+
+    def _evict_to(self, max_bytes: int) -> None:
+        total: int = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        excess = total - max_bytes
+        if excess <= 0:
+            return
+        doomed: list[tuple[str]] = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def clear(self) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + optional SQLite on disk) cache of generated outputs.
+
+    Entries older than ``ttl`` seconds are treated as misses. The memory tier
+    holds at most ``max_entries`` items; the disk tier is trimmed to
+    ``max_bytes`` of stored output by evicting the least recently used rows.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        directory: Path | None = None,
+        ttl: float | None = None,
+        max_bytes: int | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Create a cache, opening the disk tier when ``directory`` is given."""
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._disk = _DiskTier(directory, max_bytes=max_bytes) if directory else None
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key: str, *, accept: Callable[[str], bool] | None = None) -> str | None:
+        """Return the cached output for ``key`` or None on a miss.
+
+        An entry ``accept`` rejects is a miss; it is checked outside the lock.
+        """
+        now = self._clock()
+        with self._lock:
+            value, tier = self._find(key, now)
+        if value is not None and accept is not None and not accept(value):
+            value = None
+        with self._lock:
+            if value is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+                if tier == "memory":
+                    self.stats.memory_hits += 1
+                else:
+                    self.stats.disk_hits += 1
+        return value
+
+    def _find(self, key: str, now: float) -> tuple[str | None, str | None]:
+        """Return the live entry for ``key`` and the tier it came from."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if self._ttl is None or now - created_at <= self._ttl:
+                self._memory.move_to_end(key)
+                return value, "memory"
+            del self._memory[key]
+
+        if self._disk is not None:
+            stored = self._disk.get(key, now=now, ttl=self._ttl)
+            if stored is not None:
+                value, created_at = stored
+                self._remember(key, value, created_at)
+                return value, "disk"
+        return None, None
+
+    def set(self, key: str, value: str) -> None:
+        """Store ``value`` under ``key`` in every tier."""
+        now = self._clock()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._disk is not None:
+                self._disk.set(key, value, now=now, ttl=self._ttl)
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry from all tiers and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.clear()
+            self.stats = CacheStats()
+
+    def close(self) -> None:
+        """Close the disk tier."""
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def __enter__(self) -> Self:
+        """Return the cache for use in a ``with`` block."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the cache when leaving a ``with`` block."""
+        self.close()
+
+
+class CachedLLMClient(LLMClient):
+    """LLM client wrapper that serves repeated requests from a ``ResponseCache``."""
+
+    def __init__(
+        self,
+        client: LLMClient,
+        cache: ResponseCache,
+        *,
+        model: str,
+        endpoint: str | None = None,
+        compiler: "ValidatorCompiler | None" = None,
+    ) -> None:
+        """Wrap ``client`` whose requests target ``model`` on ``endpoint``.
+
+        With ``compiler``, a cached output that does not match the request
+        grammar is treated as a miss, so output cached by a request without
+        validation is never returned to one with validation.
+        """
+        self._client = client
+        self._cache = cache
+        self._model = model
+        self._endpoint = endpoint
+        self._compiler = compiler
+
+    def _lookup(self, key: str, grammar: str, grammar_syntax: GrammarSyntax) -> str | None:
+        compiler = self._compiler
+        accept = None if compiler is None else lambda value: compiler(grammar, grammar_syntax).is_valid(value)
+        cached = self._cache.get(key, accept=accept)
+        record_cache(hit=cached is not None)
+        return cached
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Return the cached output or generate and cache it."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+            endpoint=self._endpoint,
+        )
+        cached = self._lookup(key, grammar, grammar_syntax)
+        if cached is not None:
+            return cached
+
+        output = self._client.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        self._cache.set(key, output)
+        return output
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Return the cached output as a result without usage, or generate and cache it."""
+        started = time.perf_counter()
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+            endpoint=self._endpoint,
+        )
+        cached = self._lookup(key, grammar, grammar_syntax)
+        if cached is not None:
+            return GenerationResult(
+                text=cached,
+                model=self._model,
+                latency=time.perf_counter() - started,
+                from_cache=True,
+            )
+
+        result = self._client.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        self._cache.set(key, result.text)
+        return result
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Yield the cached output at once, or stream and cache the complete output."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+            endpoint=self._endpoint,
+        )
+        cached = self._lookup(key, grammar, grammar_syntax)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks: list[str] = []
+        for delta in self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        ):
+            chunks.append(delta)
+            yield delta
+        self._cache.set(key, "".join(chunks))
+
+
+class AsyncCachedLLMClient(AsyncLLMClient):
+    """Async LLM client wrapper that serves repeated requests from a ``ResponseCache``."""
+
+    def __init__(
+        self,
+        client: AsyncLLMClient,
+        cache: ResponseCache,
+        *,
+        model: str,
+        endpoint: str | None = None,
+        compiler: "ValidatorCompiler | None" = None,
+    ) -> None:
+        """Wrap ``client`` whose requests target ``model`` on ``endpoint``.
+
+        With ``compiler``, a cached output that does not match the request
+        grammar is treated as a miss, so output cached by a request without
+        validation is never returned to one with validation.
+        """
+        self._client = client
+        self._cache = cache
+        self._model = model
+        self._endpoint = endpoint
+        self._compiler = compiler
+
+    def _lookup(self, key: str, grammar: str, grammar_syntax: GrammarSyntax) -> str | None:
+        compiler = self._compiler
+        accept = None if compiler is None else lambda value: compiler(grammar, grammar_syntax).is_valid(value)
+        cached = self._cache.get(key, accept=accept)
+        record_cache(hit=cached is not None)
+        return cached
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Return the cached output or generate and cache it."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+            endpoint=self._endpoint,
+        )
+        cached = self._lookup(key, grammar, grammar_syntax)
+        if cached is not None:
+            return cached
+
+        output = await self._client.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        self._cache.set(key, output)
+        return output
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Return the cached output as a result without usage, or generate and cache it."""
+        started = time.perf_counter()
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+            endpoint=self._endpoint,
+        )
+        cached = self._lookup(key, grammar, grammar_syntax)
+        if cached is not None:
+            return GenerationResult(
+                text=cached,
+                model=self._model,
+                latency=time.perf_counter() - started,
+                from_cache=True,
+            )
+
+        result = await self._client.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        self._cache.set(key, result.text)
+        return result
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield the cached output at once, or stream and cache the complete output."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+            endpoint=self._endpoint,
+        )
+        cached = self._lookup(key, grammar, grammar_syntax)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks: list[str] = []
+        async for delta in self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        ):
+            chunks.append(delta)
+            yield delta
+        self._cache.set(key, "".join(chunks))
+
+
+_caches: dict[tuple[object, ...], ResponseCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(settings: Settings) -> ResponseCache | None:
+    """Return the process-wide cache configured by ``settings``, or None when disabled."""
+    if not settings.cache_enabled:
+        return None
+
+    key = (settings.cache_dir, settings.cache_ttl, settings.cache_max_entries, settings.cache_max_bytes)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ResponseCache(
+                max_entries=settings.cache_max_entries,
+                directory=settings.cache_dir,
+                ttl=settings.cache_ttl,
+                max_bytes=settings.cache_max_bytes,
+            )
+            _caches[key] = cache
+        return cache
+
+
+def with_cache_options(settings: Settings, *, enabled: bool | None, directory: Path | None) -> Settings:
+    """Return ``settings`` with per-invocation cache overrides; a directory implies enabling the cache."""
+    update: dict[str, object] = {}
+    if directory is not None:
+        update["cache_dir"] = directory
+        update["cache_enabled"] = True
+    if enabled is not None:
+        update["cache_enabled"] = enabled
+    return settings.model_copy(update=update) if update else settings
+
+
+def cached_client(
+    client: LLMClient,
+    settings: Settings,
+    cache: ResponseCache | None = None,
+    *,
+    compiler: "ValidatorCompiler | None" = None,
+) -> LLMClient:
+    """Wrap ``client`` with ``cache`` (or the cache configured by ``settings``) when caching is active.
+
+    Pass ``compiler`` when the request validates its output, so cached hits are validated too.
+    """
+    active_cache = cache or get_response_cache(settings)
+    if active_cache is None:
+        return client
+    return CachedLLMClient(
+        client,
+        active_cache,
+        model=settings.openai_model,
+        endpoint=endpoint_identity(settings),
+        compiler=compiler,
+    )
+
+
+def cached_async_client(
+    client: AsyncLLMClient,
+    settings: Settings,
+    cache: ResponseCache | None = None,
+    *,
+    compiler: "ValidatorCompiler | None" = None,
+) -> AsyncLLMClient:
+    """Async counterpart of ``cached_client``."""
+    active_cache = cache or get_response_cache(settings)
+    if active_cache is None:
+        return client
+    return AsyncCachedLLMClient(
+        client,
+        active_cache,
+        model=settings.openai_model,
+        endpoint=endpoint_identity(settings),
+        compiler=compiler,
+    )
+
+
+__all__ = [
+    "AsyncCachedLLMClient",
+    "CacheStats",
+    "CachedLLMClient",
+    "ResponseCache",
+    "cache_key",
+    "cached_async_client",
+    "cached_client",
+    "endpoint_identity",
+    "get_response_cache",
+    "with_cache_options",
+]
@@ -0,0 +1,108 @@
+"""Progress journal for resumable runs over large input files.
+
+Results are written in input order, so progress is a single position: how
+many records are done and the byte offsets just past them in the input and
+output files. Resuming seeks both files to those offsets, so neither the
+completed inputs nor their outputs are read again.
+"""
+
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+DEFAULT_SAVE_INTERVAL = 1.0
+
+
+@dataclass(frozen=True, slots=True)
+class Progress:
+    """Position reached by a run."""
+
+    records: int
+    input_offset: int
+    output_offset: int
+
+
+class Checkpoint:
+    """Small JSON file holding the latest ``Progress`` of a run.
+
+    Saves are atomic (write then rename). Callers save whenever ``due()``,
+    i.e. at most once per ``interval`` seconds, and once more when the run
+    stops, so a crash loses at most ``interval`` seconds of completed work.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        interval: float = DEFAULT_SAVE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Journal progress to ``path``."""
+        self.path = path
+        self._interval = interval
+        self._clock = clock
+        self._saved_at: float | None = None
+
+    def load(self) -> Progress | None:
+        """Return the saved progress, or None when there is no checkpoint."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (json.JSONDecodeError, UnicodeDecodeError) as error:
+            msg = f"Corrupt checkpoint {self.path}: {error}"
+            raise ValueError(msg) from error
+        try:
+            return Progress(**data)
+        except TypeError as error:
+            msg = f"Corrupt checkpoint {self.path}: {error}"
+            raise ValueError(msg) from error
+
+    def due(self) -> bool:
+        """Return whether ``interval`` seconds have passed since the last save."""
+        return self._saved_at is None or self._clock() - self._saved_at >= self._interval
+
+    def save(self, progress: Progress) -> None:
+        """Persist ``progress``; the output it points into must be flushed first."""
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        temporary.write_text(json.dumps(asdict(progress)), encoding="utf-8")
+        temporary.replace(self.path)
+        self._saved_at = self._clock()
+
+
+class LineReader:
+    """Iterate the decoded lines of a binary file while tracking the bytes consumed.
+
+    Line endings are kept, so the lines can be fed to ``csv`` as well as
+    parsed as JSONL. ``offset`` is the position just past the last line yielded.
+    """
+
+    def __init__(self, stream: BinaryIO, *, encoding: str = "utf-8", end: int | None = None) -> None:
+        """Read ``stream`` from its current position, stopping before the first line starting at ``end``."""
+        self._stream = stream
+        self._encoding = encoding
+        self._end = end
+        self.offset = stream.tell()
+
+    def __iter__(self) -> Iterator[str]:
+        """Yield lines, advancing ``offset``."""
+        for raw in self._stream:
+            if self._end is not None and self.offset >= self._end:
+                return
+            self.offset += len(raw)
+            yield raw.decode(self._encoding)
+
+
+def truncate(path: Path, size: int) -> None:
+    """Cut ``path`` back to ``size`` bytes, dropping output written after the last checkpoint."""
+    if path.stat().st_size < size:
+        msg = f"{path} is shorter than its checkpoint; it was modified after the run stopped"
+        raise ValueError(msg)
+    os.truncate(path, size)
+
+
+__all__ = ["DEFAULT_SAVE_INTERVAL", "Checkpoint", "LineReader", "Progress", "truncate"]
@@ -1,69 +1,799 @@
 """Command line interface for gramregex."""
 
+import csv
+import json
+import shutil
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack
+from functools import partial
+from itertools import chain, islice
 from pathlib import Path
-from typing import Annotated, Literal
+from typing import TYPE_CHECKING, Annotated, Any, BinaryIO, Literal, TextIO, cast
 
+import click
 import typer
+from typer.core import TyperGroup
 
-from gramregex.llm.factory import create_llm_client
-from gramregex.grammar import load_grammar
-from gramregex.settings import get_settings
+from gramregex.batch import DEFAULT_MAX_IN_FLIGHT, BatchItem
 
-app = typer.Typer(add_completion=False, help="Generate grammar-constrained responses using OpenAI Responses API.")
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from gramregex.checkpoint import Checkpoint, Progress
+    from gramregex.settings import Settings
+
+# The generation stack (OpenAI SDK, Pydantic settings, YAML) is imported inside
+# the commands so that ``--help`` and argument errors return without loading it.
+
+DEFAULT_COMMAND = "generate"
+
+
+class DefaultCommandGroup(TyperGroup):
+    """Command group that falls back to ``generate`` when no subcommand is given."""
+
+    def parse_args(self, ctx: click.Context, args: list[str]) -> list[str]:
+        """Insert the default command so ``gramregex "prompt"`` keeps working."""
+        if args and args[0] not in self.commands and args[0] not in ctx.help_option_names:
+            args = [DEFAULT_COMMAND, *args]
+        return super().parse_args(ctx, args)
+
+
+app = typer.Typer(
+    add_completion=False,
+    cls=DefaultCommandGroup,
+    help="Generate grammar-constrained responses using OpenAI Responses API.",
+)
+
+GrammarOption = Annotated[str | None, typer.Option("--grammar", "-g", help="CFG 文字列")]
+GrammarFileOption = Annotated[
+    Path | None,
+    typer.Option(
+        "--grammar-file",
+        "-f",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True,
+        help="CFGファイルのパス",
+    ),
+]
+ModelOption = Annotated[str | None, typer.Option("--model", help="上書きするモデル名")]
+GrammarSyntaxOption = Annotated[
+    Literal["lark", "regex"],
+    typer.Option(
+        "--grammar-syntax",
+        help="grammar ツールの syntax (lark もしくは regex)",
+        show_default=True,
+    ),
+]
+VerbosityOption = Annotated[
+    Literal["low", "medium", "high"] | None,
+    typer.Option("--verbosity", help="応答の詳細度 (low/medium/high)"),
+]
+ReasoningEffortOption = Annotated[
+    Literal["minimal", "medium", "high"] | None,
+    typer.Option("--reasoning-effort", help="推論ステップの強度 (minimal/medium/high)"),
+]
+
+CacheOption = Annotated[
+    bool | None,
+    typer.Option("--cache/--no-cache", help="レスポンスキャッシュを使うかどうか (省略時は設定に従う)"),
+]
+CacheDirOption = Annotated[
+    Path | None,
+    typer.Option(
+        "--cache-dir",
+        file_okay=False,
+        dir_okay=True,
+        help="ディスクキャッシュの保存先ディレクトリ (指定するとキャッシュが有効になる)",
+    ),
+]
+
+InstructionsOption = Annotated[
+    str | None,
+    typer.Option("--instructions", "-i", help="全入力で共通の指示 (プロバイダのプロンプトキャッシュの対象)"),
+]
+InstructionsFileOption = Annotated[
+    Path | None,
+    typer.Option(
+        "--instructions-file",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True,
+        help="共通の指示を記述したファイルのパス",
+    ),
+]
+
+RouteOption = Annotated[
+    str | None,
+    typer.Option(
+        "--route",
+        help="安価な順に試す model[:effort] のカンマ区切り。出力が検証に失敗したときだけ次の段に切り替える",
+    ),
+]
+
+MaxInFlightOption = Annotated[
+    int,
+    typer.Option("--max-in-flight", "-j", min=1, help="同時に送信するリクエスト数の上限"),
+]
+
+PackOption = Annotated[
+    int,
+    typer.Option("--pack", min=1, help="1 リクエストにまとめるプロンプト数 (失敗したまとまりは 1 件ずつ再送)"),
+]
+
+ValidateOption = Annotated[
+    bool,
+    typer.Option("--validate", help="出力を grammar でローカル検証する (lark には gramregex[validate] が必要)"),
+]
+
+
+def _load_instructions(instructions: str | None, instructions_file: Path | None) -> str | None:
+    if instructions is not None and instructions_file is not None:
+        msg = "Use either --instructions or --instructions-file, not both"
+        raise typer.BadParameter(msg)
+    if instructions_file is not None:
+        return instructions_file.read_text(encoding="utf-8")
+    return instructions
+
+
+def _check_route(route: str | None) -> None:
+    if route is None:
+        return
+    from gramregex.routing import parse_route
+
+    try:
+        parse_route(route)
+    except ValueError as error:
+        raise typer.BadParameter(str(error)) from error
+
+
+def _forward_to_daemon(message: dict[str, object]) -> bool:
+    """Run the request on a running daemon; return False when none is listening or its settings differ."""
+    from gramregex import daemon
+
+    try:
+        responses = daemon.request({**message, "fingerprint": daemon.settings_fingerprint()})
+    except daemon.DaemonUnavailableError:
+        return False
+
+    streamed = False
+    for response in responses:
+        if "delta" in response:
+            streamed = True
+            typer.echo(response["delta"], nl=False)
+        elif "output" in response:
+            typer.echo(response["output"])
+        elif "result" in response:
+            typer.echo(json.dumps(response["result"], ensure_ascii=False))
+        elif response.get("end"):
+            typer.echo()
+        elif "error" in response:
+            if response.get("kind") == daemon.ERROR_PARAMETER:
+                raise typer.BadParameter(response["error"])
+            if streamed:
+                typer.echo()
+            typer.echo(response["error"], err=True)
+            raise typer.Exit(code=1)
+    return True
 
 
 @app.command(name="generate")
 def generate(
     input_text: Annotated[str, typer.Argument(..., help="LLMへ送る入力テキスト")],
-    grammar: Annotated[str | None, typer.Option("--grammar", "-g", help="CFG 文字列")] = None,
-    grammar_file: Annotated[
+    *,
+    grammar: GrammarOption = None,
+    grammar_file: GrammarFileOption = None,
+    model: ModelOption = None,
+    grammar_syntax: GrammarSyntaxOption = "lark",
+    verbosity: VerbosityOption = None,
+    reasoning_effort: ReasoningEffortOption = None,
+    instructions: InstructionsOption = None,
+    instructions_file: InstructionsFileOption = None,
+    cache: CacheOption = None,
+    cache_dir: CacheDirOption = None,
+    stream: Annotated[
+        bool,
+        typer.Option("--stream", help="生成されたテキストを逐次出力する"),
+    ] = False,
+    validate: ValidateOption = False,
+    route: RouteOption = None,
+    json_output: Annotated[
+        bool,
+        typer.Option("--json", help="出力をモデル名・トークン使用量・レイテンシ付きの JSON で出力する"),
+    ] = False,
+    daemon: Annotated[
+        bool,
+        typer.Option("--daemon/--no-daemon", help="gramregex serve が起動していればそちらに転送する"),
+    ] = True,
+) -> None:
+    """Generate output constrained by the given CFG grammar."""
+    if stream and json_output:
+        msg = "--json cannot be combined with --stream"
+        raise typer.BadParameter(msg)
+    instructions = _load_instructions(instructions, instructions_file)
+    _check_route(route)
+    if daemon and _forward_to_daemon(
+        {
+            "prompt": input_text,
+            "grammar": grammar,
+            "grammar_file": str(grammar_file.absolute()) if grammar_file else None,
+            "grammar_syntax": grammar_syntax,
+            "verbosity": verbosity,
+            "reasoning_effort": reasoning_effort,
+            "instructions": instructions,
+            "model": model,
+            "cache": cache,
+            "cache_dir": str(cache_dir.absolute()) if cache_dir else None,
+            "stream": stream,
+            "validate": validate,
+            "route": route,
+            "json": json_output,
+        },
+    ):
+        return
+
+    from dataclasses import asdict
+
+    from gramregex.api import generate as api_generate
+    from gramregex.api import generate_result
+    from gramregex.api import generate_stream
+    from gramregex.cache import with_cache_options
+    from gramregex.grammar import load_grammar
+    from gramregex.settings import get_settings
+    from gramregex.validator import GrammarValidationError
+
+    settings = with_cache_options(get_settings(), enabled=cache, directory=cache_dir)
+    if route is not None:
+        settings = settings.model_copy(update={"route": route})
+    try:
+        cfg = load_grammar(grammar, grammar_file, config_path=settings.grammar_config_path)
+    except ValueError as error:
+        raise typer.BadParameter(str(error)) from error
+
+    options: dict[str, Any] = {
+        "grammar": cfg,
+        "grammar_syntax": grammar_syntax,
+        "verbosity": verbosity,
+        "reasoning_effort": reasoning_effort,
+        "instructions": instructions,
+        "model": model,
+        "settings": settings,
+        "validate": validate,
+    }
+    try:
+        if stream:
+            for delta in generate_stream(input_text, **options):
+                typer.echo(delta, nl=False)
+            typer.echo()
+        elif json_output:
+            typer.echo(json.dumps(asdict(generate_result(input_text, **options)), ensure_ascii=False))
+        else:
+            typer.echo(api_generate(input_text, **options))
+    except GrammarValidationError as error:
+        if stream:
+            typer.echo()
+        typer.echo(str(error), err=True)
+        raise typer.Exit(code=1) from error
+
+
+def _read_jsonl_records(stream: Iterable[str], prompt_field: str) -> Iterator[tuple[dict[str, object], str]]:
+    """Yield ``(record, prompt)`` pairs from JSONL lines.
+
+    Each line is either a JSON string, read as ``{prompt_field: line}``, or an
+    object with a string ``prompt_field``. Blank lines are skipped.
+    """
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record: object = json.loads(line)
+        except json.JSONDecodeError as error:
+            msg = f"line {line_number}: invalid JSON ({error.msg})"
+            raise typer.BadParameter(msg) from error
+
+        if isinstance(record, str):
+            yield {prompt_field: record}, record
+            continue
+
+        prompt = cast("dict[str, object]", record).get(prompt_field) if isinstance(record, dict) else None
+        if not isinstance(prompt, str):
+            msg = f"line {line_number}: expected a JSON string or an object with a string {prompt_field!r}"
+            raise typer.BadParameter(msg)
+        yield cast("dict[str, object]", record), prompt
+
+
+def _read_csv_records(stream: Iterable[str], prompt_field: str) -> Iterator[tuple[dict[str, object], str]]:
+    """Yield ``(row, prompt)`` pairs from a CSV file with a header row."""
+    reader = csv.DictReader(stream)
+    if reader.fieldnames is None or prompt_field not in reader.fieldnames:
+        msg = f"CSV header has no {prompt_field!r} column"
+        raise typer.BadParameter(msg)
+    for row in reader:
+        prompt = row[prompt_field]
+        if prompt is None:
+            msg = f"line {reader.line_num}: missing {prompt_field!r} value"
+            raise typer.BadParameter(msg)
+        yield cast("dict[str, object]", row), prompt
+
+
+def _read_prompts(stream: Iterable[str]) -> Iterator[tuple[object, str]]:
+    """Yield ``(id, prompt)`` pairs from JSONL lines with an optional ``id`` key."""
+    for record, prompt in _read_jsonl_records(stream, "prompt"):
+        yield record.get("id"), prompt
+
+
+def _check_batch_options(
+    input_file: Path | None,
+    *,
+    start: int,
+    async_job: bool,
+    pack: int,
+    job_file: Path | None,
+) -> None:
+    if start and input_file is None:
+        msg = "--start requires an input file"
+        raise typer.BadParameter(msg)
+    if async_job and pack > 1:
+        msg = "--pack cannot be combined with --async-job"
+        raise typer.BadParameter(msg)
+    if job_file is not None and not async_job:
+        msg = "--job-file requires --async-job"
+        raise typer.BadParameter(msg)
+
+
+def _open_prompts(stack: ExitStack, input_file: Path | None, start: int) -> Iterable[str]:
+    """Return the lines of ``input_file`` (or stdin) from prompt ``start``, seeking through the line index."""
+    if not start:
+        return stack.enter_context(input_file.open(encoding="utf-8")) if input_file else sys.stdin
+    from gramregex.line_index import LineIndex
+
+    return stack.enter_context(LineIndex(cast("Path", input_file))).lines(start)
+
+
+def _split_ids(records: Iterable[tuple[object, str]], ids: deque[object]) -> Iterator[str]:
+    for record_id, prompt in records:
+        ids.append(record_id)
+        yield prompt
+
+
+@app.command(name="batch")
+def batch(
+    input_file: Annotated[
         Path | None,
-        typer.Option(
-            "--grammar-file",
-            "-f",
+        typer.Argument(
             exists=True,
             file_okay=True,
             dir_okay=False,
             readable=True,
-            help="CFGファイルのパス",
+            help="1行1件のプロンプトを記述した JSONL ファイル (省略時は標準入力)",
         ),
     ] = None,
-    model: Annotated[str | None, typer.Option("--model", help="上書きするモデル名")] = None,
-    grammar_syntax: Annotated[
-        Literal["lark", "regex"],
+    *,
+    grammar: GrammarOption = None,
+    grammar_file: GrammarFileOption = None,
+    model: ModelOption = None,
+    grammar_syntax: GrammarSyntaxOption = "lark",
+    verbosity: VerbosityOption = None,
+    reasoning_effort: ReasoningEffortOption = None,
+    instructions: InstructionsOption = None,
+    instructions_file: InstructionsFileOption = None,
+    max_in_flight: MaxInFlightOption = DEFAULT_MAX_IN_FLIGHT,
+    pack: PackOption = 1,
+    cache: CacheOption = None,
+    cache_dir: CacheDirOption = None,
+    validate: ValidateOption = False,
+    route: RouteOption = None,
+    async_job: Annotated[
+        bool,
+        typer.Option(
+            "--async-job",
+            help="OpenAI Batch API のジョブとして投入し、完了 (最大 24 時間) を待って結果を出力する",
+        ),
+    ] = False,
+    poll_interval: Annotated[
+        float,
+        typer.Option("--poll-interval", min=0, help="--async-job のジョブ状態を確認する間隔 (秒)"),
+    ] = 30.0,
+    job_file: Annotated[
+        Path | None,
         typer.Option(
-            "--grammar-syntax",
-            help="grammar ツールの syntax (lark もしくは regex)",
-            show_default=True,
+            "--job-file",
+            dir_okay=False,
+            help="--async-job のジョブ ID を記録するファイル。中断後に同じ入力で再実行するとそのジョブに再接続する",
         ),
-    ] = "lark",
-    verbosity: Annotated[
-        Literal["low", "medium", "high"] | None,
-        typer.Option("--verbosity", help="応答の詳細度 (low/medium/high)"),
     ] = None,
-    reasoning_effort: Annotated[
-        Literal["minimal", "medium", "high"] | None,
-        typer.Option("--reasoning-effort", help="推論ステップの強度 (minimal/medium/high)"),
+    start: Annotated[
+        int,
+        typer.Option("--start", min=0, help="0 始まりで START 件目のプロンプトから処理する (入力ファイルが必要)"),
+    ] = 0,
+    limit: Annotated[
+        int | None,
+        typer.Option("--limit", min=0, help="処理するプロンプトの最大件数"),
     ] = None,
 ) -> None:
-    """Generate output constrained by the given CFG grammar."""
-    settings = get_settings()
+    """Generate outputs for JSONL prompts concurrently and print JSONL results in input order.
+
+    ``--start`` seeks straight to a prompt through the file's line index, so a
+    slice of a large file is processed without reading what comes before it.
+    """
+    from gramregex.api import iter_generate_batch_job, iter_generate_many
+    from gramregex.cache import get_response_cache, with_cache_options
+    from gramregex.settings import get_settings
+
+    _check_route(route)
+    _check_batch_options(input_file, start=start, async_job=async_job, pack=pack, job_file=job_file)
+    settings = with_cache_options(get_settings(), enabled=cache, directory=cache_dir)
+    if route is not None:
+        settings = settings.model_copy(update={"route": route})
+    ids: deque[object] = deque()
+    failures = 0
+    options: dict[str, Any] = {
+        "grammar": grammar,
+        "grammar_file": grammar_file,
+        "grammar_syntax": grammar_syntax,
+        "verbosity": verbosity,
+        "reasoning_effort": reasoning_effort,
+        "instructions": _load_instructions(instructions, instructions_file),
+        "model": model,
+        "settings": settings,
+        "validate": validate,
+    }
+    with ExitStack() as stack:
+        try:
+            prompts = _split_ids(islice(_read_prompts(_open_prompts(stack, input_file, start)), limit), ids)
+            if async_job:
+                items = iter_generate_batch_job(
+                    prompts,
+                    poll_interval=poll_interval,
+                    on_status=lambda message: typer.echo(message, err=True),
+                    job_file=job_file,
+                    **options,
+                )
+            else:
+                items = iter_generate_many(prompts, max_in_flight=max_in_flight, pack_size=pack, **options)
+        except ValueError as error:
+            raise typer.BadParameter(str(error)) from error
+
+        for item in items:
+            result: dict[str, object] = {"index": start + item.index}
+            record_id = ids.popleft()
+            if record_id is not None:
+                result["id"] = record_id
+            if item.error is None:
+                result["output"] = item.output
+            else:
+                failures += 1
+                result["error"] = str(item.error)
+            typer.echo(json.dumps(result, ensure_ascii=False))
+
+    response_cache = None if async_job else get_response_cache(settings)
+    if response_cache is not None:
+        stats = response_cache.stats
+        typer.echo(f"cache: {stats.hits} hit(s), {stats.misses} miss(es)", err=True)
+
+    if failures:
+        typer.echo(f"{failures} prompt(s) failed", err=True)
+        raise typer.Exit(code=1)
+
+
+def _checkpoint_for(output_file: Path) -> "Checkpoint":
+    from gramregex.checkpoint import Checkpoint
+
+    return Checkpoint(output_file.with_name(f"{output_file.name}.checkpoint"))
+
+
+def _load_progress(checkpoint: "Checkpoint | None", output_file: Path | None) -> "Progress | None":
+    if checkpoint is None or output_file is None:
+        msg = "--resume requires --output"
+        raise typer.BadParameter(msg)
     try:
-        cfg = load_grammar(grammar, grammar_file, config_path=settings.grammar_config_path)
+        progress = checkpoint.load()
+    except ValueError as error:
+        raise typer.BadParameter(str(error)) from error
+    if progress is None and output_file.exists() and output_file.stat().st_size:
+        msg = f"No checkpoint found for {output_file}; run without --resume to start over"
+        raise typer.BadParameter(msg)
+    return progress
+
+
+def _input_range(
+    raw: BinaryIO,
+    input_format: Literal["jsonl", "csv"],
+    shard: tuple[int, int] | None,
+) -> tuple[str, int, int]:
+    """Read the CSV header, if any, and return it with the byte range of the records to process."""
+    from gramregex.sharding import shard_range
+
+    header = raw.readline().decode("utf-8") if input_format == "csv" else ""
+    quote = b'"' if input_format == "csv" else None
+    begin, end = shard_range(raw, *(shard or (0, 1)), start=len(header.encode("utf-8")), quote=quote)
+    raw.seek(begin)
+    return header, begin, end
+
+
+def _write_results(
+    items: Iterable[BatchItem],
+    pending: deque[object],
+    output: TextIO,
+    checkpoint: "Checkpoint | None",
+    progress: "Progress",
+) -> tuple["Progress", int]:
+    """Write each record with its output, checkpointing progress; return the final progress and failure count."""
+    from gramregex.checkpoint import Progress
+
+    failures = 0
+    try:
+        for item in items:
+            record, offset = cast("tuple[dict[str, object], int]", pending.popleft())
+            result = dict(record)
+            if item.error is None:
+                result["output"] = item.output
+            else:
+                failures += 1
+                result["error"] = str(item.error)
+            line = json.dumps(result, ensure_ascii=False) + "\n"
+            output.write(line)
+            progress = Progress(progress.records + 1, offset, progress.output_offset + len(line.encode("utf-8")))
+            if checkpoint is not None and checkpoint.due():
+                output.flush()
+                checkpoint.save(progress)
+    finally:
+        if checkpoint is not None:
+            output.flush()
+            checkpoint.save(progress)
+    return progress, failures
+
+
+def _run_map(
+    input_file: Path,
+    output_file: Path | None,
+    progress: "Progress | None",
+    *,
+    input_format: Literal["jsonl", "csv"],
+    prompt_field: str,
+    shard: tuple[int, int] | None,
+    settings: "Settings",
+    generation: dict[str, Any],
+) -> tuple["Progress", int, int]:
+    """Map the records of ``input_file``, or of one shard of it, resuming from ``progress``.
+
+    Runs in worker processes for ``--workers``, so it takes only picklable
+    arguments. Returns the final progress, the records written by this run and
+    how many of them failed.
+    """
+    from gramregex.api import iter_generate_many
+    from gramregex.checkpoint import LineReader, Progress, truncate
+
+    read_records = _read_csv_records if input_format == "csv" else _read_jsonl_records
+    checkpoint = _checkpoint_for(output_file) if output_file else None
+    with ExitStack() as stack:
+        raw = stack.enter_context(input_file.open("rb"))
+        header, begin, end = _input_range(raw, input_format, shard)
+        if progress is not None:
+            typer.echo(f"resuming after {progress.records} record(s)", err=True)
+            raw.seek(progress.input_offset)
+            try:
+                truncate(cast("Path", output_file), progress.output_offset)
+            except ValueError as error:
+                raise typer.BadParameter(str(error)) from error
+        reader = LineReader(raw, end=end)
+        lines = chain([header], reader) if header else reader
+        output: TextIO = (
+            stack.enter_context(output_file.open("a" if progress else "w", encoding="utf-8", newline=""))
+            if output_file
+            else sys.stdout
+        )
+        start = progress or Progress(records=0, input_offset=begin, output_offset=0)
+        # Each record is queued with the input offset just past it, to checkpoint once it is written.
+        pending: deque[object] = deque()
+        records = (((record, reader.offset), prompt) for record, prompt in read_records(lines, prompt_field))
+        try:
+            items = iter_generate_many(_split_ids(records, pending), settings=settings, **generation)
+        except ValueError as error:
+            raise typer.BadParameter(str(error)) from error
+
+        current, failures = _write_results(items, pending, output, checkpoint, start)
+    return current, current.records - start.records, failures
+
+
+def _process_pool(workers: int) -> "Executor":
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Spawned rather than forked: each worker builds its own settings, HTTP client pool and caches.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _run_workers(
+    job: Callable[..., tuple["Progress", int, int]],
+    output_file: Path,
+    parts: list[tuple[Path, "Progress | None", tuple[int, int]]],
+    end: int,
+) -> tuple[int, int]:
+    """Run ``job`` for every part in its own process, then concatenate the parts into ``output_file``.
+
+    ``end`` is the input offset the parts cover up to. The merged checkpoint,
+    which marks the run as complete for ``--resume``, is only written once
+    every part has finished; a stale one is removed first, so a run in which
+    a worker fails is resumed from the parts' own checkpoints.
+    """
+    from gramregex.checkpoint import Progress
+
+    merged = _checkpoint_for(output_file)
+    merged.path.unlink(missing_ok=True)
+    with _process_pool(len(parts)) as pool:
+        futures = [pool.submit(job, path, progress, shard=shard) for path, progress, shard in parts]
+        results = [future.result() for future in futures]
+
+    with output_file.open("wb") as output:
+        for path, _, _ in parts:
+            with path.open("rb") as part:
+                shutil.copyfileobj(part, output)
+        size = output.tell()
+    merged.save(Progress(sum(progress.records for progress, _, _ in results), end, size))
+    for path, _, _ in parts:
+        _checkpoint_for(path).path.unlink(missing_ok=True)
+        path.unlink()
+    return sum(written for _, written, _ in results), sum(failures for _, _, failures in results)
+
+
+def _map_complete(output_file: Path, end: int) -> bool:
+    """Return whether a ``--workers`` run into ``output_file`` already covers its input range up to ``end``."""
+    # Read directly: the merged output of an earlier run may remain without its checkpoint.
+    try:
+        progress = _checkpoint_for(output_file).load()
+    except ValueError as error:
+        raise typer.BadParameter(str(error)) from error
+    return progress is not None and progress.input_offset >= end
+
+
+@app.command(name="map")
+def map_records(
+    input_file: Annotated[
+        Path,
+        typer.Argument(
+            exists=True,
+            file_okay=True,
+            dir_okay=False,
+            readable=True,
+            help="プロンプトを含む JSONL もしくは CSV (ヘッダ行付き) ファイル",
+        ),
+    ],
+    *,
+    output_file: Annotated[
+        Path | None,
+        typer.Option("--output", "-o", dir_okay=False, help="結果を書き出す JSONL ファイル (省略時は標準出力)"),
+    ] = None,
+    input_format: Annotated[
+        Literal["jsonl", "csv"] | None,
+        typer.Option("--format", help="入力形式 (省略時は拡張子から判定し、.csv 以外は jsonl)"),
+    ] = None,
+    prompt_field: Annotated[
+        str,
+        typer.Option("--prompt-field", help="プロンプトとして使うキーもしくは列の名前"),
+    ] = "prompt",
+    grammar: GrammarOption = None,
+    grammar_file: GrammarFileOption = None,
+    model: ModelOption = None,
+    grammar_syntax: GrammarSyntaxOption = "lark",
+    verbosity: VerbosityOption = None,
+    reasoning_effort: ReasoningEffortOption = None,
+    instructions: InstructionsOption = None,
+    instructions_file: InstructionsFileOption = None,
+    max_in_flight: MaxInFlightOption = DEFAULT_MAX_IN_FLIGHT,
+    pack: PackOption = 1,
+    cache: CacheOption = None,
+    cache_dir: CacheDirOption = None,
+    validate: ValidateOption = False,
+    route: RouteOption = None,
+    resume: Annotated[
+        bool,
+        typer.Option("--resume", help="中断した実行を --output の進捗ファイルから再開する"),
+    ] = False,
+    shard: Annotated[
+        str | None,
+        typer.Option("--shard", help="入力をバイト位置で k 等分したうちの i 番目 (i/k, 1 始まり) だけを処理する"),
+    ] = None,
+    workers: Annotated[
+        int,
+        typer.Option("--workers", min=1, help="入力を分割して並列に処理するプロセス数 (--output が必要)"),
+    ] = 1,
+) -> None:
+    """Stream records from a JSONL/CSV file through the generator and write each with its output as JSONL.
+
+    Records are read lazily and written as soon as they complete (in input
+    order), so memory use stays constant however large the input is. With
+    ``--output`` progress is journaled next to the output file, and
+    ``--resume`` continues an interrupted run from there. ``--shard`` and
+    ``--workers`` split the input by byte offset across machines and
+    processes.
+    """
+    from gramregex.cache import with_cache_options
+    from gramregex.settings import get_settings
+    from gramregex.sharding import parse_shard, split_shard
+
+    _check_route(route)
+    try:
+        selected = parse_shard(shard) if shard else None
     except ValueError as error:
         raise typer.BadParameter(str(error)) from error
-    if model:
-        settings = settings.model_copy(update={"openai_model": model})
-
-    client = create_llm_client(settings)
-    output = client.generate(
-        input_text,
-        grammar=cfg,
-        grammar_syntax=grammar_syntax,
-        verbosity=verbosity,
-        reasoning_effort=reasoning_effort,
+    if input_format is None:
+        input_format = "csv" if input_file.suffix.lower() == ".csv" else "jsonl"
+    progress: Progress | None = None
+    parts: list[tuple[Path, Progress | None, tuple[int, int]]] = []
+    end = 0
+    if workers > 1:
+        if output_file is None:
+            msg = "--workers requires --output"
+            raise typer.BadParameter(msg)
+        with input_file.open("rb") as raw:
+            _, _, end = _input_range(raw, input_format, selected)
+        if resume and _map_complete(output_file, end):
+            typer.echo("0 record(s) written", err=True)
+            return
+        paths = [output_file.with_name(f"{output_file.name}.part{part}") for part in range(workers)]
+        parts = [
+            (path, _load_progress(_checkpoint_for(path), path) if resume else None, part_shard)
+            for path, part_shard in zip(paths, split_shard(*(selected or (0, 1)), workers), strict=True)
+        ]
+    elif resume:
+        progress = _load_progress(_checkpoint_for(output_file) if output_file else None, output_file)
+    settings = with_cache_options(get_settings(), enabled=cache, directory=cache_dir)
+    if route is not None:
+        settings = settings.model_copy(update={"route": route})
+    job = partial(
+        _run_map,
+        input_file,
+        input_format=input_format,
+        prompt_field=prompt_field,
+        settings=settings,
+        generation={
+            "grammar": grammar,
+            "grammar_file": grammar_file,
+            "grammar_syntax": grammar_syntax,
+            "verbosity": verbosity,
+            "reasoning_effort": reasoning_effort,
+            "instructions": _load_instructions(instructions, instructions_file),
+            "model": model,
+            "max_in_flight": max_in_flight,
+            "pack_size": pack,
+            "validate": validate,
+        },
     )
-    typer.echo(output)
+
+    if workers > 1:
+        written, failures = _run_workers(job, cast("Path", output_file), parts, end)
+    else:
+        _, written, failures = job(output_file, progress, shard=selected)
+
+    typer.echo(f"{written} record(s) written", err=True)
+    if failures:
+        typer.echo(f"{failures} record(s) failed", err=True)
+        raise typer.Exit(code=1)
+
+
+@app.command(name="serve")
+def serve(
+    socket_path: Annotated[
+        Path | None,
+        typer.Option("--socket", help="待ち受ける Unix ソケットのパス (省略時は GRAMREGEX_SOCKET もしくは既定の場所)"),
+    ] = None,
+) -> None:
+    """Keep settings, grammars and HTTP connections warm and serve generate requests on a Unix socket."""
+    from gramregex import daemon
+
+    path = socket_path or daemon.default_socket_path()
+    typer.echo(f"gramregex daemon listening on {path}", err=True)
+    try:
+        daemon.serve(path)
+    except ValueError as error:
+        raise typer.BadParameter(str(error)) from error
+    except KeyboardInterrupt:
+        pass
 
 
 def main() -> None:
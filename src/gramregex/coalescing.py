@@ -0,0 +1,324 @@
+"""Coalescing of concurrent identical requests ("singleflight").
+
+When several threads or tasks send the same request (model, prompt, grammar
+and options) to the same backend with the same credentials while one is
+already in flight, only the first reaches the provider; the others wait for
+it and receive its result or error. Requests are coalesced only while in
+flight; completed results are kept by the response cache, not here.
+Coalescing is opt-in (``coalesce_requests``).
+"""
+
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable, Hashable, Iterator
+from concurrent.futures import Future
+from typing import TypeVar, cast
+from weakref import WeakKeyDictionary
+
+from gramregex.cache import cache_key
+from gramregex.instrumentation import record_coalesced
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+from gramregex.llm.factory import client_key
+from gramregex.settings import Settings
+
+_T = TypeVar("_T")
+
+
+class SingleFlight:
+    """Thread-safe registry running one call per key at a time."""
+
+    def __init__(self) -> None:
+        """Create an empty registry."""
+        self._calls: dict[Hashable, Future[object]] = {}
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, call: Callable[[], _T]) -> _T:
+        """Run ``call``, or wait for the call already running under ``key`` and share its outcome."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if future is None:
+                future = self._calls[key] = Future()
+        if not leader:
+            record_coalesced()
+            return cast("_T", future.result())
+
+        try:
+            result = call()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        """Return the number of calls in flight."""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Event-loop counterpart of ``SingleFlight``; calls are tracked per loop."""
+
+    def __init__(self) -> None:
+        """Create an empty registry."""
+        self._calls: WeakKeyDictionary[asyncio.AbstractEventLoop, dict[Hashable, asyncio.Future[object]]] = (
+            WeakKeyDictionary()
+        )
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[_T]]) -> _T:
+        """Await ``call``, or the call already running under ``key`` on this loop.
+
+        The shared call runs as its own task, so a waiter being cancelled does
+        not cancel it for the others.
+        """
+        calls = self._calls.setdefault(asyncio.get_running_loop(), {})
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            calls[key] = cast("asyncio.Future[object]", task)
+            task.add_done_callback(lambda done: calls.pop(key) if calls.get(key) is done else None)
+        else:
+            record_coalesced()
+        return cast("_T", await asyncio.shield(task))
+
+
+class CoalescingLLMClient(LLMClient):
+    """LLM client wrapper sending concurrent identical requests once.
+
+    Streams are passed through: their deltas cannot be shared after the fact.
+    """
+
+    def __init__(self, client: LLMClient, flight: SingleFlight, *, model: str, scope: Hashable) -> None:
+        """Wrap ``client`` whose requests target ``model``, coalescing through ``flight``.
+
+        Only requests with equal ``scope``, which identifies the backend and
+        credentials behind ``client``, are coalesced.
+        """
+        self._client = client
+        self._flight = flight
+        self._model = model
+        self._scope = scope
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output, joining an identical request in flight."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return self._flight.run(
+            ("generate", self._scope, key),
+            lambda: self._client.generate(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ),
+        )
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result, joining an identical request in flight (whose usage it reports)."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return self._flight.run(
+            ("generate_result", self._scope, key),
+            lambda: self._client.generate_result(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ),
+        )
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Stream from the wrapped client without coalescing."""
+        return self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+
+
+class AsyncCoalescingLLMClient(AsyncLLMClient):
+    """Async counterpart of ``CoalescingLLMClient``."""
+
+    def __init__(self, client: AsyncLLMClient, flight: AsyncSingleFlight, *, model: str, scope: Hashable) -> None:
+        """Wrap ``client`` whose requests target ``model``, coalescing through ``flight`` within ``scope``."""
+        self._client = client
+        self._flight = flight
+        self._model = model
+        self._scope = scope
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output, joining an identical request in flight."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return await self._flight.run(
+            ("generate", self._scope, key),
+            lambda: self._client.generate(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ),
+        )
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result, joining an identical request in flight (whose usage it reports)."""
+        key = cache_key(
+            self._model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return await self._flight.run(
+            ("generate_result", self._scope, key),
+            lambda: self._client.generate_result(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ),
+        )
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream from the wrapped client without coalescing."""
+        return self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+
+
+# Shared by every client of the process so that separate ``api.generate`` calls coalesce.
+_flight = SingleFlight()
+_async_flight = AsyncSingleFlight()
+
+
+def coalesced_client(client: LLMClient, settings: Settings) -> LLMClient:
+    """Wrap ``client`` so concurrent identical requests are sent once, when enabled by ``settings``.
+
+    Requests are scoped by ``client_key(settings)``, so callers with different
+    credentials, endpoints or transport settings never share a result.
+    """
+    if not settings.coalesce_requests:
+        return client
+    return CoalescingLLMClient(client, _flight, model=settings.openai_model, scope=client_key(settings))
+
+
+def coalesced_async_client(client: AsyncLLMClient, settings: Settings) -> AsyncLLMClient:
+    """Async counterpart of ``coalesced_client``."""
+    if not settings.coalesce_requests:
+        return client
+    return AsyncCoalescingLLMClient(client, _async_flight, model=settings.openai_model, scope=client_key(settings))
+
+
+__all__ = [
+    "AsyncCoalescingLLMClient",
+    "AsyncSingleFlight",
+    "CoalescingLLMClient",
+    "SingleFlight",
+    "coalesced_async_client",
+    "coalesced_client",
+]
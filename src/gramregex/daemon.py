@@ -0,0 +1,321 @@
+"""Warm generation daemon reachable over a Unix socket.
+
+``gramregex serve`` keeps settings, cached grammars and pooled HTTP clients
+alive in one process. ``gramregex generate`` forwards to it when the socket
+exists, so each invocation costs a local round trip instead of interpreter
+start-up, settings validation and a TLS handshake.
+
+The protocol is one JSON request line per connection, answered by JSON
+lines: ``{"delta": ...}`` while streaming, then ``{"output": ...}`` (or
+``{"end": true}`` after a stream, ``{"result": ...}`` for ``json`` requests)
+or ``{"error": ..., "kind": ...}``.
+
+Requests carry a fingerprint of the environment the client would load its
+settings from; a daemon started with different settings (another API key,
+base URL, model or grammar config) refuses the request so the client runs it
+locally instead of silently using the daemon's configuration.
+
+This module only needs the standard library at import time so forwarding
+stays cheap; the generation stack is imported by the server.
+"""
+
+import getpass
+import hashlib
+import itertools
+import json
+import os
+import signal
+import socket
+import socketserver
+import tempfile
+from collections.abc import Iterator, Mapping
+from dataclasses import asdict
+from pathlib import Path
+from types import FrameType
+from typing import TYPE_CHECKING, Any, cast
+
+if TYPE_CHECKING:
+    from gramregex.settings import Settings
+
+SOCKET_ENV = "GRAMREGEX_SOCKET"
+
+ERROR_PARAMETER = "parameter"
+ERROR_VALIDATION = "validation"
+ERROR_GENERATION = "generation"
+ERROR_SETTINGS = "settings"
+
+# Request keys forwarded to the generation API unchanged.
+_GENERATION_OPTIONS = ("grammar_syntax", "verbosity", "reasoning_effort", "instructions", "model", "validate")
+# Environment variables settings are read from, as ``settings.settings_env_names()`` returns them (the
+# tests keep the two equal; importing the settings here would cost forwarding the pydantic start-up).
+_SETTINGS_ENV_NAMES = frozenset(
+    {
+        "BALANCING_STRATEGY",
+        "CACHE_DIR",
+        "CACHE_ENABLED",
+        "CACHE_MAX_BYTES",
+        "CACHE_MAX_ENTRIES",
+        "CACHE_TTL",
+        "CIRCUIT_FAILURE_THRESHOLD",
+        "CIRCUIT_RESET_TIMEOUT",
+        "COALESCE_REQUESTS",
+        "GRAMREGEX_BALANCING_STRATEGY",
+        "GRAMREGEX_CACHE_DIR",
+        "GRAMREGEX_CACHE_ENABLED",
+        "GRAMREGEX_CACHE_MAX_BYTES",
+        "GRAMREGEX_CACHE_MAX_ENTRIES",
+        "GRAMREGEX_CACHE_TTL",
+        "GRAMREGEX_CIRCUIT_FAILURE_THRESHOLD",
+        "GRAMREGEX_CIRCUIT_RESET_TIMEOUT",
+        "GRAMREGEX_COALESCE",
+        "GRAMREGEX_CONFIG",
+        "GRAMREGEX_CONFIG_PATH",
+        "GRAMREGEX_ENDPOINTS",
+        "GRAMREGEX_HEDGE_BASE_URL",
+        "GRAMREGEX_HEDGE_INITIAL_DELAY",
+        "GRAMREGEX_HEDGE_MAX_WORKERS",
+        "GRAMREGEX_HEDGE_MODEL",
+        "GRAMREGEX_HEDGE_PERCENTILE",
+        "GRAMREGEX_OPENAI_KEEPALIVE_EXPIRY",
+        "GRAMREGEX_OPENAI_MAX_CONNECTIONS",
+        "GRAMREGEX_OPENAI_MAX_KEEPALIVE_CONNECTIONS",
+        "GRAMREGEX_OPENAI_TIMEOUT",
+        "GRAMREGEX_RATE_LIMIT_RPM",
+        "GRAMREGEX_RATE_LIMIT_TPM",
+        "GRAMREGEX_RETRY_BASE_DELAY",
+        "GRAMREGEX_RETRY_MAX_ATTEMPTS",
+        "GRAMREGEX_RETRY_MAX_DELAY",
+        "GRAMREGEX_ROUTE",
+        "HEDGE_BASE_URL",
+        "HEDGE_INITIAL_DELAY",
+        "HEDGE_MAX_WORKERS",
+        "HEDGE_MODEL",
+        "HEDGE_PERCENTILE",
+        "OPENAI_API_KEY",
+        "OPENAI_BASE_URL",
+        "OPENAI_ENDPOINTS",
+        "OPENAI_KEEPALIVE_EXPIRY",
+        "OPENAI_MAX_CONNECTIONS",
+        "OPENAI_MAX_KEEPALIVE_CONNECTIONS",
+        "OPENAI_MODEL",
+        "OPENAI_TIMEOUT",
+        "PROVIDER",
+        "RATE_LIMIT_RPM",
+        "RATE_LIMIT_TPM",
+        "RETRY_BASE_DELAY",
+        "RETRY_MAX_ATTEMPTS",
+        "RETRY_MAX_DELAY",
+        "ROUTE",
+    },
+)
+# Prefixes of variables read elsewhere: the OpenAI SDK's own and future settings. The socket path only selects
+# the daemon.
+_SETTINGS_ENV_PREFIXES = ("GRAMREGEX_", "OPENAI_")
+_CONFIG_ENV = ("GRAMREGEX_CONFIG_PATH", "GRAMREGEX_CONFIG")
+
+
+class DaemonUnavailableError(ConnectionError):
+    """Raised when no daemon is listening on the socket."""
+
+
+def default_socket_path() -> Path:
+    """Return the socket path from ``GRAMREGEX_SOCKET`` or a per-user runtime location."""
+    configured = os.environ.get(SOCKET_ENV)
+    if configured:
+        return Path(configured)
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "gramregex.sock"
+    return Path(tempfile.gettempdir()) / f"gramregex-{getpass.getuser()}.sock"
+
+
+def settings_fingerprint(environ: Mapping[str, str] | None = None, directory: Path | None = None) -> str:
+    """Return a digest of the environment variables and ``.env`` file settings are loaded from.
+
+    The working directory is included when it affects the settings: when it
+    holds a ``.env`` file or the grammar config path is relative.
+    """
+    environ = os.environ if environ is None else environ
+    directory = Path.cwd() if directory is None else directory
+    variables = sorted(
+        (name.upper(), value)
+        for name, value in environ.items()
+        if (name.upper() in _SETTINGS_ENV_NAMES or name.upper().startswith(_SETTINGS_ENV_PREFIXES))
+        and name.upper() != SOCKET_ENV
+    )
+    env_file = directory / ".env"
+    digest = hashlib.sha256(json.dumps(variables).encode("utf-8"))
+    if env_file.is_file():
+        digest.update(env_file.read_bytes())
+    if env_file.is_file() or any(not Path(value).is_absolute() for name, value in variables if name in _CONFIG_ENV):
+        digest.update(str(directory.absolute()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _encode(message: Mapping[str, object]) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def _connect(path: Path) -> socket.socket:
+    if not hasattr(socket, "AF_UNIX") or not path.exists():
+        msg = f"No gramregex daemon at {path}"
+        raise DaemonUnavailableError(msg)
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(str(path))
+    except OSError as exc:
+        connection.close()
+        msg = f"No gramregex daemon at {path}"
+        raise DaemonUnavailableError(msg) from exc
+    return connection
+
+
+def request(message: Mapping[str, object], socket_path: Path | None = None) -> Iterator[dict[str, Any]]:
+    """Send ``message`` to the daemon and yield its response lines.
+
+    Raises ``DaemonUnavailableError`` before yielding anything when no daemon
+    is listening or it refuses the request's settings fingerprint, so callers
+    can fall back to running locally.
+    """
+    connection = _connect(socket_path or default_socket_path())
+    responses = _responses(connection, message)
+    first = next(responses, None)
+    if first is None:
+        return iter(())
+    if first.get("kind") == ERROR_SETTINGS:
+        responses.close()
+        raise DaemonUnavailableError(first["error"])
+    return itertools.chain((first,), responses)
+
+
+def _responses(connection: socket.socket, message: Mapping[str, object]) -> Iterator[dict[str, Any]]:
+    with connection, connection.makefile("rb") as reader:
+        connection.sendall(_encode(message))
+        connection.shutdown(socket.SHUT_WR)
+        for line in reader:
+            yield cast("dict[str, Any]", json.loads(line))
+
+
+def _handle(message: dict[str, Any], settings: "Settings") -> Iterator[dict[str, object]]:
+    from gramregex import api
+    from gramregex.cache import with_cache_options
+    from gramregex.grammar import load_grammar
+    from gramregex.validator import GrammarValidationError
+
+    active_settings = with_cache_options(
+        settings,
+        enabled=message.get("cache"),
+        directory=Path(message["cache_dir"]) if message.get("cache_dir") else None,
+    )
+    if message.get("route"):
+        active_settings = active_settings.model_copy(update={"route": message["route"]})
+    grammar_file = message.get("grammar_file")
+    try:
+        cfg = load_grammar(
+            message.get("grammar"),
+            Path(grammar_file) if grammar_file else None,
+            config_path=active_settings.grammar_config_path,
+        )
+    except (OSError, ValueError) as error:
+        yield {"error": str(error), "kind": ERROR_PARAMETER}
+        return
+
+    prompt = str(message.get("prompt", ""))
+    options: dict[str, Any] = {key: message[key] for key in _GENERATION_OPTIONS if message.get(key) is not None}
+    try:
+        if message.get("stream"):
+            for delta in api.generate_stream(prompt, grammar=cfg, settings=active_settings, **options):
+                yield {"delta": delta}
+            yield {"end": True}
+        elif message.get("json"):
+            yield {"result": asdict(api.generate_result(prompt, grammar=cfg, settings=active_settings, **options))}
+        else:
+            yield {"output": api.generate(prompt, grammar=cfg, settings=active_settings, **options)}
+    except GrammarValidationError as error:
+        yield {"error": str(error), "kind": ERROR_VALIDATION}
+    except Exception as error:  # reported to the client instead of killing the handler thread
+        yield {"error": f"{type(error).__name__}: {error}", "kind": ERROR_GENERATION}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "GenerationServer"
+
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line.strip():
+            return
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as error:
+            self.wfile.write(_encode({"error": f"invalid request: {error.msg}", "kind": ERROR_PARAMETER}))
+            return
+        if message.get("fingerprint") not in {None, self.server.fingerprint}:
+            self.wfile.write(_encode({"error": "daemon settings differ from the client's", "kind": ERROR_SETTINGS}))
+            return
+        for response in _handle(message, self.server.settings):
+            self.wfile.write(_encode(response))
+            self.wfile.flush()
+
+
+class GenerationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server answering generation requests with warm state."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, settings: "Settings", *, fingerprint: str | None = None) -> None:
+        """Bind ``socket_path`` (replacing a stale socket) readable only by the current user.
+
+        Requests whose fingerprint differs from ``fingerprint`` (by default
+        that of this process's environment) are refused.
+        """
+        self.settings = settings
+        self.fingerprint = settings_fingerprint() if fingerprint is None else fingerprint
+        self.socket_path = socket_path
+        if socket_path.exists():
+            try:
+                _connect(socket_path).close()
+            except DaemonUnavailableError:
+                socket_path.unlink()
+            else:
+                msg = f"A gramregex daemon is already listening on {socket_path}"
+                raise ValueError(msg)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(socket_path), _RequestHandler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self) -> None:
+        """Close the listening socket and remove its file."""
+        super().server_close()
+        self.socket_path.unlink(missing_ok=True)
+
+
+def _exit_on_signal(signum: int, _frame: FrameType | None) -> None:
+    raise SystemExit(128 + signum)
+
+
+def serve(socket_path: Path | None = None, settings: "Settings | None" = None) -> None:
+    """Serve generation requests on ``socket_path`` until interrupted."""
+    from gramregex.llm.factory import close_llm_clients
+    from gramregex.settings import get_settings
+
+    server = GenerationServer(socket_path or default_socket_path(), settings or get_settings())
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        close_llm_clients()
+
+
+__all__ = [
+    "SOCKET_ENV",
+    "DaemonUnavailableError",
+    "GenerationServer",
+    "default_socket_path",
+    "request",
+    "serve",
+    "settings_fingerprint",
+]
@@ -1,24 +1,161 @@
 """Grammar utilities shared between CLI and library API."""
 
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, TypeVar, cast
 
-from gramregex.config import load_grammar_config
+from gramregex.llm.base import GrammarSyntax
+from gramregex.validator import GrammarValidator, compile_validator
 
+if TYPE_CHECKING:
+    from gramregex.config import GrammarConfig
 
-def load_grammar(grammar: str | None, grammar_file: Path | None, *, config_path: Path | None) -> str:
+DEFAULT_CHECK_INTERVAL = 1.0
+DEFAULT_MAX_VALIDATORS = 64
+
+_T = TypeVar("_T")
+_DEFAULT_CONFIG_KEY = Path("<default>")
+
+
+@dataclass(slots=True)
+class _FileEntry:
+    value: Any
+    signature: tuple[int, int] | None
+    checked_at: float
+
+
+def _signature(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _read_config(config_path: Path | None) -> "GrammarConfig":
+    # YAML and Pydantic are only imported when a config is actually read.
+    from gramregex.config import load_grammar_config
+
+    return load_grammar_config(config_path)
+
+
+class GrammarRegistry:
+    """Process-wide cache of grammar files, configs and compiled validators.
+
+    Files are keyed by path and revalidated against their mtime and size at
+    most once per ``check_interval`` seconds, so repeated loads of the same
+    grammar within that window touch neither the filesystem nor the YAML
+    parser. Compiled validators are keyed by grammar content and syntax and
+    kept in a bounded LRU.
+    """
+
+    def __init__(
+        self,
+        *,
+        check_interval: float = DEFAULT_CHECK_INTERVAL,
+        max_validators: int = DEFAULT_MAX_VALIDATORS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create an empty registry."""
+        if max_validators < 1:
+            msg = "max_validators must be at least 1"
+            raise ValueError(msg)
+        self._check_interval = check_interval
+        self._max_validators = max_validators
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._files: dict[Path, _FileEntry] = {}
+        self._configs: dict[Path, _FileEntry] = {}
+        self._validators: OrderedDict[tuple[GrammarSyntax, str], GrammarValidator] = OrderedDict()
+
+    def _load(
+        self,
+        entries: dict[Path, _FileEntry],
+        path: Path,
+        loader: Callable[[], _T],
+        *,
+        watch: bool = True,
+    ) -> _T:
+        now = self._clock()
+        with self._lock:
+            entry = entries.get(path)
+        if entry is not None and (not watch or now - entry.checked_at < self._check_interval):
+            return cast("_T", entry.value)
+
+        signature = _signature(path) if watch and path.exists() else None
+        if entry is not None and signature is not None and entry.signature == signature:
+            entry.checked_at = now
+            return cast("_T", entry.value)
+
+        value = loader()
+        with self._lock:
+            entries[path] = _FileEntry(value, signature, now)
+        return value
+
+    def read_file(self, path: Path) -> str:
+        """Return the text of ``path``, re-reading it only after it changes."""
+        return self._load(self._files, path.absolute(), lambda: path.read_text(encoding="utf-8"))
+
+    def load_config(self, config_path: Path | None) -> "GrammarConfig":
+        """Return the grammar config at ``config_path`` (or the packaged default), cached like files."""
+        if config_path is None:
+            return self._load(self._configs, _DEFAULT_CONFIG_KEY, lambda: _read_config(None), watch=False)
+        return self._load(self._configs, config_path.absolute(), lambda: _read_config(config_path))
+
+    def validator(self, grammar: str, grammar_syntax: GrammarSyntax) -> GrammarValidator:
+        """Return the compiled validator for ``grammar``, compiling it on first use."""
+        key = (grammar_syntax, grammar)
+        with self._lock:
+            validator = self._validators.get(key)
+            if validator is not None:
+                self._validators.move_to_end(key)
+                return validator
+
+        validator = compile_validator(grammar, grammar_syntax)
+        with self._lock:
+            self._validators[key] = validator
+            while len(self._validators) > self._max_validators:
+                self._validators.popitem(last=False)
+        return validator
+
+    def clear(self) -> None:
+        """Forget every cached file, config and validator."""
+        with self._lock:
+            self._files.clear()
+            self._configs.clear()
+            self._validators.clear()
+
+
+_default_registry = GrammarRegistry()
+
+
+def get_grammar_registry() -> GrammarRegistry:
+    """Return the process-wide grammar registry."""
+    return _default_registry
+
+
+def load_grammar(
+    grammar: str | None,
+    grammar_file: Path | None,
+    *,
+    config_path: Path | None,
+    registry: GrammarRegistry | None = None,
+) -> str:
     """Load grammar content from direct input, file, or configured defaults."""
     if grammar and grammar_file:
         msg = "--grammar と --grammar-file は同時に指定できません"
         raise ValueError(msg)
 
+    active_registry = registry or _default_registry
     if grammar_file:
-        return grammar_file.read_text(encoding="utf-8")
+        return active_registry.read_file(grammar_file)
 
     if grammar:
         return grammar
 
-    config = load_grammar_config(config_path)
+    config = active_registry.load_config(config_path)
     return config.content
 
 
-__all__ = ["load_grammar"]
+__all__ = ["GrammarRegistry", "get_grammar_registry", "load_grammar"]
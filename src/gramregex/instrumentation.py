@@ -0,0 +1,645 @@
+"""Per-call instrumentation: stage timings, token usage, retries and cache hits.
+
+Each generation call produces one ``CallEvent``. The layers involved
+(grammar loading, the response cache, the request scheduler and the OpenAI
+client) add to the event of the call in progress through the ``record_*``
+functions, which are no-ops outside an instrumented call. Finished events are
+passed to every registered sink::
+
+    from gramregex.instrumentation import LoggingSink, add_sink
+
+    add_sink(LoggingSink())
+
+The registry is checked on every call, so clients built before a sink was
+registered, such as those held by ``prepare``, report to it too. While no
+sink is registered nothing is recorded and a call only pays for that check.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from functools import partial
+from typing import Any, Protocol
+
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+
+STAGE_GRAMMAR_LOAD = "grammar_load"
+STAGE_CLIENT_ACQUIRE = "client_acquire"
+STAGE_REQUEST = "request"
+STAGE_THROTTLE = "throttle"
+STAGE_BACKOFF = "backoff"
+STAGE_FIRST_TOKEN = "first_token"  # noqa: S105 - stage name, not a credential
+STAGE_TOTAL = "total"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class CallEvent:
+    """Measurements of a single generation call; stage durations are in seconds."""
+
+    model: str
+    grammar_syntax: GrammarSyntax
+    stream: bool = False
+    stages: dict[str, float] = field(default_factory=dict)
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    cached_tokens: int | None = None
+    total_tokens: int | None = None
+    retries: int = 0
+    escalations: int = 0
+    hedges: int = 0
+    coalesced: bool = False
+    cache_hit: bool | None = None
+    error: str | None = None
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Add ``seconds`` to stage ``name`` (stages such as backoff can occur several times)."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+
+class Sink(Protocol):
+    """Receiver of finished call events."""
+
+    def emit(self, event: CallEvent) -> None:
+        """Handle a finished call."""
+        ...
+
+
+_sinks: tuple[Sink, ...] = ()
+_sinks_lock = threading.Lock()
+_current: ContextVar[CallEvent | None] = ContextVar("gramregex_call_event", default=None)
+
+
+def add_sink(sink: Sink) -> None:
+    """Register ``sink`` to receive every finished call event."""
+    global _sinks  # noqa: PLW0603 - copy-on-write registry read without locking
+    with _sinks_lock:
+        _sinks = (*_sinks, sink)
+
+
+def remove_sink(sink: Sink) -> None:
+    """Unregister ``sink``; unknown sinks are ignored."""
+    global _sinks  # noqa: PLW0603 - copy-on-write registry read without locking
+    with _sinks_lock:
+        _sinks = tuple(registered for registered in _sinks if registered is not sink)
+
+
+def enabled() -> bool:
+    """Return True when at least one sink is registered."""
+    return bool(_sinks)
+
+
+def current_event() -> CallEvent | None:
+    """Return the event of the call in progress, if it is instrumented."""
+    return _current.get()
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add a stage duration to the call in progress."""
+    event = _current.get()
+    if event is not None:
+        event.add_stage(name, seconds)
+
+
+def record_retry() -> None:
+    """Count a retry of the call in progress."""
+    event = _current.get()
+    if event is not None:
+        event.retries += 1
+
+
+def record_escalation() -> None:
+    """Count an escalation of the call in progress to a stronger route tier."""
+    event = _current.get()
+    if event is not None:
+        event.escalations += 1
+
+
+def record_hedge() -> None:
+    """Count a hedged (duplicate) request sent for the call in progress."""
+    event = _current.get()
+    if event is not None:
+        event.hedges += 1
+
+
+def record_coalesced() -> None:
+    """Mark the call in progress as served by an identical request already in flight."""
+    event = _current.get()
+    if event is not None:
+        event.coalesced = True
+
+
+def record_cache(*, hit: bool) -> None:
+    """Record whether the call in progress was served from the response cache."""
+    event = _current.get()
+    if event is not None:
+        event.cache_hit = hit
+
+
+def record_usage(
+    *,
+    input_tokens: int | None,
+    output_tokens: int | None,
+    cached_tokens: int | None = None,
+    total_tokens: int | None = None,
+) -> None:
+    """Add the token usage reported by the provider to the call in progress.
+
+    Usage accumulates because an escalated call makes several requests.
+    """
+    event = _current.get()
+    if event is not None:
+        event.input_tokens = _add_tokens(event.input_tokens, input_tokens)
+        event.output_tokens = _add_tokens(event.output_tokens, output_tokens)
+        event.cached_tokens = _add_tokens(event.cached_tokens, cached_tokens)
+        event.total_tokens = _add_tokens(event.total_tokens, total_tokens)
+
+
+def _add_tokens(current: int | None, count: int | None) -> int | None:
+    if count is None:
+        return current
+    return count if current is None else current + count
+
+
+def _emit(event: CallEvent) -> None:
+    for sink in _sinks:
+        try:
+            sink.emit(event)
+        except Exception:
+            logger.exception("Instrumentation sink %r failed", sink)
+
+
+@contextmanager
+def _recording(event: CallEvent) -> Iterator[None]:
+    """Make ``event`` current for the enclosed call, then time and emit it."""
+    token = _current.set(event)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as error:
+        event.error = type(error).__name__
+        raise
+    finally:
+        _current.reset(token)
+        event.stages[STAGE_TOTAL] = time.perf_counter() - started
+        _emit(event)
+
+
+class InstrumentedLLMClient(LLMClient):
+    """Outermost client wrapper that opens a ``CallEvent`` per call and emits it when done.
+
+    Calls made while no sink is registered are passed through unrecorded.
+    """
+
+    def __init__(self, client: LLMClient, *, model: str, stages: dict[str, float] | None = None) -> None:
+        """Wrap ``client``; ``stages`` seeds every event with timings measured before the call."""
+        self._client = client
+        self._model = model
+        self._stages = stages or {}
+
+    def _event(self, grammar_syntax: GrammarSyntax, *, stream: bool) -> CallEvent:
+        return CallEvent(model=self._model, grammar_syntax=grammar_syntax, stream=stream, stages=dict(self._stages))
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output while recording the call."""
+        call = partial(
+            self._client.generate,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        if not _sinks:
+            return call()
+        with _recording(self._event(grammar_syntax, stream=False)):
+            return call()
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result while recording the call."""
+        call = partial(
+            self._client.generate_result,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        if not _sinks:
+            return call()
+        with _recording(self._event(grammar_syntax, stream=False)):
+            return call()
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Stream output while recording the call, including the time to the first delta.
+
+        The event is only made current while the inner stream runs, so code
+        between deltas in the caller is not attributed to this call.
+        """
+        deltas = self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        if not _sinks:
+            yield from deltas
+            return
+        event = self._event(grammar_syntax, stream=True)
+        started = time.perf_counter()
+        try:
+            while True:
+                token = _current.set(event)
+                try:
+                    delta = next(deltas)
+                except StopIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                if STAGE_FIRST_TOKEN not in event.stages:
+                    event.stages[STAGE_FIRST_TOKEN] = time.perf_counter() - started
+                yield delta
+        except Exception as error:
+            event.error = type(error).__name__
+            raise
+        finally:
+            close = getattr(deltas, "close", None)
+            if callable(close):
+                close()
+            event.stages[STAGE_TOTAL] = time.perf_counter() - started
+            _emit(event)
+
+
+class AsyncInstrumentedLLMClient(AsyncLLMClient):
+    """Async counterpart of ``InstrumentedLLMClient``."""
+
+    def __init__(self, client: AsyncLLMClient, *, model: str, stages: dict[str, float] | None = None) -> None:
+        """Wrap ``client``; ``stages`` seeds every event with timings measured before the call."""
+        self._client = client
+        self._model = model
+        self._stages = stages or {}
+
+    def _event(self, grammar_syntax: GrammarSyntax, *, stream: bool) -> CallEvent:
+        return CallEvent(model=self._model, grammar_syntax=grammar_syntax, stream=stream, stages=dict(self._stages))
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output while recording the call."""
+        call = partial(
+            self._client.generate,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        if not _sinks:
+            return await call()
+        with _recording(self._event(grammar_syntax, stream=False)):
+            return await call()
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result while recording the call."""
+        call = partial(
+            self._client.generate_result,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        if not _sinks:
+            return await call()
+        with _recording(self._event(grammar_syntax, stream=False)):
+            return await call()
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream output while recording the call, including the time to the first delta."""
+        deltas = self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        if not _sinks:
+            async for delta in deltas:
+                yield delta
+            return
+        event = self._event(grammar_syntax, stream=True)
+        started = time.perf_counter()
+        try:
+            while True:
+                token = _current.set(event)
+                try:
+                    delta = await anext(deltas)
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current.reset(token)
+                if STAGE_FIRST_TOKEN not in event.stages:
+                    event.stages[STAGE_FIRST_TOKEN] = time.perf_counter() - started
+                yield delta
+        except Exception as error:
+            event.error = type(error).__name__
+            raise
+        finally:
+            aclose = getattr(deltas, "aclose", None)
+            if callable(aclose):
+                await aclose()
+            event.stages[STAGE_TOTAL] = time.perf_counter() - started
+            _emit(event)
+
+
+def instrumented_client(client: LLMClient, *, model: str, stages: dict[str, float] | None = None) -> LLMClient:
+    """Wrap ``client`` for instrumentation; its calls are recorded whenever a sink is registered at call time."""
+    return InstrumentedLLMClient(client, model=model, stages=stages)
+
+
+def instrumented_async_client(
+    client: AsyncLLMClient,
+    *,
+    model: str,
+    stages: dict[str, float] | None = None,
+) -> AsyncLLMClient:
+    """Async counterpart of ``instrumented_client``."""
+    return AsyncInstrumentedLLMClient(client, model=model, stages=stages)
+
+
+class LoggingSink:
+    """Sink writing one JSON log record per call."""
+
+    def __init__(self, log: logging.Logger | None = None, level: int = logging.INFO) -> None:
+        """Log to ``log`` (the ``gramregex.instrumentation`` logger by default) at ``level``."""
+        self._logger = log or logger
+        self._level = level
+
+    def emit(self, event: CallEvent) -> None:
+        """Log the event as JSON."""
+        self._logger.log(self._level, "gramregex call %s", json.dumps(asdict(event), sort_keys=True))
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: object) -> str:
+    rendered = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return f"{{{rendered}}}"
+
+
+class PrometheusSink:
+    """Sink aggregating events into metrics rendered in the Prometheus text exposition format."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Create empty metrics with the given histogram ``buckets`` (seconds)."""
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._calls: dict[tuple[str, str], int] = {}
+        self._retries: dict[str, int] = {}
+        self._escalations: dict[str, int] = {}
+        self._hedges: dict[str, int] = {}
+        self._coalesced: dict[str, int] = {}
+        self._cache: dict[tuple[str, str], int] = {}
+        self._tokens: dict[tuple[str, str], int] = {}
+        self._stage_counts: dict[tuple[str, str], list[int]] = {}
+        self._stage_sums: dict[tuple[str, str], float] = {}
+
+    def emit(self, event: CallEvent) -> None:
+        """Add the event to the metrics."""
+        status = "error" if event.error else "ok"
+        with self._lock:
+            key = (event.model, status)
+            self._calls[key] = self._calls.get(key, 0) + 1
+            self._retries[event.model] = self._retries.get(event.model, 0) + event.retries
+            self._escalations[event.model] = self._escalations.get(event.model, 0) + event.escalations
+            self._hedges[event.model] = self._hedges.get(event.model, 0) + event.hedges
+            if event.coalesced:
+                self._coalesced[event.model] = self._coalesced.get(event.model, 0) + 1
+            if event.cache_hit is not None:
+                cache_key = (event.model, "hit" if event.cache_hit else "miss")
+                self._cache[cache_key] = self._cache.get(cache_key, 0) + 1
+            for kind, count in (
+                ("input", event.input_tokens),
+                ("output", event.output_tokens),
+                ("cached", event.cached_tokens),
+            ):
+                if count:
+                    self._tokens[event.model, kind] = self._tokens.get((event.model, kind), 0) + count
+            for stage, seconds in event.stages.items():
+                stage_key = (event.model, stage)
+                counts = self._stage_counts.setdefault(stage_key, [0] * (len(self._buckets) + 1))
+                for index, bound in enumerate(self._buckets):
+                    if seconds <= bound:
+                        counts[index] += 1
+                counts[-1] += 1
+                self._stage_sums[stage_key] = self._stage_sums.get(stage_key, 0.0) + seconds
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        lines: list[str] = []
+        with self._lock:
+            lines.append("# HELP gramregex_calls_total Generation calls by outcome.")
+            lines.append("# TYPE gramregex_calls_total counter")
+            lines.extend(
+                f"gramregex_calls_total{_labels(model=model, status=status)} {count}"
+                for (model, status), count in sorted(self._calls.items())
+            )
+            lines.append("# HELP gramregex_retries_total Provider requests retried after transient errors.")
+            lines.append("# TYPE gramregex_retries_total counter")
+            lines.extend(
+                f"gramregex_retries_total{_labels(model=model)} {count}"
+                for model, count in sorted(self._retries.items())
+            )
+            lines.append("# HELP gramregex_escalations_total Calls escalated to a stronger route tier.")
+            lines.append("# TYPE gramregex_escalations_total counter")
+            lines.extend(
+                f"gramregex_escalations_total{_labels(model=model)} {count}"
+                for model, count in sorted(self._escalations.items())
+            )
+            lines.append("# HELP gramregex_hedges_total Duplicate requests sent for slow calls.")
+            lines.append("# TYPE gramregex_hedges_total counter")
+            lines.extend(
+                f"gramregex_hedges_total{_labels(model=model)} {count}" for model, count in sorted(self._hedges.items())
+            )
+            lines.append("# HELP gramregex_coalesced_total Calls served by an identical request already in flight.")
+            lines.append("# TYPE gramregex_coalesced_total counter")
+            lines.extend(
+                f"gramregex_coalesced_total{_labels(model=model)} {count}"
+                for model, count in sorted(self._coalesced.items())
+            )
+            lines.append("# HELP gramregex_cache_requests_total Response cache lookups by result.")
+            lines.append("# TYPE gramregex_cache_requests_total counter")
+            lines.extend(
+                f"gramregex_cache_requests_total{_labels(model=model, result=result)} {count}"
+                for (model, result), count in sorted(self._cache.items())
+            )
+            lines.append("# HELP gramregex_tokens_total Tokens reported by the provider.")
+            lines.append("# TYPE gramregex_tokens_total counter")
+            lines.extend(
+                f"gramregex_tokens_total{_labels(model=model, kind=kind)} {count}"
+                for (model, kind), count in sorted(self._tokens.items())
+            )
+            lines.append("# HELP gramregex_stage_seconds Duration of each call stage.")
+            lines.append("# TYPE gramregex_stage_seconds histogram")
+            for (model, stage), counts in sorted(self._stage_counts.items()):
+                for bound, count in zip((*self._buckets, float("inf")), counts, strict=True):
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"gramregex_stage_seconds_bucket{_labels(model=model, stage=stage, le=le)} {count}")
+                labels = _labels(model=model, stage=stage)
+                lines.append(f"gramregex_stage_seconds_sum{labels} {self._stage_sums[model, stage]}")
+                lines.append(f"gramregex_stage_seconds_count{labels} {counts[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+class OpenTelemetrySink:
+    """Sink exporting each call as an OpenTelemetry span (requires ``opentelemetry-api``)."""
+
+    def __init__(self, tracer: Any = None) -> None:
+        """Use ``tracer`` or the global tracer provider's ``gramregex`` tracer."""
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as exc:
+                msg = "OpenTelemetrySink requires the 'opentelemetry-api' package"
+                raise ImportError(msg) from exc
+            tracer = trace.get_tracer("gramregex")
+        self._tracer = tracer
+
+    def emit(self, event: CallEvent) -> None:
+        """Record the event as a span spanning the call's total duration."""
+        end_ns = time.time_ns()
+        start_ns = end_ns - int(event.stages.get(STAGE_TOTAL, 0.0) * 1e9)
+        attributes: dict[str, object] = {
+            "gen_ai.system": "openai",
+            "gen_ai.request.model": event.model,
+            "gramregex.grammar_syntax": event.grammar_syntax,
+            "gramregex.stream": event.stream,
+            "gramregex.retries": event.retries,
+            "gramregex.escalations": event.escalations,
+            "gramregex.hedges": event.hedges,
+            "gramregex.coalesced": event.coalesced,
+        }
+        optional: dict[str, object] = {
+            "gen_ai.usage.input_tokens": event.input_tokens,
+            "gen_ai.usage.output_tokens": event.output_tokens,
+            "gramregex.usage.cached_tokens": event.cached_tokens,
+            "gramregex.cache_hit": event.cache_hit,
+            "error.type": event.error,
+        }
+        attributes.update({name: value for name, value in optional.items() if value is not None})
+        attributes.update({f"gramregex.stage.{stage}_ms": seconds * 1000 for stage, seconds in event.stages.items()})
+
+        span = self._tracer.start_span("gramregex.generate", start_time=start_ns, attributes=attributes)
+        if event.error:
+            from opentelemetry.trace import Status, StatusCode
+
+            span.set_status(Status(StatusCode.ERROR, event.error))
+        span.end(end_time=end_ns)
+
+
+__all__ = [
+    "STAGE_BACKOFF",
+    "STAGE_CLIENT_ACQUIRE",
+    "STAGE_FIRST_TOKEN",
+    "STAGE_GRAMMAR_LOAD",
+    "STAGE_REQUEST",
+    "STAGE_THROTTLE",
+    "STAGE_TOTAL",
+    "AsyncInstrumentedLLMClient",
+    "CallEvent",
+    "InstrumentedLLMClient",
+    "LoggingSink",
+    "OpenTelemetrySink",
+    "PrometheusSink",
+    "Sink",
+    "add_sink",
+    "current_event",
+    "enabled",
+    "instrumented_async_client",
+    "instrumented_client",
+    "record_cache",
+    "record_coalesced",
+    "record_escalation",
+    "record_hedge",
+    "record_retry",
+    "record_stage",
+    "record_usage",
+    "remove_sink",
+]
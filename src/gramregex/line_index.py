@@ -0,0 +1,151 @@
+"""Random access to the prompts of large line-oriented files.
+
+``LineIndex`` memory-maps a JSONL or text file and records the byte offset of
+each non-blank line, so item ``n`` (counted as ``batch`` numbers its prompts)
+is read with one seek instead of a scan from the start of the file. The
+offsets are stored next to the file in ``<file>.idx`` and memory-mapped when
+reopened, so neither the prompts nor the index are held in memory; while
+building, the offsets are written to the index file chunk by chunk (to an
+anonymous temporary file when it is not saved). An index whose file has
+changed size or modification time since it was built is rebuilt.
+"""
+
+import mmap
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Iterator
+from itertools import accumulate, compress
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Self, cast
+
+INDEX_SUFFIX = ".idx"
+
+# Magic, indexed file size and mtime, offset typecode and byte order; padded to keep the offsets aligned.
+_HEADER = struct.Struct("=8sQQ2s6x")
+_MAGIC = b"GRMIDX1\n"
+_CHUNK_SIZE = 1 << 24
+
+
+class LineIndex:
+    """Byte offsets of the non-blank lines of a file, read through a memory map."""
+
+    def __init__(self, path: Path, *, persist: bool = True) -> None:
+        """Index ``path``, reusing ``<path>.idx`` when it is current and saving it otherwise when ``persist``."""
+        self.path = path
+        self.index_path = path.with_name(f"{path.name}{INDEX_SUFFIX}")
+        stat = path.stat()
+        self._header = _HEADER.pack(
+            _MAGIC,
+            stat.st_size,
+            stat.st_mtime_ns,
+            ("I" if stat.st_size < 2**32 else "Q").encode() + sys.byteorder[0].encode(),
+        )
+        self._data = _map(path)
+        self._index_map: mmap.mmap | None = None
+        loaded = self._load()
+        self._offsets = self._build(persist=persist) if loaded is None else loaded
+
+    def _load(self) -> memoryview | None:
+        index_map = _map(self.index_path) if self.index_path.exists() else None
+        if index_map is None or index_map[: _HEADER.size] != self._header:
+            if index_map is not None:
+                index_map.close()
+            return None
+        self._index_map = index_map
+        return memoryview(index_map)[_HEADER.size :].cast(self._typecode)
+
+    def _build(self, *, persist: bool) -> memoryview:
+        if persist:
+            temporary = self.index_path.with_name(f"{self.index_path.name}.tmp")
+            try:
+                with temporary.open("wb") as file:
+                    self._write_offsets(file)
+                temporary.replace(self.index_path)
+            except OSError:
+                # A read-only directory only costs the rebuild next time.
+                temporary.unlink(missing_ok=True)
+            else:
+                loaded = self._load()
+                if loaded is not None:
+                    return loaded
+        # Unsaved offsets still go to a file, an anonymous one, so they are never held in memory.
+        with tempfile.TemporaryFile() as file:
+            self._write_offsets(file)
+            file.flush()
+            self._index_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._index_map)[_HEADER.size :].cast(self._typecode)
+
+    def _write_offsets(self, file: BinaryIO) -> None:
+        """Write the header and the offsets to ``file`` while scanning, one chunk of lines at a time."""
+        file.write(self._header)
+        data, position = self._data, 0
+        while data is not None and position < len(data):
+            # Whole lines of about ``_CHUNK_SIZE`` bytes at a time, so building takes bounded memory.
+            end = data.find(b"\n", min(position + _CHUNK_SIZE, len(data)) - 1)
+            end = len(data) if end < 0 else end + 1
+            lines = data[position:end].split(b"\n")
+            starts = accumulate((len(line) + 1 for line in lines), initial=position)
+            array(self._typecode, compress(starts, map(bytes.strip, lines))).tofile(file)
+            position = end
+
+    @property
+    def _typecode(self) -> str:
+        return chr(self._header[24])
+
+    def __len__(self) -> int:
+        """Return the number of non-blank lines."""
+        return len(self._offsets)
+
+    def offset(self, number: int) -> int:
+        """Return the byte offset of line ``number`` (zero-based, blank lines not counted)."""
+        return self._offsets[number]
+
+    def line(self, number: int) -> str:
+        """Return line ``number`` including its line ending."""
+        return self._read(self._offsets[number])
+
+    def lines(self, start: int = 0, stop: int | None = None) -> Iterator[str]:
+        """Yield the lines numbered ``start`` up to ``stop``, reading each only when it is reached."""
+        # Indexed one at a time: a slice would export the index buffer and keep it from being closed.
+        for number in range(*slice(start, stop).indices(len(self._offsets))):
+            yield self._read(self._offsets[number])
+
+    def _read(self, offset: int) -> str:
+        # Only reached through an offset, so the file is not empty.
+        data = cast("mmap.mmap", self._data)
+        end = data.find(b"\n", offset)
+        return data[offset : len(data) if end < 0 else end + 1].decode("utf-8")
+
+    def close(self) -> None:
+        """Release the memory maps."""
+        self._offsets.release()
+        for mapped in (self._index_map, self._data):
+            if mapped is not None:
+                mapped.close()
+
+    def __enter__(self) -> Self:
+        """Return the index."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Release the memory maps."""
+        self.close()
+
+
+def _map(path: Path) -> mmap.mmap | None:
+    """Memory-map ``path`` read-only; None when it is empty, which ``mmap`` cannot map."""
+    with path.open("rb") as file:
+        if not path.stat().st_size:
+            return None
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+__all__ = ["INDEX_SUFFIX", "LineIndex"]
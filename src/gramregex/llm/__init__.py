@@ -1,6 +1,88 @@
 """LLM client implementations for gramregex."""
 
-from gramregex.llm.factory import create_llm_client
-from gramregex.llm.openai_client import OpenAIResponsesClient
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["OpenAIResponsesClient", "create_llm_client"]
+if TYPE_CHECKING:
+    from gramregex.llm.balancer import (
+        AsyncBalancedLLMClient,
+        BalancedLLMClient,
+        Balancer,
+        CircuitBreaker,
+        NoHealthyEndpointError,
+    )
+    from gramregex.llm.factory import (
+        AsyncClientPool,
+        ClientPool,
+        aclose_llm_clients,
+        close_llm_clients,
+        create_async_llm_client,
+        create_llm_client,
+        get_async_llm_client,
+        get_llm_client,
+    )
+    from gramregex.llm.hedging import AsyncHedgedLLMClient, HedgedLLMClient, LatencyTracker
+    from gramregex.llm.openai_batch import OpenAIBatchRunner
+    from gramregex.llm.openai_client import AsyncOpenAIResponsesClient, OpenAIResponsesClient
+
+# Importing ``gramregex.llm.base`` runs this module, so the clients are resolved lazily.
+_LAZY_ATTRIBUTES = {
+    "AsyncBalancedLLMClient": "gramregex.llm.balancer",
+    "AsyncClientPool": "gramregex.llm.factory",
+    "AsyncHedgedLLMClient": "gramregex.llm.hedging",
+    "AsyncOpenAIResponsesClient": "gramregex.llm.openai_client",
+    "BalancedLLMClient": "gramregex.llm.balancer",
+    "Balancer": "gramregex.llm.balancer",
+    "CircuitBreaker": "gramregex.llm.balancer",
+    "ClientPool": "gramregex.llm.factory",
+    "HedgedLLMClient": "gramregex.llm.hedging",
+    "LatencyTracker": "gramregex.llm.hedging",
+    "NoHealthyEndpointError": "gramregex.llm.balancer",
+    "OpenAIBatchRunner": "gramregex.llm.openai_batch",
+    "OpenAIResponsesClient": "gramregex.llm.openai_client",
+    "aclose_llm_clients": "gramregex.llm.factory",
+    "close_llm_clients": "gramregex.llm.factory",
+    "create_async_llm_client": "gramregex.llm.factory",
+    "create_llm_client": "gramregex.llm.factory",
+    "get_async_llm_client": "gramregex.llm.factory",
+    "get_llm_client": "gramregex.llm.factory",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import the module providing ``name`` on first access."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List lazy attributes alongside the loaded ones."""
+    return sorted({*globals(), *__all__})
+
+
+__all__ = [
+    "AsyncBalancedLLMClient",
+    "AsyncClientPool",
+    "AsyncHedgedLLMClient",
+    "AsyncOpenAIResponsesClient",
+    "BalancedLLMClient",
+    "Balancer",
+    "CircuitBreaker",
+    "ClientPool",
+    "HedgedLLMClient",
+    "LatencyTracker",
+    "NoHealthyEndpointError",
+    "OpenAIBatchRunner",
+    "OpenAIResponsesClient",
+    "aclose_llm_clients",
+    "close_llm_clients",
+    "create_async_llm_client",
+    "create_llm_client",
+    "get_async_llm_client",
+    "get_llm_client",
+]
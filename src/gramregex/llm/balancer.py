@@ -0,0 +1,410 @@
+"""Load balancing across several OpenAI-compatible endpoints.
+
+Requests are spread with weighted round robin or least-outstanding-requests
+selection. Each endpoint has a circuit breaker: after consecutive transient
+failures it is taken out of rotation, and once ``reset_timeout`` has passed
+it competes for requests again, one trial request at a time, until a trial
+succeeds and closes the circuit. Health is only checked passively through
+these trials: no probe requests are sent to endpoints out of rotation. A
+request that fails with a transient error is retried on the next available
+endpoint; the factory gives each endpoint client a single attempt when there
+are several endpoints, so failover does not wait out an unhealthy endpoint's
+retry backoff.
+"""
+
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from dataclasses import dataclass
+
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+from gramregex.llm.scheduler import is_retryable
+from gramregex.settings import BalancingStrategy
+
+
+class NoHealthyEndpointError(RuntimeError):
+    """Raised when every endpoint's circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a half-open trial request.
+
+    Not thread-safe on its own; ``Balancer`` serialises access.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Open after ``failure_threshold`` failures and allow a trial after ``reset_timeout`` seconds."""
+        self._threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        """Return True while the endpoint is out of rotation (including during a trial)."""
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent, claiming the trial slot of an expired open circuit."""
+        if self._opened_at is None:
+            return True
+        if self._trial_in_flight or self._clock() - self._opened_at < self._reset_timeout:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Count a failure, opening (or re-opening after a failed trial) the circuit."""
+        self._failures += 1
+        if self._trial_in_flight or self._failures >= self._threshold:
+            self._opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a trial slot whose request ended without telling anything about health."""
+        self._trial_in_flight = False
+
+
+@dataclass(slots=True, eq=False)
+class _Endpoint:
+    weight: int
+    breaker: CircuitBreaker
+    outstanding: int = 0
+    current_weight: int = 0
+
+
+class Balancer:
+    """Thread-safe endpoint selection shared by the sync and async clients.
+
+    Endpoints are identified by their index in ``weights``.
+    """
+
+    def __init__(
+        self,
+        weights: Sequence[int],
+        *,
+        strategy: BalancingStrategy = "round_robin",
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Balance across endpoints with the given relative ``weights``."""
+        if not weights:
+            msg = "At least one endpoint is required"
+            raise ValueError(msg)
+        self._endpoints = [
+            _Endpoint(weight, CircuitBreaker(failure_threshold, reset_timeout, clock=clock)) for weight in weights
+        ]
+        self._strategy = strategy
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude: set[int], failure: Exception | None = None) -> int:
+        """Pick an endpoint not in ``exclude`` and count a request on it; return its index.
+
+        When none is available, ``failure`` (the error that made the caller
+        move on from its previous endpoint) is raised, or ``NoHealthyEndpointError``.
+        """
+        with self._lock:
+            candidates = [
+                index
+                for index, endpoint in enumerate(self._endpoints)
+                if index not in exclude and not endpoint.breaker.is_open
+            ]
+            # Open circuits past their reset timeout compete for their trial request like closed ones.
+            trials = [
+                index
+                for index, endpoint in enumerate(self._endpoints)
+                if index not in exclude and endpoint.breaker.is_open and endpoint.breaker.allow()
+            ]
+            candidates += trials
+            if not candidates:
+                if failure is not None:
+                    raise failure
+                msg = "No healthy endpoint is available"
+                raise NoHealthyEndpointError(msg)
+            index = self._select(candidates)
+            for trial in trials:
+                if trial != index:
+                    self._endpoints[trial].breaker.release()
+            self._endpoints[index].outstanding += 1
+            return index
+
+    def _select(self, candidates: list[int]) -> int:
+        if self._strategy == "least_outstanding":
+            return min(candidates, key=lambda index: self._endpoints[index].outstanding / self._endpoints[index].weight)
+        # Smooth weighted round robin: spreads heavier endpoints' turns evenly.
+        total = 0
+        for index in candidates:
+            endpoint = self._endpoints[index]
+            endpoint.current_weight += endpoint.weight
+            total += endpoint.weight
+        chosen = max(candidates, key=lambda index: self._endpoints[index].current_weight)
+        self._endpoints[chosen].current_weight -= total
+        return chosen
+
+    def release(self, index: int, error: BaseException | None) -> None:
+        """Finish a request on endpoint ``index``, updating its circuit from the outcome."""
+        with self._lock:
+            endpoint = self._endpoints[index]
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.breaker.record_success()
+            elif is_retryable(error):
+                endpoint.breaker.record_failure()
+            else:
+                endpoint.breaker.release()
+
+    def __len__(self) -> int:
+        """Return the number of endpoints."""
+        return len(self._endpoints)
+
+    def open_endpoints(self) -> list[int]:
+        """Return the indexes of endpoints currently out of rotation."""
+        with self._lock:
+            return [index for index, endpoint in enumerate(self._endpoints) if endpoint.breaker.is_open]
+
+
+class BalancedLLMClient(LLMClient):
+    """LLM client spreading requests across several endpoint clients.
+
+    Transient failures (see ``is_retryable``) count against the endpoint's
+    circuit and the request moves on to another endpoint; other errors, such
+    as an invalid request, are raised unchanged.
+    """
+
+    def __init__(self, clients: Sequence[LLMClient], balancer: Balancer) -> None:
+        """Spread requests over ``clients`` as selected by ``balancer`` (one endpoint per client)."""
+        if len(clients) != len(balancer):
+            msg = "The balancer needs exactly one endpoint per client"
+            raise ValueError(msg)
+        self._clients = list(clients)
+        self._balancer = balancer
+
+    def _call(self, request: Callable[[LLMClient], GenerationResult]) -> GenerationResult:
+        tried: set[int] = set()
+        last_error: Exception | None = None
+        while True:
+            index = self._balancer.acquire(tried, last_error)
+            tried.add(index)
+            try:
+                result = request(self._clients[index])
+            except Exception as exc:
+                self._balancer.release(index, exc)
+                if not is_retryable(exc) or len(tried) == len(self._clients):
+                    raise
+                last_error = exc
+                continue
+            except BaseException as exc:
+                self._balancer.release(index, exc)
+                raise
+            self._balancer.release(index, None)
+            return result
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output on the selected endpoint."""
+        return self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        ).text
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result on the selected endpoint, failing over on transient errors."""
+        return self._call(
+            lambda client: client.generate_result(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ),
+        )
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Stream from the selected endpoint; streams are not moved once started."""
+        index = self._balancer.acquire(set())
+        error: BaseException | None = None
+        try:
+            yield from self._clients[index].stream(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            )
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._balancer.release(index, error)
+
+    def close(self) -> None:
+        """Close every endpoint client."""
+        for client in self._clients:
+            client.close()
+
+
+class AsyncBalancedLLMClient(AsyncLLMClient):
+    """Async counterpart of ``BalancedLLMClient``."""
+
+    def __init__(self, clients: Sequence[AsyncLLMClient], balancer: Balancer) -> None:
+        """Spread requests over ``clients`` as selected by ``balancer`` (one endpoint per client)."""
+        if len(clients) != len(balancer):
+            msg = "The balancer needs exactly one endpoint per client"
+            raise ValueError(msg)
+        self._clients = list(clients)
+        self._balancer = balancer
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output on the selected endpoint."""
+        result = await self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return result.text
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result on the selected endpoint, failing over on transient errors."""
+        tried: set[int] = set()
+        last_error: Exception | None = None
+        while True:
+            index = self._balancer.acquire(tried, last_error)
+            tried.add(index)
+            try:
+                result = await self._clients[index].generate_result(
+                    prompt,
+                    grammar=grammar,
+                    grammar_syntax=grammar_syntax,
+                    verbosity=verbosity,
+                    reasoning_effort=reasoning_effort,
+                    instructions=instructions,
+                )
+            except Exception as exc:
+                self._balancer.release(index, exc)
+                if not is_retryable(exc) or len(tried) == len(self._clients):
+                    raise
+                last_error = exc
+                continue
+            except BaseException as exc:  # cancellation says nothing about the endpoint's health
+                self._balancer.release(index, exc)
+                raise
+            self._balancer.release(index, None)
+            return result
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream from the selected endpoint; streams are not moved once started."""
+        index = self._balancer.acquire(set())
+        error: BaseException | None = None
+        try:
+            async for delta in self._clients[index].stream(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ):
+                yield delta
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._balancer.release(index, error)
+
+    async def aclose(self) -> None:
+        """Close every endpoint client."""
+        for client in self._clients:
+            await client.aclose()
+
+
+__all__ = [
+    "AsyncBalancedLLMClient",
+    "BalancedLLMClient",
+    "Balancer",
+    "CircuitBreaker",
+    "NoHealthyEndpointError",
+]
@@ -1,13 +1,37 @@
 """LLM client abstractions."""
 
+import time
 from abc import ABC, abstractmethod
-from typing import Literal
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from types import TracebackType
+from typing import Literal, Self
 
 GrammarSyntax = Literal["lark", "regex"]
 VerbosityLevel = Literal["low", "medium", "high"]
 ReasoningEffort = Literal["minimal", "medium", "high"]
 
 
+@dataclass(frozen=True, slots=True)
+class GenerationResult:
+    """Generated text with the usage and timing the provider reported for it.
+
+    Token counts are None when the provider (or a custom client) does not
+    report them; ``latency`` is the wall-clock duration of the call in seconds.
+    """
+
+    text: str
+    model: str | None = None
+    response_id: str | None = None
+    input_tokens: int | None = None
+    output_tokens: int | None = None
+    reasoning_tokens: int | None = None
+    cached_tokens: int | None = None
+    total_tokens: int | None = None
+    latency: float = 0.0
+    from_cache: bool = False
+
+
 class LLMClient(ABC):
     """Protocol for LLM clients supporting grammar-constrained generation."""
 
@@ -20,6 +44,153 @@ class LLMClient(ABC):
         grammar_syntax: GrammarSyntax,
         verbosity: VerbosityLevel | None = None,
         reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
     ) -> str:
         """Generate text given a prompt and a CFG grammar."""
 
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Yield generated text incrementally.
+
+        Clients without native streaming yield the full ``generate`` output as
+        a single chunk.
+        """
+        yield self.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate text and return it with usage and timing details.
+
+        Clients that cannot report usage return the text and latency only.
+        """
+        started = time.perf_counter()
+        text = self.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return GenerationResult(text=text, latency=time.perf_counter() - started)
+
+    def close(self) -> None:  # noqa: B027 - optional hook for clients holding resources
+        """Release network resources held by the client."""
+
+    def __enter__(self) -> Self:
+        """Return the client for use in a ``with`` block."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the client when leaving a ``with`` block."""
+        self.close()
+
+
+class AsyncLLMClient(ABC):
+    """Asynchronous counterpart of ``LLMClient`` for use inside an event loop."""
+
+    @abstractmethod
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate text given a prompt and a CFG grammar without blocking the loop."""
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield generated text incrementally.
+
+        Clients without native streaming yield the full ``generate`` output as
+        a single chunk.
+        """
+        yield await self.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate text and return it with usage and timing details.
+
+        Clients that cannot report usage return the text and latency only.
+        """
+        started = time.perf_counter()
+        text = await self.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return GenerationResult(text=text, latency=time.perf_counter() - started)
+
+    async def aclose(self) -> None:  # noqa: B027 - optional hook for clients holding resources
+        """Release network resources held by the client."""
+
+    async def __aenter__(self) -> Self:
+        """Return the client for use in an ``async with`` block."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the client when leaving an ``async with`` block."""
+        await self.aclose()
@@ -1,15 +1,275 @@
 """Factory for constructing LLM clients."""
 
-from gramregex.llm.base import LLMClient
-from gramregex.llm.openai_client import OpenAIResponsesClient
-from gramregex.settings import Settings
+import asyncio
+import threading
+from collections.abc import AsyncGenerator
+from contextlib import suppress
+from types import TracebackType
+from typing import Self, cast
+from weakref import WeakKeyDictionary
+
+from gramregex.llm.balancer import AsyncBalancedLLMClient, BalancedLLMClient, Balancer
+from gramregex.llm.base import AsyncLLMClient, LLMClient
+from gramregex.llm.hedging import AsyncHedgedLLMClient, HedgedLLMClient, LatencyTracker
+from gramregex.llm.openai_client import AsyncOpenAIResponsesClient, OpenAIResponsesClient
+from gramregex.settings import OpenAIEndpoint, Settings
+
+ClientKey = tuple[object, ...]
+
+
+def _hedge_settings(settings: Settings) -> Settings | None:
+    """Return the settings of the secondary hedging client, or None to hedge on the primary."""
+    if settings.hedge_base_url is None and settings.hedge_model is None:
+        return None
+    update: dict[str, object] = {
+        "openai_model": settings.hedge_model or settings.openai_model,
+        "hedge_percentile": None,
+    }
+    if settings.hedge_base_url is not None:
+        update.update(openai_base_url=settings.hedge_base_url, openai_endpoints=())
+    return settings.model_copy(update=update)
+
+
+def _endpoint_settings(settings: Settings, endpoint: OpenAIEndpoint) -> Settings:
+    update: dict[str, object] = {
+        "openai_base_url": endpoint.base_url,
+        "openai_api_key": endpoint.api_key or settings.openai_api_key,
+        "openai_endpoints": (),
+    }
+    # The balancer fails over to another endpoint instead of backing off on an unhealthy one.
+    if len(settings.openai_endpoints) > 1:
+        update["retry_max_attempts"] = 1
+    return settings.model_copy(update=update)
+
+
+def _balancer(settings: Settings) -> Balancer:
+    return Balancer(
+        [endpoint.weight for endpoint in settings.openai_endpoints],
+        strategy=settings.balancing_strategy,
+        failure_threshold=settings.circuit_failure_threshold,
+        reset_timeout=settings.circuit_reset_timeout,
+    )
+
+
+def _check_provider(settings: Settings) -> None:
+    if settings.provider.lower() != "openai":
+        message = f"Unsupported LLM provider: {settings.provider}"
+        raise ValueError(message)
+
+
+def _latency_tracker(settings: Settings) -> LatencyTracker:
+    return LatencyTracker(cast("float", settings.hedge_percentile), initial_delay=settings.hedge_initial_delay)
 
 
 def create_llm_client(settings: Settings) -> LLMClient:
-    """Return an LLM client based on provider settings."""
-    provider = settings.provider.lower()
-    if provider == "openai":
-        return OpenAIResponsesClient(settings)
+    """Return an LLM client based on provider settings.
+
+    With ``openai_endpoints`` the client balances requests across the
+    endpoints; with ``hedge_percentile`` set it hedges slow requests.
+    """
+    _check_provider(settings)
+    client: LLMClient
+    if settings.openai_endpoints:
+        clients = [
+            OpenAIResponsesClient(_endpoint_settings(settings, endpoint)) for endpoint in settings.openai_endpoints
+        ]
+        client = BalancedLLMClient(clients, _balancer(settings))
+    else:
+        client = OpenAIResponsesClient(settings)
+    if settings.hedge_percentile is None:
+        return client
+    hedge_settings = _hedge_settings(settings)
+    return HedgedLLMClient(
+        client,
+        None if hedge_settings is None else create_llm_client(hedge_settings),
+        tracker=_latency_tracker(settings),
+        max_workers=settings.hedge_max_workers,
+    )
+
+
+def create_async_llm_client(settings: Settings) -> AsyncLLMClient:
+    """Return an async LLM client based on provider settings."""
+    _check_provider(settings)
+    client: AsyncLLMClient
+    if settings.openai_endpoints:
+        async_clients = [
+            AsyncOpenAIResponsesClient(_endpoint_settings(settings, endpoint)) for endpoint in settings.openai_endpoints
+        ]
+        client = AsyncBalancedLLMClient(async_clients, _balancer(settings))
+    else:
+        client = AsyncOpenAIResponsesClient(settings)
+    if settings.hedge_percentile is None:
+        return client
+    hedge_settings = _hedge_settings(settings)
+    return AsyncHedgedLLMClient(
+        client,
+        None if hedge_settings is None else create_async_llm_client(hedge_settings),
+        tracker=_latency_tracker(settings),
+    )
+
+
+def client_key(settings: Settings) -> ClientKey:
+    """Return the settings fields that determine whether two clients are interchangeable."""
+    return (
+        settings.provider.lower(),
+        settings.openai_base_url,
+        settings.openai_api_key,
+        settings.openai_endpoints,
+        settings.balancing_strategy,
+        settings.circuit_failure_threshold,
+        settings.circuit_reset_timeout,
+        settings.openai_model,
+        settings.openai_timeout,
+        settings.openai_max_connections,
+        settings.openai_max_keepalive_connections,
+        settings.openai_keepalive_expiry,
+        settings.retry_max_attempts,
+        settings.retry_base_delay,
+        settings.retry_max_delay,
+        settings.rate_limit_rpm,
+        settings.rate_limit_tpm,
+        settings.hedge_percentile,
+        settings.hedge_initial_delay,
+        settings.hedge_base_url,
+        settings.hedge_model,
+        settings.hedge_max_workers,
+    )
+
+
+class ClientPool:
+    """Thread-safe cache of LLM clients that keeps HTTP connections alive between calls."""
+
+    def __init__(self) -> None:
+        """Create an empty pool."""
+        self._clients: dict[ClientKey, LLMClient] = {}
+        self._lock = threading.Lock()
+
+    def get(self, settings: Settings) -> LLMClient:
+        """Return the pooled client for ``settings``, creating it on first use."""
+        key = client_key(settings)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = create_llm_client(settings)
+                self._clients[key] = client
+            return client
+
+    def close(self) -> None:
+        """Close and forget every pooled client."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    def __len__(self) -> int:
+        """Return the number of pooled clients."""
+        return len(self._clients)
+
+    def __enter__(self) -> Self:
+        """Return the pool for use in a ``with`` block."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close all pooled clients when leaving a ``with`` block."""
+        self.close()
+
+
+class AsyncClientPool:
+    """Cache of async LLM clients for a single event loop."""
+
+    def __init__(self) -> None:
+        """Create an empty pool."""
+        self._clients: dict[ClientKey, AsyncLLMClient] = {}
+        self._closer: AsyncGenerator[None] | None = None
+
+    def get(self, settings: Settings) -> AsyncLLMClient:
+        """Return the pooled client for ``settings``, creating it on first use."""
+        key = client_key(settings)
+        client = self._clients.get(key)
+        if client is None:
+            client = create_async_llm_client(settings)
+            self._clients[key] = client
+        return client
+
+    def close_with_loop(self) -> None:
+        """Close the pool when the running loop shuts down its async generators, as ``asyncio.run`` does."""
+        if self._closer is not None:
+            return
+
+        async def closer() -> AsyncGenerator[None]:
+            try:
+                yield
+            finally:
+                await self.aclose()
+
+        # Starting the generator registers it with the running loop; the pool keeps it alive until then.
+        self._closer = closer()
+        with suppress(StopIteration):
+            self._closer.asend(None).send(None)
+
+    async def aclose(self) -> None:
+        """Close and forget every pooled client."""
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+    def __len__(self) -> int:
+        """Return the number of pooled clients."""
+        return len(self._clients)
+
+    async def __aenter__(self) -> Self:
+        """Return the pool for use in an ``async with`` block."""
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close all pooled clients when leaving an ``async with`` block."""
+        await self.aclose()
+
+
+_default_pool = ClientPool()
+# Async HTTP connections are bound to the loop that opened them, so each loop gets its own pool.
+_async_pools: WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncClientPool] = WeakKeyDictionary()
+
+
+def get_llm_client(settings: Settings) -> LLMClient:
+    """Return a process-wide pooled LLM client for ``settings``."""
+    return _default_pool.get(settings)
+
+
+def close_llm_clients() -> None:
+    """Close every client in the process-wide pool."""
+    _default_pool.close()
+
+
+def get_async_llm_client(settings: Settings) -> AsyncLLMClient:
+    """Return an async LLM client pooled for the running event loop.
+
+    The pool is closed when the loop shuts down (``asyncio.run`` and
+    ``asyncio.Runner`` do so on exit), or earlier by ``aclose_llm_clients``.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _async_pools.get(loop)
+    if pool is None:
+        pool = AsyncClientPool()
+        pool.close_with_loop()
+        _async_pools[loop] = pool
+    return pool.get(settings)
+
 
-    message = f"Unsupported LLM provider: {settings.provider}"
-    raise ValueError(message)
+async def aclose_llm_clients() -> None:
+    """Close every async client pooled for the running event loop."""
+    pool = _async_pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.aclose()
@@ -0,0 +1,361 @@
+"""Hedged requests for cutting tail latency.
+
+When a call has not completed within a percentile of the recently observed
+latencies, a duplicate request is sent (to the same client or a secondary
+endpoint/model) and the first successful result wins. Only the slowest few
+percent of calls are duplicated, so the tail shrinks for little extra cost.
+With a validator, output that does not match the request grammar counts as a
+failure, so an invalid fast answer does not beat a valid slower one.
+"""
+
+import asyncio
+import bisect
+import contextvars
+import copy
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import TYPE_CHECKING, Self
+
+from gramregex.instrumentation import record_hedge
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+
+if TYPE_CHECKING:
+    from gramregex.validator import GrammarValidator, ValidatorCompiler
+
+DEFAULT_WINDOW = 1000
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_MAX_WORKERS = 32
+
+
+class LatencyTracker:
+    """Thread-safe sliding window of call latencies answering percentile queries."""
+
+    def __init__(
+        self,
+        percentile: float,
+        *,
+        initial_delay: float,
+        window: int = DEFAULT_WINDOW,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+    ) -> None:
+        """Track up to ``window`` latencies; ``initial_delay`` applies until ``min_samples`` are seen."""
+        if not 0 < percentile < 100:  # noqa: PLR2004 - percent bounds
+            msg = "percentile must be between 0 and 100"
+            raise ValueError(msg)
+        self._fraction = percentile / 100
+        self._initial_delay = initial_delay
+        self._min_samples = min_samples
+        self._samples: deque[float] = deque(maxlen=window)
+        self._sorted: list[float] = []
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Add the latency of a completed call."""
+        with self._lock:
+            if len(self._samples) == self._samples.maxlen:
+                oldest = self._samples[0]
+                del self._sorted[bisect.bisect_left(self._sorted, oldest)]
+            self._samples.append(seconds)
+            bisect.insort(self._sorted, seconds)
+
+    def delay(self) -> float:
+        """Return how long to wait before hedging a call."""
+        with self._lock:
+            if len(self._sorted) < self._min_samples:
+                return self._initial_delay
+            index = min(int(len(self._sorted) * self._fraction), len(self._sorted) - 1)
+            return self._sorted[index]
+
+
+def _checked(validator: "GrammarValidator | None", result: GenerationResult) -> GenerationResult:
+    """Return ``result``, raising ``GrammarValidationError`` when ``validator`` rejects its text."""
+    if validator is not None:
+        validator.validate(result.text)
+    return result
+
+
+def _first_success(futures: set[Future[GenerationResult]]) -> GenerationResult:
+    errors: list[BaseException] = []
+    pending = futures
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            exc = future.exception()
+            if exc is None:
+                # Only stops a request still queued for a worker; one already sending runs to completion.
+                for loser in pending:
+                    loser.cancel()
+                return future.result()
+            errors.append(exc)
+    raise errors[0]
+
+
+class HedgedLLMClient(LLMClient):
+    """LLM client sending a duplicate request when the first one is slower than usual.
+
+    Both requests run on worker threads and the first successful result is
+    returned. A request that is already in flight on a thread cannot be
+    aborted: the losing request keeps its worker and its provider call until
+    it completes, and its result is then discarded. The async client cancels
+    the loser instead. Streams are not hedged.
+    """
+
+    def __init__(
+        self,
+        primary: LLMClient,
+        secondary: LLMClient | None = None,
+        *,
+        tracker: LatencyTracker,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> None:
+        """Hedge ``primary`` with ``secondary`` (or a second request to ``primary``)."""
+        self._primary = primary
+        self._secondary = secondary
+        self._tracker = tracker
+        self._compiler: ValidatorCompiler | None = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gramregex-hedge")
+
+    def validating(self, compiler: "ValidatorCompiler") -> Self:
+        """Return a client sharing this one's workers and latencies that only accepts output valid for the grammar."""
+        hedged = copy.copy(self)
+        hedged._compiler = compiler  # noqa: SLF001 - copy of this class
+        return hedged
+
+    def _submit(
+        self,
+        client: LLMClient,
+        prompt: str,
+        options: dict[str, object],
+        validator: "GrammarValidator | None",
+    ) -> Future[GenerationResult]:
+        # Run in a copy of the caller's context so instrumentation records reach its event.
+        context = contextvars.copy_context()
+        call = partial(client.generate_result, prompt, **options)
+        return self._executor.submit(context.run, lambda: _checked(validator, call()))
+
+    def _observe(self, started: float, future: Future[GenerationResult]) -> None:
+        if not future.cancelled() and future.exception() is None:
+            self._tracker.observe(time.perf_counter() - started)
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output, hedging slow requests."""
+        return self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        ).text
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result, hedging requests slower than the tracked percentile."""
+        options: dict[str, object] = {
+            "grammar": grammar,
+            "grammar_syntax": grammar_syntax,
+            "verbosity": verbosity,
+            "reasoning_effort": reasoning_effort,
+            "instructions": instructions,
+        }
+        validator = None if self._compiler is None else self._compiler(grammar, grammar_syntax)
+        started = time.perf_counter()
+        primary = self._submit(self._primary, prompt, options, validator)
+        primary.add_done_callback(partial(self._observe, started))
+        done, _ = wait([primary], timeout=self._tracker.delay())
+        if done:
+            return primary.result()
+
+        record_hedge()
+        hedge = self._submit(self._secondary or self._primary, prompt, options, validator)
+        return _first_success({primary, hedge})
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Stream from the primary client without hedging."""
+        return self._primary.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+
+    def close(self) -> None:
+        """Stop the worker threads and close both clients."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._primary.close()
+        if self._secondary is not None:
+            self._secondary.close()
+
+
+async def _afirst_success(tasks: set[asyncio.Task[GenerationResult]]) -> GenerationResult:
+    errors: list[BaseException] = []
+    pending = tasks
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            exc = task.exception()
+            if exc is None:
+                return task.result()
+            errors.append(exc)
+    raise errors[0]
+
+
+class AsyncHedgedLLMClient(AsyncLLMClient):
+    """Async counterpart of ``HedgedLLMClient``; the losing request is cancelled."""
+
+    def __init__(
+        self,
+        primary: AsyncLLMClient,
+        secondary: AsyncLLMClient | None = None,
+        *,
+        tracker: LatencyTracker,
+    ) -> None:
+        """Hedge ``primary`` with ``secondary`` (or a second request to ``primary``)."""
+        self._primary = primary
+        self._secondary = secondary
+        self._tracker = tracker
+        self._compiler: ValidatorCompiler | None = None
+
+    def validating(self, compiler: "ValidatorCompiler") -> Self:
+        """Return a client sharing this one's latencies that only accepts output valid for the grammar."""
+        hedged = copy.copy(self)
+        hedged._compiler = compiler  # noqa: SLF001 - copy of this class
+        return hedged
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output, hedging slow requests."""
+        result = await self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return result.text
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result, hedging requests slower than the tracked percentile."""
+        validator = None if self._compiler is None else self._compiler(grammar, grammar_syntax)
+
+        async def call(client: AsyncLLMClient) -> GenerationResult:
+            result = await client.generate_result(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            )
+            return _checked(validator, result)
+
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(call(self._primary))
+        primary.add_done_callback(partial(self._observe, started))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self._tracker.delay())
+            if done:
+                return primary.result()
+
+            record_hedge()
+            tasks.add(asyncio.ensure_future(call(self._secondary or self._primary)))
+            return await _afirst_success(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _observe(self, started: float, task: asyncio.Task[GenerationResult]) -> None:
+        if not task.cancelled() and task.exception() is None:
+            self._tracker.observe(time.perf_counter() - started)
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream from the primary client without hedging."""
+        return self._primary.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+
+    async def aclose(self) -> None:
+        """Close both clients."""
+        await self._primary.aclose()
+        if self._secondary is not None:
+            await self._secondary.aclose()
+
+
+__all__ = [
+    "DEFAULT_MAX_WORKERS",
+    "AsyncHedgedLLMClient",
+    "HedgedLLMClient",
+    "LatencyTracker",
+]
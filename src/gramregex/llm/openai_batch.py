@@ -0,0 +1,425 @@
+"""OpenAI Batch API runner for large offline generation jobs.
+
+Instead of one ``responses.create`` call per prompt, prompts are written to a
+JSONL file of ``/v1/responses`` requests, uploaded, and processed as Batch API
+jobs within the provider's completion window at a lower price. Inputs larger
+than a single job allows are split into several jobs, which are all submitted
+before the first one is polled so they run concurrently on the provider side.
+Results are downloaded and yielded back in input order.
+
+With a job file, the IDs and input ranges of submitted jobs are saved as
+they are created, so a process that stops while the jobs run (which can take
+up to the completion window) reattaches to them when rerun with the same
+input instead of submitting and paying for them again.
+"""
+
+import hashlib
+import io
+import json
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Protocol, Self, cast
+
+from gramregex.batch import BatchItem
+from gramregex.llm import openai_client
+from gramregex.llm.base import GrammarSyntax, ReasoningEffort, VerbosityLevel
+from gramregex.settings import Settings
+
+BATCH_ENDPOINT = "/v1/responses"
+COMPLETION_WINDOW = "24h"
+# Provider limits per batch input file.
+MAX_REQUESTS_PER_BATCH = 50_000
+MAX_BATCH_FILE_BYTES = 190 * 1024 * 1024
+DEFAULT_POLL_INTERVAL = 30.0
+
+_CUSTOM_ID_PREFIX = "gramregex-"
+_TERMINAL_STATUSES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+
+class BatchJobError(RuntimeError):
+    """Raised for prompts a batch job did not answer successfully."""
+
+
+class FilesResource(Protocol):
+    """Subset of the OpenAI files resource used by the runner."""
+
+    def create(self, *, file: object, purpose: str) -> Any:
+        """Upload a file."""
+
+    def content(self, file_id: str) -> Any:
+        """Download a file's content."""
+
+
+class BatchesResource(Protocol):
+    """Subset of the OpenAI batches resource used by the runner."""
+
+    def create(self, **kwargs: object) -> Any:
+        """Create a batch job."""
+
+    def retrieve(self, batch_id: str) -> Any:
+        """Return the current state of a batch job."""
+
+
+class BatchClient(Protocol):
+    """Client exposing the files and batches resources."""
+
+    files: FilesResource
+    batches: BatchesResource
+
+    def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+
+
+def _custom_id(index: int) -> str:
+    return f"{_CUSTOM_ID_PREFIX}{index}"
+
+
+def _index(custom_id: object) -> int | None:
+    if not isinstance(custom_id, str) or not custom_id.startswith(_CUSTOM_ID_PREFIX):
+        return None
+    try:
+        return int(custom_id.removeprefix(_CUSTOM_ID_PREFIX))
+    except ValueError:
+        return None
+
+
+def batch_request_line(
+    index: int,
+    prompt: str,
+    *,
+    model: str,
+    grammar: str,
+    grammar_syntax: GrammarSyntax,
+    verbosity: VerbosityLevel | None = None,
+    reasoning_effort: ReasoningEffort | None = None,
+    instructions: str | None = None,
+) -> bytes:
+    """Return the JSONL line requesting ``prompt`` as input number ``index``."""
+    body = openai_client._build_response_kwargs(  # noqa: SLF001 - same request as the online client
+        model,
+        prompt,
+        grammar=grammar,
+        grammar_syntax=grammar_syntax,
+        verbosity=verbosity,
+        reasoning_effort=reasoning_effort,
+        instructions=instructions,
+    )
+    line = {"custom_id": _custom_id(index), "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+    return json.dumps(line, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def response_output_text(body: Mapping[str, Any]) -> str:
+    """Return the text of a Responses API response body as returned in batch output files."""
+    output = [item for item in body.get("output") or [] if isinstance(item, dict)]
+    texts = [
+        str(content.get("text", ""))
+        for item in output
+        if item.get("type") == "message"
+        for content in item.get("content") or []
+        if isinstance(content, dict) and content.get("type") == "output_text"
+    ]
+    if not texts:
+        texts = [str(item.get("input", "")) for item in output if item.get("type") == "custom_tool_call"]
+    if not texts:
+        message = "The response did not contain text output"
+        raise ValueError(message)
+    return "".join(texts)
+
+
+def parse_result_line(line: str | bytes) -> tuple[int, str | Exception] | None:
+    """Return ``(index, output or error)`` for a line of a batch output or error file.
+
+    Lines that do not belong to a gramregex request are ignored (``None``).
+    """
+    record = json.loads(line)
+    index = _index(record.get("custom_id"))
+    if index is None:
+        return None
+
+    error = record.get("error")
+    if error:
+        return index, BatchJobError(f"{error.get('code')}: {error.get('message')}")
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    status = response.get("status_code")
+    if status != 200:  # noqa: PLR2004 - HTTP OK
+        detail = (body.get("error") or {}).get("message") or "request failed"
+        return index, BatchJobError(f"HTTP {status}: {detail}")
+    try:
+        return index, response_output_text(body)
+    except ValueError as exc:
+        return index, exc
+
+
+@dataclass(slots=True)
+class BatchJob:
+    """A submitted batch job covering the prompts starting at ``start_index``."""
+
+    id: str
+    start_index: int
+    prompts: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True, slots=True)
+class _JobRecord:
+    id: str
+    start_index: int
+    count: int
+
+
+class JobFile:
+    """Small JSON file recording the batch jobs submitted for one input.
+
+    The file also holds a digest of the request options, so a rerun with a
+    different model or grammar is refused instead of mixing results. Saves
+    are atomic (write then rename).
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Record jobs in ``path``."""
+        self.path = path
+
+    def load(self, options: str) -> list[_JobRecord]:
+        """Return the recorded jobs, or none when the file does not exist."""
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            recorded_options = data["options"]
+            jobs = [_JobRecord(**job) for job in data["jobs"]]
+        except FileNotFoundError:
+            return []
+        except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError) as error:
+            msg = f"Corrupt batch job file {self.path}: {error}"
+            raise ValueError(msg) from error
+        if recorded_options != options:
+            msg = f"Batch job file {self.path} was written for a different model, grammar or options"
+            raise ValueError(msg)
+        return jobs
+
+    def save(self, options: str, jobs: list[_JobRecord]) -> None:
+        """Persist ``jobs``."""
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        temporary.write_text(json.dumps({"options": options, "jobs": [asdict(job) for job in jobs]}), encoding="utf-8")
+        temporary.replace(self.path)
+
+    def remove(self) -> None:
+        """Delete the file once every job's results have been consumed."""
+        self.path.unlink(missing_ok=True)
+
+
+def _chunks(
+    lines: Iterable[tuple[str, bytes]],
+    *,
+    max_requests: int,
+    max_bytes: int,
+) -> Iterator[tuple[list[str], bytes]]:
+    prompts: list[str] = []
+    payload = io.BytesIO()
+    for prompt, line in lines:
+        if prompts and (len(prompts) >= max_requests or payload.tell() + len(line) > max_bytes):
+            yield prompts, payload.getvalue()
+            prompts, payload = [], io.BytesIO()
+        prompts.append(prompt)
+        payload.write(line)
+    if prompts:
+        yield prompts, payload.getvalue()
+
+
+class OpenAIBatchRunner:
+    """Runs prompts through the OpenAI Batch API and yields results in input order."""
+
+    def __init__(
+        self,
+        settings: Settings,
+        *,
+        client: BatchClient | None = None,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_requests_per_batch: int = MAX_REQUESTS_PER_BATCH,
+        max_batch_bytes: int = MAX_BATCH_FILE_BYTES,
+        sleep: Callable[[float], None] = time.sleep,
+        on_status: Callable[[str], None] | None = None,
+        job_file: Path | None = None,
+    ) -> None:
+        """Create a runner; ``on_status`` receives human-readable progress messages.
+
+        With ``job_file``, submitted jobs are recorded there and reattached to
+        by a later run over the same input (see ``JobFile``).
+        """
+        if max_requests_per_batch < 1:
+            msg = "max_requests_per_batch must be at least 1"
+            raise ValueError(msg)
+        self._settings = settings
+        if client is None:
+            sdk = openai_client
+            client = cast(
+                "BatchClient",
+                sdk.OpenAI(
+                    api_key=settings.openai_api_key,
+                    base_url=settings.openai_base_url,
+                    timeout=sdk.NOT_GIVEN if settings.openai_timeout is None else settings.openai_timeout,
+                    max_retries=settings.retry_max_attempts - 1,
+                ),
+            )
+        self._client = client
+        self._poll_interval = poll_interval
+        self._max_requests = max_requests_per_batch
+        self._max_bytes = max_batch_bytes
+        self._sleep = sleep
+        self._on_status = on_status or (lambda _: None)
+        self._job_file = None if job_file is None else JobFile(job_file)
+
+    def submit(self, prompts: list[str], payload: bytes, *, start_index: int) -> BatchJob:
+        """Upload a JSONL ``payload`` of requests and start a batch job for it."""
+        uploaded = self._client.files.create(
+            file=("gramregex-batch.jsonl", payload, "application/jsonl"),
+            purpose="batch",
+        )
+        batch = self._client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW,
+            metadata={"source": "gramregex"},
+        )
+        job = BatchJob(id=str(batch.id), start_index=start_index, prompts=prompts)
+        self._on_status(f"batch {job.id}: submitted {len(prompts)} request(s)")
+        return job
+
+    def wait(self, job: BatchJob) -> object:
+        """Poll ``job`` until it reaches a terminal status and return the final batch object."""
+        last_message = ""
+        while True:
+            batch = self._client.batches.retrieve(job.id)
+            status = getattr(batch, "status", None)
+            counts = getattr(batch, "request_counts", None)
+            message = f"batch {job.id}: {status}"
+            if counts is not None:
+                message += f" ({getattr(counts, 'completed', 0)}/{getattr(counts, 'total', 0)} completed)"
+            if message != last_message:
+                self._on_status(message)
+                last_message = message
+            if status in _TERMINAL_STATUSES:
+                return batch
+            self._sleep(self._poll_interval)
+
+    def _download(self, file_id: object) -> Iterator[bytes]:
+        if not isinstance(file_id, str) or not file_id:
+            return
+        content = self._client.files.content(file_id)
+        data = getattr(content, "content", content)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        yield from (line for line in cast("bytes", data).splitlines() if line.strip())
+
+    def results(self, job: BatchJob, batch: object) -> Iterator[BatchItem]:
+        """Download the output and error files of a finished job and yield its items in order."""
+        outcomes: dict[int, str | Exception] = {}
+        for file_id in (getattr(batch, "output_file_id", None), getattr(batch, "error_file_id", None)):
+            for line in self._download(file_id):
+                parsed = parse_result_line(line)
+                if parsed is not None:
+                    outcomes[parsed[0]] = parsed[1]
+
+        status = getattr(batch, "status", None)
+        for offset, prompt in enumerate(job.prompts):
+            index = job.start_index + offset
+            outcome = outcomes.get(index, BatchJobError(f"batch {job.id} returned no result (status: {status})"))
+            if isinstance(outcome, Exception):
+                yield BatchItem(index=index, prompt=prompt, error=outcome)
+            else:
+                yield BatchItem(index=index, prompt=prompt, output=outcome)
+
+    def run(
+        self,
+        prompts: Iterable[str],
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[BatchItem]:
+        """Submit every prompt, wait for the jobs and yield results in input order.
+
+        Jobs recorded in the job file are reattached to: their prompts are
+        read from the start of ``prompts`` and only the rest is submitted.
+        The job file is removed once every result has been yielded.
+        """
+        model = self._settings.openai_model
+        options = hashlib.sha256(
+            json.dumps([model, grammar, grammar_syntax, verbosity, reasoning_effort, instructions]).encode("utf-8"),
+        ).hexdigest()
+        records = [] if self._job_file is None else self._job_file.load(options)
+        numbered = enumerate(prompts)
+        jobs: list[BatchJob] = []
+        for record in records:
+            chunk = [prompt for _, prompt in islice(numbered, record.count)]
+            if len(chunk) < record.count:
+                msg = f"The input has fewer prompts than batch {record.id} was submitted with"
+                raise ValueError(msg)
+            jobs.append(BatchJob(id=record.id, start_index=record.start_index, prompts=chunk))
+            self._on_status(f"batch {record.id}: reattached to {record.count} request(s)")
+
+        lines = (
+            (
+                prompt,
+                batch_request_line(
+                    index,
+                    prompt,
+                    model=model,
+                    grammar=grammar,
+                    grammar_syntax=grammar_syntax,
+                    verbosity=verbosity,
+                    reasoning_effort=reasoning_effort,
+                    instructions=instructions,
+                ),
+            )
+            for index, prompt in numbered
+        )
+        start_index = sum(record.count for record in records)
+        for chunk, payload in _chunks(lines, max_requests=self._max_requests, max_bytes=self._max_bytes):
+            jobs.append(self.submit(chunk, payload, start_index=start_index))
+            start_index += len(chunk)
+            if self._job_file is not None:
+                records.append(_JobRecord(jobs[-1].id, jobs[-1].start_index, len(chunk)))
+                self._job_file.save(options, records)
+
+        for job in jobs:
+            yield from self.results(job, self.wait(job))
+            job.prompts.clear()
+        if self._job_file is not None:
+            self._job_file.remove()
+
+    def close(self) -> None:
+        """Close the underlying SDK client."""
+        self._client.close()
+
+    def __enter__(self) -> Self:
+        """Return the runner for use in a ``with`` block."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the runner on exit."""
+        self.close()
+
+
+__all__ = [
+    "BATCH_ENDPOINT",
+    "COMPLETION_WINDOW",
+    "DEFAULT_POLL_INTERVAL",
+    "MAX_REQUESTS_PER_BATCH",
+    "BatchJob",
+    "BatchJobError",
+    "JobFile",
+    "OpenAIBatchRunner",
+    "batch_request_line",
+    "parse_result_line",
+    "response_output_text",
+]
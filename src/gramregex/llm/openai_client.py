@@ -1,18 +1,51 @@
 """OpenAI Responses API client implementation."""
 
-from typing import Protocol, cast
-from collections.abc import Sequence
-
-from openai import OpenAI
+import hashlib
+import json
+import sys
+import time
+from collections.abc import AsyncIterator, Iterator, Mapping, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Protocol, cast
 
+from gramregex.instrumentation import STAGE_REQUEST, record_stage, record_usage
 from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
     GrammarSyntax,
     LLMClient,
     ReasoningEffort,
     VerbosityLevel,
 )
+from gramregex.llm.scheduler import RequestScheduler, estimate_tokens
 from gramregex.settings import Settings
 
+if TYPE_CHECKING:
+    import httpx
+
+# The OpenAI SDK accounts for most of the package import time, so it is only
+# imported when the first client is constructed.
+_SDK_ATTRIBUTES = frozenset({"NOT_GIVEN", "AsyncOpenAI", "DefaultAsyncHttpxClient", "DefaultHttpxClient", "OpenAI"})
+
+# Distinct (model, grammar, options) combinations whose request template is kept.
+REQUEST_TEMPLATE_CACHE_SIZE = 256
+
+
+def __getattr__(name: str) -> Any:
+    """Resolve OpenAI SDK names on first access."""
+    if name not in _SDK_ATTRIBUTES:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    import openai
+
+    value = getattr(openai, name)
+    globals()[name] = value
+    return value
+
 
 class ResponsesResource(Protocol):
     """Subset of the OpenAI responses resource used by the client."""
@@ -26,6 +59,47 @@ class ResponsesClient(Protocol):
 
     responses: ResponsesResource
 
+    def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+
+
+class AsyncResponsesResource(Protocol):
+    """Subset of the async OpenAI responses resource used by the client."""
+
+    async def create(self, **kwargs: object) -> object:
+        """Create a response using the provided model and grammar."""
+
+
+class AsyncResponsesClient(Protocol):
+    """Async client exposing the responses resource."""
+
+    responses: AsyncResponsesResource
+
+    async def close(self) -> None:
+        """Close the underlying HTTP connection pool."""
+
+
+class ResponseStream(Protocol):
+    """Server-sent event stream returned by ``responses.create(stream=True)``."""
+
+    def __iter__(self) -> Iterator[object]:
+        """Iterate over stream events."""
+        ...
+
+    def close(self) -> None:
+        """Abort the underlying HTTP response."""
+
+
+class AsyncResponseStream(Protocol):
+    """Async server-sent event stream returned by ``responses.create(stream=True)``."""
+
+    def __aiter__(self) -> AsyncIterator[object]:
+        """Iterate over stream events."""
+        ...
+
+    async def close(self) -> None:
+        """Abort the underlying HTTP response."""
+
 
 class ResponseContent(Protocol):
     """Single text fragment returned by the model."""
@@ -39,15 +113,262 @@ class ResponseChoice(Protocol):
     content: Sequence[ResponseContent]
 
 
+def _connection_limits(settings: Settings) -> "httpx.Limits":
+    import httpx
+
+    return httpx.Limits(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_keepalive_connections,
+        keepalive_expiry=settings.openai_keepalive_expiry,
+    )
+
+
+@lru_cache(maxsize=REQUEST_TEMPLATE_CACHE_SIZE)
+def request_template(
+    *,
+    model: str,
+    grammar: str,
+    grammar_syntax: GrammarSyntax,
+    verbosity: VerbosityLevel | None,
+    reasoning_effort: ReasoningEffort | None,
+    instructions: str | None = None,
+) -> Mapping[str, object]:
+    """Return the prompt-independent part of a Responses API request.
+
+    Templates are cached per option set, so repeated calls with the same
+    grammar skip rebuilding the tool block and hashing the prompt-cache key.
+    The result is shared between calls and must not be mutated.
+    """
+    text_config: dict[str, object] = {"format": {"type": "text"}}
+    if verbosity:
+        text_config["verbosity"] = verbosity
+
+    tools: list[dict[str, object]] = [
+        {
+            "type": "custom",
+            "name": "cfg_grammar",
+            "description": "Validate output against the provided grammar.",
+            "format": {
+                "type": "grammar",
+                "syntax": grammar_syntax,
+                "definition": grammar,
+            },
+        },
+    ]
+
+    # Only ``input`` varies per prompt: instructions and the grammar tool form a
+    # stable prefix, and the cache key routes requests sharing it to the same
+    # provider-side prompt cache.
+    template: dict[str, object] = {
+        "model": model,
+        "text": text_config,
+        "tools": tools,
+        "parallel_tool_calls": False,
+        "prompt_cache_key": prompt_cache_key(grammar, grammar_syntax, instructions),
+    }
+    if instructions:
+        template["instructions"] = instructions
+    if reasoning_effort:
+        template["reasoning"] = {"effort": reasoning_effort}
+    return MappingProxyType(template)
+
+
+@dataclass(frozen=True, slots=True)
+class PreparedTemplate:
+    """Request template built once for a fixed option set, used by requests made under ``using_template``."""
+
+    options: tuple[object, ...]
+    template: Mapping[str, object]
+
+
+_prepared: ContextVar[PreparedTemplate | None] = ContextVar("gramregex_prepared_template", default=None)
+
+
+def prepare_template(
+    *,
+    model: str,
+    grammar: str,
+    grammar_syntax: GrammarSyntax,
+    verbosity: VerbosityLevel | None,
+    reasoning_effort: ReasoningEffort | None,
+    instructions: str | None = None,
+) -> PreparedTemplate:
+    """Return the request template for one option set, held so requests under ``using_template`` skip its lookup.
+
+    The template itself comes from the shared ``request_template`` cache.
+    """
+    return PreparedTemplate(
+        (model, grammar, grammar_syntax, verbosity, reasoning_effort, instructions),
+        request_template(
+            model=model,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        ),
+    )
+
+
+@contextmanager
+def using_template(prepared: PreparedTemplate) -> Iterator[None]:
+    """Make requests with ``prepared``'s options in the enclosed block use its template."""
+    token = _prepared.set(prepared)
+    try:
+        yield
+    finally:
+        _prepared.reset(token)
+
+
+def _build_response_kwargs(
+    model: str,
+    prompt: str,
+    *,
+    grammar: str,
+    grammar_syntax: GrammarSyntax,
+    verbosity: VerbosityLevel | None,
+    reasoning_effort: ReasoningEffort | None,
+    instructions: str | None = None,
+) -> dict[str, object]:
+    prepared = _prepared.get()
+    # A routed request may run on another model than the prepared one, so the options are compared first.
+    if prepared is not None and prepared.options == (
+        model,
+        grammar,
+        grammar_syntax,
+        verbosity,
+        reasoning_effort,
+        instructions,
+    ):
+        response_kwargs = dict(prepared.template)
+    else:
+        response_kwargs = dict(
+            request_template(
+                model=model,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            ),
+        )
+    response_kwargs["input"] = prompt
+    return response_kwargs
+
+
+def prompt_cache_key(grammar: str, grammar_syntax: GrammarSyntax, instructions: str | None = None) -> str:
+    """Return the provider prompt-cache key shared by requests with the same static prefix."""
+    payload = json.dumps([grammar_syntax, grammar, instructions], ensure_ascii=False, separators=(",", ":"))
+    return f"gramregex-{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]}"
+
+
+def _usage_tokens(response: object) -> int | None:
+    total = getattr(getattr(response, "usage", None), "total_tokens", None)
+    return total if isinstance(total, int) else None
+
+
+def _completed_usage_tokens(event: object) -> int | None:
+    """Return the total tokens reported by a ``response.completed`` stream event, None for other events."""
+    if getattr(event, "type", None) != "response.completed":
+        return None
+    return _usage_tokens(getattr(event, "response", None))
+
+
+def _int_or_none(value: object) -> int | None:
+    return value if isinstance(value, int) else None
+
+
+def _usage_fields(response: object) -> dict[str, int | None]:
+    usage = getattr(response, "usage", None)
+    return {
+        "input_tokens": _int_or_none(getattr(usage, "input_tokens", None)),
+        "output_tokens": _int_or_none(getattr(usage, "output_tokens", None)),
+        "reasoning_tokens": _int_or_none(
+            getattr(getattr(usage, "output_tokens_details", None), "reasoning_tokens", None),
+        ),
+        "cached_tokens": _int_or_none(getattr(getattr(usage, "input_tokens_details", None), "cached_tokens", None)),
+        "total_tokens": _int_or_none(getattr(usage, "total_tokens", None)),
+    }
+
+
+def _record_response_usage(response: object) -> None:
+    if getattr(response, "usage", None) is None:
+        return
+    usage = _usage_fields(response)
+    record_usage(
+        input_tokens=usage["input_tokens"],
+        output_tokens=usage["output_tokens"],
+        cached_tokens=usage["cached_tokens"],
+        total_tokens=usage["total_tokens"],
+    )
+
+
+def _build_result(response: object, *, model: str, latency: float) -> GenerationResult:
+    response_model = getattr(response, "model", None)
+    response_id = getattr(response, "id", None)
+    return GenerationResult(
+        text=_extract_output_text(response),
+        model=response_model if isinstance(response_model, str) else model,
+        response_id=response_id if isinstance(response_id, str) else None,
+        latency=latency,
+        **_usage_fields(response),
+    )
+
+
+def _extract_output_text(response: object) -> str:
+    output_text = getattr(response, "output_text", None)
+    if isinstance(output_text, str):
+        return output_text
+
+    choices: Sequence[ResponseChoice] | None = getattr(response, "output", None)
+    if isinstance(choices, Sequence) and choices:
+        first = choices[0]
+        content: Sequence[ResponseContent] | None = getattr(first, "content", None)
+        if isinstance(content, Sequence) and content:
+            text: str | None = getattr(content[0], "text", None)
+            if isinstance(text, str):
+                return text
+
+    message = "The response did not contain text output"
+    raise ValueError(message)
+
+
+_TEXT_DELTA_EVENTS = frozenset({"response.output_text.delta", "response.custom_tool_call_input.delta"})
+_FAILURE_EVENTS = frozenset({"error", "response.failed"})
+
+
+def _stream_delta(event: object) -> str | None:
+    """Return the text delta carried by a stream event, raising on failure events."""
+    event_type = getattr(event, "type", None)
+    if event_type in _TEXT_DELTA_EVENTS:
+        delta = getattr(event, "delta", None)
+        return delta if isinstance(delta, str) else None
+    if event_type == "response.completed":
+        _record_response_usage(getattr(event, "response", None))
+        return None
+    if event_type in _FAILURE_EVENTS:
+        error = getattr(getattr(event, "response", None), "error", None) or event
+        detail = getattr(error, "message", None) or event_type
+        message = f"The response stream failed: {detail}"
+        raise ValueError(message)
+    return None
+
+
 class OpenAIResponsesClient(LLMClient):
     """LLM client using the OpenAI Responses API with CFG grammar support."""
 
     def __init__(self, settings: Settings) -> None:
         """Initialize the client with application settings."""
         self._settings = settings
-        client = OpenAI(
+        self._scheduler = RequestScheduler.from_settings(settings)
+        # Retries are handled by the scheduler so they respect the shared rate-limit budget.
+        sdk = sys.modules[__name__]
+        client = sdk.OpenAI(
             api_key=settings.openai_api_key,
             base_url=settings.openai_base_url,
+            timeout=sdk.NOT_GIVEN if settings.openai_timeout is None else settings.openai_timeout,
+            max_retries=0,
+            http_client=sdk.DefaultHttpxClient(limits=_connection_limits(settings)),
         )
         self._client = cast("ResponsesClient", client)
 
@@ -59,56 +380,223 @@ class OpenAIResponsesClient(LLMClient):
         grammar_syntax: GrammarSyntax,
         verbosity: VerbosityLevel | None = None,
         reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
     ) -> str:
         """Generate output using the configured model and grammar."""
-        text_config: dict[str, object] = {"format": {"type": "text"}}
-        if verbosity:
-            text_config["verbosity"] = verbosity
-
-        tools: list[dict[str, object]] = [
-            {
-                "type": "custom",
-                "name": "cfg_grammar",
-                "description": "Validate output against the provided grammar.",
-                "format": {
-                    "type": "grammar",
-                    "syntax": grammar_syntax,
-                    "definition": grammar,
-                },
-            },
-        ]
-
-        reasoning: dict[str, str] | None = None
-        if reasoning_effort:
-            reasoning = {"effort": reasoning_effort}
-
-        response_kwargs: dict[str, object] = {
-            "model": self._settings.openai_model,
-            "input": prompt,
-            "text": text_config,
-            "tools": tools,
-            "parallel_tool_calls": False,
-        }
-        if reasoning:
-            response_kwargs["reasoning"] = reasoning
-
-        response = self._client.responses.create(**response_kwargs)
-        return self._extract_output_text(response)
-
-    @staticmethod
-    def _extract_output_text(response: object) -> str:
-        output_text = getattr(response, "output_text", None)
-        if isinstance(output_text, str):
-            return output_text
-
-        choices: Sequence[ResponseChoice] | None = getattr(response, "output", None)
-        if isinstance(choices, Sequence) and choices:
-            first = choices[0]
-            content: Sequence[ResponseContent] | None = getattr(first, "content", None)
-            if isinstance(content, Sequence) and content:
-                text: str | None = getattr(content[0], "text", None)
-                if isinstance(text, str):
-                    return text
-
-        message = "The response did not contain text output"
-        raise ValueError(message)
+        result = self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return result.text
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate output and return it with the usage, model and response id the API reported."""
+        response_kwargs = _build_response_kwargs(
+            self._settings.openai_model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        tokens = estimate_tokens(prompt, grammar, instructions or "")
+        started = time.perf_counter()
+        response = self._scheduler.run(lambda: self._client.responses.create(**response_kwargs), tokens=tokens)
+        latency = time.perf_counter() - started
+        record_stage(STAGE_REQUEST, latency)
+        self._scheduler.record_usage(tokens, _usage_tokens(response))
+        _record_response_usage(response)
+        return _build_result(response, model=self._settings.openai_model, latency=latency)
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Yield text deltas from the Responses API event stream as they arrive.
+
+        Closing the generator early aborts the underlying HTTP response.
+        """
+        response_kwargs = _build_response_kwargs(
+            self._settings.openai_model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        tokens = estimate_tokens(prompt, grammar, instructions or "")
+        started = time.perf_counter()
+        events = cast(
+            "ResponseStream",
+            self._scheduler.run(
+                lambda: self._client.responses.create(**response_kwargs, stream=True),
+                tokens=tokens,
+            ),
+        )
+        record_stage(STAGE_REQUEST, time.perf_counter() - started)
+        received = False
+        usage: int | None = None
+        try:
+            for event in events:
+                usage = _completed_usage_tokens(event) or usage
+                delta = _stream_delta(event)
+                if delta:
+                    received = True
+                    yield delta
+        finally:
+            events.close()
+            # As for a non-streamed call; a stream closed before completing keeps its estimate.
+            self._scheduler.record_usage(tokens, usage)
+
+        if not received:
+            message = "The response did not contain text output"
+            raise ValueError(message)
+
+    def close(self) -> None:
+        """Close the pooled HTTP connections of the underlying SDK client."""
+        self._client.close()
+
+
+class AsyncOpenAIResponsesClient(AsyncLLMClient):
+    """Async LLM client using the OpenAI Responses API with CFG grammar support."""
+
+    def __init__(self, settings: Settings) -> None:
+        """Initialize the client with application settings."""
+        self._settings = settings
+        self._scheduler = RequestScheduler.from_settings(settings)
+        # Retries are handled by the scheduler so they respect the shared rate-limit budget.
+        sdk = sys.modules[__name__]
+        client = sdk.AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            base_url=settings.openai_base_url,
+            timeout=sdk.NOT_GIVEN if settings.openai_timeout is None else settings.openai_timeout,
+            max_retries=0,
+            http_client=sdk.DefaultAsyncHttpxClient(limits=_connection_limits(settings)),
+        )
+        self._client = cast("AsyncResponsesClient", client)
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output using the configured model and grammar."""
+        result = await self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return result.text
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate output and return it with the usage, model and response id the API reported."""
+        response_kwargs = _build_response_kwargs(
+            self._settings.openai_model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        tokens = estimate_tokens(prompt, grammar, instructions or "")
+        started = time.perf_counter()
+        response = await self._scheduler.arun(lambda: self._client.responses.create(**response_kwargs), tokens=tokens)
+        latency = time.perf_counter() - started
+        record_stage(STAGE_REQUEST, latency)
+        self._scheduler.record_usage(tokens, _usage_tokens(response))
+        _record_response_usage(response)
+        return _build_result(response, model=self._settings.openai_model, latency=latency)
+
+    async def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield text deltas from the Responses API event stream as they arrive.
+
+        Closing the generator early aborts the underlying HTTP response.
+        """
+        response_kwargs = _build_response_kwargs(
+            self._settings.openai_model,
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        tokens = estimate_tokens(prompt, grammar, instructions or "")
+        started = time.perf_counter()
+        events = cast(
+            "AsyncResponseStream",
+            await self._scheduler.arun(
+                lambda: self._client.responses.create(**response_kwargs, stream=True),
+                tokens=tokens,
+            ),
+        )
+        record_stage(STAGE_REQUEST, time.perf_counter() - started)
+        received = False
+        usage: int | None = None
+        try:
+            async for event in events:
+                usage = _completed_usage_tokens(event) or usage
+                delta = _stream_delta(event)
+                if delta:
+                    received = True
+                    yield delta
+        finally:
+            await events.close()
+            # As for a non-streamed call; a stream closed before completing keeps its estimate.
+            self._scheduler.record_usage(tokens, usage)
+
+        if not received:
+            message = "The response did not contain text output"
+            raise ValueError(message)
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections of the underlying SDK client."""
+        await self._client.close()
@@ -0,0 +1,298 @@
+"""Retry, backoff and client-side rate limiting for provider requests."""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+from gramregex.instrumentation import STAGE_BACKOFF, STAGE_THROTTLE, record_retry, record_stage
+from gramregex.settings import Settings
+
+_T = TypeVar("_T")
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429})
+# Rate-limit responses with these codes will not succeed on retry.
+_FATAL_ERROR_CODES = frozenset({"insufficient_quota"})
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """Jittered exponential backoff for retryable provider errors."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def backoff(self, attempt: int) -> float:
+        """Return a full-jitter delay before retry number ``attempt`` (starting at 1)."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)  # noqa: S311 - jitter, not cryptography
+
+
+def _status_code(exc: BaseException) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Return True for rate limits, server errors, timeouts and dropped connections."""
+    if getattr(exc, "code", None) in _FATAL_ERROR_CODES:
+        return False
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES or status >= 500  # noqa: PLR2004 - 5xx range
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+
+    import httpx
+    import openai
+
+    return isinstance(exc, (openai.APIConnectionError, httpx.TransportError))
+
+
+def retry_after(exc: BaseException, *, now: float | None = None) -> float | None:
+    """Return the server-requested delay in seconds from ``Retry-After`` headers, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is None:
+        return None
+
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds is not None:
+        try:
+            return max(float(milliseconds) / 1000, 0.0)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    current = time.time() if now is None else now
+    return max(moment.timestamp() - current, 0.0)
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Roughly estimate the input tokens of ``texts`` (about four characters per token)."""
+    return sum(len(text) for text in texts) // 4 + 1
+
+
+class TokenBucket:
+    """Thread-safe per-minute budget refilled continuously.
+
+    ``reserve`` always succeeds and returns how long the caller must wait
+    before its reservation is covered, so sync and async callers can share
+    one bucket and are served in arrival order.
+    """
+
+    def __init__(self, per_minute: int, *, clock: Callable[[], float] = time.monotonic) -> None:
+        """Start with a full minute of budget."""
+        if per_minute < 1:
+            msg = "per_minute must be at least 1"
+            raise ValueError(msg)
+        self._capacity = float(per_minute)
+        self._rate = per_minute / 60
+        self._tokens = self._capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` from the budget and return the seconds to wait until it is available."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+            return max(-self._tokens / self._rate, 0.0)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) ``amount`` after the real cost is known."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._capacity, self._tokens - amount)
+
+
+class RateBudget:
+    """RPM/TPM buckets and rate-limit pause shared by the schedulers of one account.
+
+    Provider limits apply per API key and endpoint, so every client sending
+    with the same key to the same base URL draws from one budget (see
+    ``shared_budget``) instead of each enforcing the full limit on its own.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Create a budget; unset limits are not enforced."""
+        self.requests = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def reserve(self, tokens: int, *, request: bool = True) -> float:
+        """Reserve a request and ``tokens``, returning the seconds to wait before sending."""
+        delay = 0.0
+        if self.requests is not None and request:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(tokens))
+        with self._lock:
+            return max(delay, self._paused_until - self._clock())
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request back for ``seconds``, as a provider's ``Retry-After`` asks."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+
+_budgets: dict[tuple[object, ...], RateBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def shared_budget(settings: Settings) -> RateBudget:
+    """Return the process-wide budget for the API key and base URL of ``settings``."""
+    key = (settings.openai_api_key, settings.openai_base_url, settings.rate_limit_rpm, settings.rate_limit_tpm)
+    with _budgets_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = RateBudget(requests_per_minute=settings.rate_limit_rpm, tokens_per_minute=settings.rate_limit_tpm)
+            _budgets[key] = budget
+        return budget
+
+
+class RequestScheduler:
+    """Runs provider calls under RPM/TPM budgets, retrying retryable failures.
+
+    A rate-limit response with ``Retry-After`` pauses every caller sharing the
+    budget, not just the one that received it. The tokens of a call are
+    reserved once, however many attempts it takes, and refunded when it
+    finally fails.
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy | None = None,
+        *,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+        budget: RateBudget | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """Create a scheduler drawing from ``budget``, or from its own budget with the given limits."""
+        self._policy = policy or RetryPolicy()
+        self._budget = budget or RateBudget(
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+            clock=clock,
+        )
+        self._sleep = sleep
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RequestScheduler":
+        """Build a scheduler from the retry settings, sharing the rate-limit budget of its account."""
+        return cls(
+            RetryPolicy(
+                max_attempts=settings.retry_max_attempts,
+                base_delay=settings.retry_base_delay,
+                max_delay=settings.retry_max_delay,
+            ),
+            budget=shared_budget(settings),
+        )
+
+    def _admission_delay(self, tokens: int, attempt: int) -> float:
+        # A retry is another request, but the tokens of the call were already reserved by its first attempt.
+        return self._budget.reserve(tokens if attempt == 1 else 0)
+
+    def _refund(self, tokens: int) -> None:
+        if self._budget.tokens is not None and tokens:
+            self._budget.tokens.adjust(-tokens)
+
+    def _retry_delay(self, exc: Exception, attempt: int) -> float | None:
+        if attempt >= self._policy.max_attempts or not is_retryable(exc):
+            return None
+        requested = retry_after(exc)
+        if requested is None:
+            return self._policy.backoff(attempt)
+        self._budget.pause(requested)
+        return requested
+
+    def record_usage(self, estimated: int, actual: int | None) -> None:
+        """Correct the token budget once the provider reports the real usage."""
+        if self._budget.tokens is not None and actual is not None:
+            self._budget.tokens.adjust(actual - estimated)
+
+    def run(self, call: Callable[[], _T], *, tokens: int = 0) -> _T:
+        """Invoke ``call`` within the budgets, retrying retryable errors with backoff."""
+        attempt = 0
+        while True:
+            attempt += 1
+            delay = self._admission_delay(tokens, attempt)
+            if delay > 0:
+                record_stage(STAGE_THROTTLE, delay)
+                self._sleep(delay)
+            try:
+                return call()
+            except Exception as exc:
+                retry_delay = self._retry_delay(exc, attempt)
+                if retry_delay is None:
+                    self._refund(tokens)
+                    raise
+                record_retry()
+                record_stage(STAGE_BACKOFF, retry_delay)
+                self._sleep(retry_delay)
+
+    async def arun(self, call: Callable[[], Awaitable[_T]], *, tokens: int = 0) -> _T:
+        """Async counterpart of ``run``; waiting never blocks the event loop."""
+        attempt = 0
+        while True:
+            attempt += 1
+            delay = self._admission_delay(tokens, attempt)
+            if delay > 0:
+                record_stage(STAGE_THROTTLE, delay)
+                await asyncio.sleep(delay)
+            try:
+                return await call()
+            except Exception as exc:
+                retry_delay = self._retry_delay(exc, attempt)
+                if retry_delay is None:
+                    self._refund(tokens)
+                    raise
+                record_retry()
+                record_stage(STAGE_BACKOFF, retry_delay)
+                await asyncio.sleep(retry_delay)
+
+
+__all__ = [
+    "RETRYABLE_STATUS_CODES",
+    "RateBudget",
+    "RequestScheduler",
+    "RetryPolicy",
+    "TokenBucket",
+    "estimate_tokens",
+    "is_retryable",
+    "retry_after",
+    "shared_budget",
+]
@@ -0,0 +1,104 @@
+"""Packing of several short prompts into a single request.
+
+A pack of ``count`` prompts is sent as one numbered prompt with a wrapper
+grammar that makes the model answer every item in order, each after a
+``<<<N>>>`` marker line and constrained by the user's grammar. The output is
+then split back at the markers, and each item is checked against the user's
+grammar before it is mapped back to its prompt. For short classification
+prompts this shares the per-request overhead, the instructions and the
+grammar tool definition across the whole pack.
+"""
+
+import json
+import re
+
+from gramregex.llm.base import GrammarSyntax
+
+PACK_ITEM_RULE = "gramregex_item"
+PACK_INSTRUCTIONS = (
+    "Respond to each of the {count} numbered inputs below independently, in order. "
+    "Write the response to input N after a line <<<N>>> and write nothing else."
+)
+
+# Escapes and character classes are matched first so that only constructs outside them are rejected.
+_REGEX_UNPACKABLE = re.compile(
+    r"\\(?P<escape>.)|\[\^?\]?(?:\\.|[^\]\\])*\]|(?P<named>\(\?P?<(?![=!])|\(\?P=)|(?P<anchor>[\^$])",
+    re.DOTALL,
+)
+# String literals, regexps and comments are skipped so that only references to the rule are renamed.
+_LARK_START = re.compile(r'//[^\n]*|"(?:\\.|[^"\\])*"|/(?:\\.|[^/\\\n])+/[imslux]*|(?<![\w.])(start)\b')
+
+
+class PackingError(ValueError):
+    """Raised when a packed output cannot be split back into its items."""
+
+
+def _marker(number: int) -> str:
+    return f"<<<{number}>>>\n"
+
+
+def _separator(number: int) -> str:
+    """Return the text preceding item ``number`` in a packed output."""
+    return _marker(number) if number == 1 else f"\n{_marker(number)}"
+
+
+def pack_grammar(grammar: str, grammar_syntax: GrammarSyntax, count: int) -> str:
+    """Wrap ``grammar`` into a grammar emitting ``count`` marked outputs, each matching ``grammar``.
+
+    Lark grammars must define the ``start`` rule, which becomes the item rule.
+    Regex grammars are repeated as a whole, so anchors, named groups and
+    backreferences (which would point into the first copy) are rejected.
+    """
+    if grammar_syntax == "regex":
+        _check_packable_regex(grammar)
+        return "\\n".join(f"<<<{number}>>>\\n(?:{grammar})" for number in range(1, count + 1))
+
+    renamed = _LARK_START.sub(lambda match: PACK_ITEM_RULE if match.group(1) else match.group(0), grammar)
+    if renamed == grammar:
+        msg = "Packing a lark grammar requires a 'start' rule"
+        raise ValueError(msg)
+    # JSON string escapes are valid Lark string literals.
+    items = " ".join(f"{json.dumps(_separator(number))} {PACK_ITEM_RULE}" for number in range(1, count + 1))
+    return f"start: {items}\n{renamed}"
+
+
+def _check_packable_regex(grammar: str) -> None:
+    for match in _REGEX_UNPACKABLE.finditer(grammar):
+        escape = match.group("escape")
+        if escape is None:
+            unpackable = match.group("named") is not None or match.group("anchor") is not None
+        else:
+            # Numbered and named backreferences, and string anchors.
+            unpackable = escape in "123456789gkAzZ"
+        if not unpackable:
+            continue
+        msg = f"Cannot pack a regex grammar using anchors, named groups or backreferences: {match.group(0)!r}"
+        raise ValueError(msg)
+
+
+def pack_prompts(prompts: list[str]) -> str:
+    """Return the single prompt asking for a response to each of ``prompts``."""
+    numbered = "\n\n".join(f"{_marker(number)}{prompt}" for number, prompt in enumerate(prompts, start=1))
+    return f"{PACK_INSTRUCTIONS.format(count=len(prompts))}\n\n{numbered}"
+
+
+def split_output(output: str, count: int) -> list[str]:
+    """Split a packed ``output`` into its ``count`` item outputs."""
+    if not output.startswith(_separator(1)):
+        msg = "Packed output does not start with the first marker"
+        raise PackingError(msg)
+    items: list[str] = []
+    position = len(_separator(1))
+    for number in range(2, count + 1):
+        separator = _separator(number)
+        end = output.find(separator, position)
+        if end < 0:
+            msg = f"Packed output has no marker for item {number}"
+            raise PackingError(msg)
+        items.append(output[position:end])
+        position = end + len(separator)
+    items.append(output[position:])
+    return items
+
+
+__all__ = ["PACK_INSTRUCTIONS", "PACK_ITEM_RULE", "PackingError", "pack_grammar", "pack_prompts", "split_output"]
@@ -0,0 +1,308 @@
+"""Escalating routes from cheap to strong model configurations.
+
+A route is an ordered list of tiers, e.g. ``gpt-4.1-mini:minimal,gpt-4.1:high``.
+Each request starts on the first (cheapest) tier and moves to the next one
+only when the output fails local grammar validation or a user-supplied
+check, so most requests never pay for a large model or high reasoning effort.
+Provider errors are not escalated; they are retried by the request scheduler.
+"""
+
+from collections.abc import AsyncIterator, Callable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import cast, get_args
+
+from gramregex.instrumentation import record_escalation
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+from gramregex.settings import Settings
+from gramregex.validator import (
+    GrammarValidationError,
+    GrammarValidator,
+    ValidatorCompiler,
+    avalidate_stream,
+    validate_stream,
+)
+
+OutputCheck = Callable[[str], bool]
+
+
+class OutputCheckError(GrammarValidationError):
+    """Raised when model output is rejected by a user-supplied check."""
+
+
+@dataclass(frozen=True, slots=True)
+class RouteTier:
+    """One configuration of a route; unset fields keep the request's values."""
+
+    model: str | None = None
+    reasoning_effort: ReasoningEffort | None = None
+
+
+def parse_route(spec: str) -> tuple[RouteTier, ...]:
+    """Parse a comma-separated route such as ``small:minimal,large:high``.
+
+    Each tier is ``model``, ``model:effort`` or ``:effort``; an omitted model
+    keeps the configured one.
+    """
+    efforts = get_args(ReasoningEffort)
+    tiers: list[RouteTier] = []
+    for raw in spec.split(","):
+        entry = raw.strip()
+        if not entry:
+            continue
+        model, _, effort = entry.partition(":")
+        if effort and effort not in efforts:
+            msg = f"Invalid reasoning effort {effort!r} in route tier {entry!r}"
+            raise ValueError(msg)
+        reasoning_effort = cast("ReasoningEffort", effort) if effort else None
+        tiers.append(RouteTier(model=model.strip() or None, reasoning_effort=reasoning_effort))
+    if not tiers:
+        msg = "A route needs at least one tier"
+        raise ValueError(msg)
+    return tuple(tiers)
+
+
+def tier_settings(settings: Settings, tier: RouteTier) -> Settings:
+    """Return ``settings`` with the tier's model applied."""
+    if tier.model is None or tier.model == settings.openai_model:
+        return settings
+    return settings.model_copy(update={"openai_model": tier.model})
+
+
+class _Router:
+    """Checks tier outputs and decides whether to escalate."""
+
+    def __init__(self, *, compiler: ValidatorCompiler | None, check: OutputCheck | None) -> None:
+        self._compiler = compiler
+        self._check = check
+
+    def validator(self, grammar: str, grammar_syntax: GrammarSyntax) -> GrammarValidator | None:
+        return self._compiler(grammar, grammar_syntax) if self._compiler is not None else None
+
+    def checker(self, grammar: str, grammar_syntax: GrammarSyntax) -> Callable[[str], str]:
+        validator = self.validator(grammar, grammar_syntax)
+
+        def accept(text: str) -> str:
+            if validator is not None:
+                validator.validate(text)
+            if self._check is not None and not self._check(text):
+                msg = f"Output rejected by check: {text!r}"
+                raise OutputCheckError(msg)
+            return text
+
+        return accept
+
+    @staticmethod
+    def passes(accept: Callable[[str], str], text: str, *, final: bool) -> bool:
+        """Return whether ``text`` is accepted; the final tier's rejection is raised instead."""
+        try:
+            accept(text)
+        except GrammarValidationError:
+            if final:
+                raise
+            return False
+        return True
+
+
+class RoutingLLMClient(LLMClient):
+    """LLM client trying route tiers in order until an output passes the checks.
+
+    ``tiers`` pairs each tier with the client serving its model. With a
+    ``compiler`` outputs are validated against the request grammar; ``check``
+    adds a caller-defined test. When every tier fails, the last tier's
+    ``GrammarValidationError`` (or ``OutputCheckError``) is raised.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[tuple[RouteTier, LLMClient]],
+        *,
+        compiler: ValidatorCompiler | None = None,
+        check: OutputCheck | None = None,
+    ) -> None:
+        """Route requests through ``tiers``, cheapest first."""
+        if not tiers:
+            msg = "A route needs at least one tier"
+            raise ValueError(msg)
+        self._tiers = tuple(tiers)
+        self._router = _Router(compiler=compiler, check=check)
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output on the first tier whose output passes the checks."""
+        return self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        ).text
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result on the first tier whose output passes the checks."""
+        accept = self._router.checker(grammar, grammar_syntax)
+        for position, (tier, client) in enumerate(self._tiers):
+            if position:
+                record_escalation()
+            result = client.generate_result(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=tier.reasoning_effort or reasoning_effort,
+                instructions=instructions,
+            )
+            if self._router.passes(accept, result.text, final=position == len(self._tiers) - 1):
+                return result
+        return result
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Stream from the strongest tier.
+
+        Delivered deltas cannot be taken back, so streams are not escalated;
+        with a ``compiler`` they are validated as they arrive.
+        """
+        tier, client = self._tiers[-1]
+        deltas = client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=tier.reasoning_effort or reasoning_effort,
+            instructions=instructions,
+        )
+        validator = self._router.validator(grammar, grammar_syntax)
+        return deltas if validator is None else validate_stream(deltas, validator)
+
+
+class AsyncRoutingLLMClient(AsyncLLMClient):
+    """Async counterpart of ``RoutingLLMClient``."""
+
+    def __init__(
+        self,
+        tiers: Sequence[tuple[RouteTier, AsyncLLMClient]],
+        *,
+        compiler: ValidatorCompiler | None = None,
+        check: OutputCheck | None = None,
+    ) -> None:
+        """Route requests through ``tiers``, cheapest first."""
+        if not tiers:
+            msg = "A route needs at least one tier"
+            raise ValueError(msg)
+        self._tiers = tuple(tiers)
+        self._router = _Router(compiler=compiler, check=check)
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output on the first tier whose output passes the checks."""
+        result = await self.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return result.text
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result on the first tier whose output passes the checks."""
+        accept = self._router.checker(grammar, grammar_syntax)
+        for position, (tier, client) in enumerate(self._tiers):
+            if position:
+                record_escalation()
+            result = await client.generate_result(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=tier.reasoning_effort or reasoning_effort,
+                instructions=instructions,
+            )
+            if self._router.passes(accept, result.text, final=position == len(self._tiers) - 1):
+                return result
+        return result
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream from the strongest tier; streams are not escalated."""
+        tier, client = self._tiers[-1]
+        deltas = client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=tier.reasoning_effort or reasoning_effort,
+            instructions=instructions,
+        )
+        validator = self._router.validator(grammar, grammar_syntax)
+        return deltas if validator is None else avalidate_stream(deltas, validator)
+
+
+__all__ = [
+    "AsyncRoutingLLMClient",
+    "OutputCheck",
+    "OutputCheckError",
+    "RouteTier",
+    "RoutingLLMClient",
+    "parse_route",
+    "tier_settings",
+]
@@ -1,11 +1,25 @@
 """Application settings loaded from environment variables."""
 
+import json
 from functools import lru_cache
 
 from pathlib import Path
+from typing import Annotated, Literal
 
-from pydantic import AliasChoices, Field, field_validator, model_validator
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_validator, model_validator
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
+
+BalancingStrategy = Literal["round_robin", "least_outstanding"]
+
+
+class OpenAIEndpoint(BaseModel):
+    """One OpenAI-compatible backend requests can be balanced across."""
+
+    model_config = ConfigDict(frozen=True)
+
+    base_url: str | None = Field(default=None, description="Base URL (the public OpenAI API when unset)")
+    api_key: str | None = Field(default=None, description="API key (``openai_api_key`` when unset)")
+    weight: int = Field(default=1, ge=1, description="Relative share of requests sent to this endpoint")
 
 
 class Settings(BaseSettings):
@@ -19,11 +33,154 @@ class Settings(BaseSettings):
         default=None, description="Optional base URL for OpenAI-compatible endpoints",
     )
     openai_model: str = Field(default="gpt-4.1-mini", description="Default OpenAI model name")
+    openai_endpoints: Annotated[tuple[OpenAIEndpoint, ...], NoDecode] = Field(
+        default=(),
+        description="Backends to balance requests across, as JSON (``openai_base_url`` only when empty)",
+        validation_alias=AliasChoices("GRAMREGEX_ENDPOINTS", "openai_endpoints"),
+    )
+    balancing_strategy: BalancingStrategy = Field(
+        default="round_robin",
+        description="How requests are spread across endpoints: weighted round robin or least outstanding",
+        validation_alias=AliasChoices("GRAMREGEX_BALANCING_STRATEGY", "balancing_strategy"),
+    )
+    circuit_failure_threshold: int = Field(
+        default=5,
+        ge=1,
+        description="Consecutive failures after which an endpoint is taken out of rotation",
+        validation_alias=AliasChoices("GRAMREGEX_CIRCUIT_FAILURE_THRESHOLD", "circuit_failure_threshold"),
+    )
+    circuit_reset_timeout: float = Field(
+        default=30.0,
+        ge=0,
+        description="Seconds before a failed endpoint receives a trial request again",
+        validation_alias=AliasChoices("GRAMREGEX_CIRCUIT_RESET_TIMEOUT", "circuit_reset_timeout"),
+    )
+    openai_timeout: float | None = Field(
+        default=None,
+        gt=0,
+        description="Request timeout in seconds (SDK default when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_OPENAI_TIMEOUT", "openai_timeout"),
+    )
+    openai_max_connections: int = Field(
+        default=1000,
+        ge=1,
+        description="Maximum number of pooled HTTP connections per client",
+        validation_alias=AliasChoices("GRAMREGEX_OPENAI_MAX_CONNECTIONS", "openai_max_connections"),
+    )
+    openai_max_keepalive_connections: int = Field(
+        default=100,
+        ge=0,
+        description="Maximum number of idle keep-alive connections per client",
+        validation_alias=AliasChoices("GRAMREGEX_OPENAI_MAX_KEEPALIVE_CONNECTIONS", "openai_max_keepalive_connections"),
+    )
+    openai_keepalive_expiry: float = Field(
+        default=5.0,
+        ge=0,
+        description="Seconds an idle keep-alive connection stays open",
+        validation_alias=AliasChoices("GRAMREGEX_OPENAI_KEEPALIVE_EXPIRY", "openai_keepalive_expiry"),
+    )
+    retry_max_attempts: int = Field(
+        default=3,
+        ge=1,
+        description="Attempts per request, including the first, for rate limits and transient errors",
+        validation_alias=AliasChoices("GRAMREGEX_RETRY_MAX_ATTEMPTS", "retry_max_attempts"),
+    )
+    retry_base_delay: float = Field(
+        default=0.5,
+        ge=0,
+        description="Initial backoff ceiling in seconds, doubled after each failed attempt",
+        validation_alias=AliasChoices("GRAMREGEX_RETRY_BASE_DELAY", "retry_base_delay"),
+    )
+    retry_max_delay: float = Field(
+        default=30.0,
+        ge=0,
+        description="Upper bound in seconds for a single backoff delay",
+        validation_alias=AliasChoices("GRAMREGEX_RETRY_MAX_DELAY", "retry_max_delay"),
+    )
+    rate_limit_rpm: int | None = Field(
+        default=None,
+        ge=1,
+        description="Client-side requests-per-minute budget (unlimited when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_RATE_LIMIT_RPM", "rate_limit_rpm"),
+    )
+    rate_limit_tpm: int | None = Field(
+        default=None,
+        ge=1,
+        description="Client-side tokens-per-minute budget (unlimited when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_RATE_LIMIT_TPM", "rate_limit_tpm"),
+    )
+    hedge_percentile: float | None = Field(
+        default=None,
+        gt=0,
+        lt=100,
+        description="Send a duplicate request when a call exceeds this latency percentile (disabled when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_HEDGE_PERCENTILE", "hedge_percentile"),
+    )
+    hedge_initial_delay: float = Field(
+        default=2.0,
+        ge=0,
+        description="Hedging delay in seconds used until enough latencies have been observed",
+        validation_alias=AliasChoices("GRAMREGEX_HEDGE_INITIAL_DELAY", "hedge_initial_delay"),
+    )
+    hedge_base_url: str | None = Field(
+        default=None,
+        description="Base URL receiving hedged requests (the primary endpoint when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_HEDGE_BASE_URL", "hedge_base_url"),
+    )
+    hedge_model: str | None = Field(
+        default=None,
+        description="Model used for hedged requests (the primary model when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_HEDGE_MODEL", "hedge_model"),
+    )
+    hedge_max_workers: int = Field(
+        default=32,
+        ge=2,
+        description="Worker threads running synchronous hedged requests (each hedged call occupies two)",
+        validation_alias=AliasChoices("GRAMREGEX_HEDGE_MAX_WORKERS", "hedge_max_workers"),
+    )
+    route: str | None = Field(
+        default=None,
+        description="Comma-separated model[:effort] tiers tried cheapest first, escalating on rejected output",
+        validation_alias=AliasChoices("GRAMREGEX_ROUTE", "route"),
+    )
+    coalesce_requests: bool = Field(
+        default=False,
+        description="Send concurrent identical requests to the provider once and share the result",
+        validation_alias=AliasChoices("GRAMREGEX_COALESCE", "coalesce_requests"),
+    )
     grammar_config_path: Path | None = Field(
         default=None,
         description="YAML file containing default grammar settings",
         validation_alias=AliasChoices("GRAMREGEX_CONFIG_PATH", "GRAMREGEX_CONFIG"),
     )
+    cache_enabled: bool = Field(
+        default=False,
+        description="Serve repeated requests from the response cache",
+        validation_alias=AliasChoices("GRAMREGEX_CACHE_ENABLED", "cache_enabled"),
+    )
+    cache_dir: Path | None = Field(
+        default=None,
+        description="Directory for the on-disk response cache (memory only when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_CACHE_DIR", "cache_dir"),
+    )
+    cache_ttl: float | None = Field(
+        default=None,
+        gt=0,
+        description="Seconds a cached response stays valid (no expiry when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_CACHE_TTL", "cache_ttl"),
+    )
+    cache_max_entries: int = Field(
+        default=1024,
+        ge=1,
+        description="Maximum number of responses kept in the in-memory cache tier",
+        validation_alias=AliasChoices("GRAMREGEX_CACHE_MAX_ENTRIES", "cache_max_entries"),
+    )
+    cache_max_bytes: int | None = Field(
+        default=None,
+        ge=0,
+        description="Maximum size of cached output stored on disk (unbounded when unset)",
+        validation_alias=AliasChoices("GRAMREGEX_CACHE_MAX_BYTES", "cache_max_bytes"),
+    )
 
     @field_validator("grammar_config_path", mode="before")
     @classmethod
@@ -35,6 +192,34 @@ class Settings(BaseSettings):
             return None
         return value
 
+    @field_validator(
+        "openai_timeout",
+        "rate_limit_rpm",
+        "rate_limit_tpm",
+        "hedge_percentile",
+        "hedge_base_url",
+        "hedge_model",
+        "route",
+        "cache_dir",
+        "cache_ttl",
+        "cache_max_bytes",
+        mode="before",
+    )
+    @classmethod
+    def empty_optional_is_none(cls, value: object) -> object:
+        """Normalize blank optional values to None so defaults apply."""
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @field_validator("openai_endpoints", mode="before")
+    @classmethod
+    def parse_endpoints(cls, value: object) -> object:
+        """Decode the JSON list of endpoints given through the environment; blank means none."""
+        if isinstance(value, str):
+            return json.loads(value) if value.strip() else ()
+        return value
+
     @model_validator(mode="after")
     def validate_api_key(self) -> "Settings":
         """Ensure API key is provided."""
@@ -48,3 +233,17 @@ class Settings(BaseSettings):
 def get_settings() -> Settings:
     """Return cached settings instance."""
     return Settings()
+
+
+def settings_env_names() -> frozenset[str]:
+    """Return the upper-cased environment variable names ``Settings`` reads (matched case-insensitively)."""
+    names: set[str] = set()
+    for name, field in Settings.model_fields.items():
+        alias = field.validation_alias
+        if alias is None:
+            names.add(name.upper())
+        elif isinstance(alias, AliasChoices):
+            names.update(str(choice).upper() for choice in alias.choices)
+        else:
+            names.add(str(alias).upper())
+    return frozenset(names)
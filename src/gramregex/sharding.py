@@ -0,0 +1,96 @@
+"""Deterministic partitioning of line-oriented input files.
+
+A file is split into ``count`` shards by byte offset: shard ``i`` holds the
+lines starting in ``[size * i // count, size * (i + 1) // count)``, with both
+boundaries moved forward to the next line start. The split depends only on
+the file, so separate processes or machines can each take a shard without
+coordinating, and concatenating the shard outputs in shard order restores
+input order. For CSV input a boundary is also moved past any newline inside a
+quoted field, so a record is never split between shards.
+"""
+
+import os
+from typing import BinaryIO
+
+_CHUNK_SIZE = 1 << 20
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    """Parse a one-based ``"i/k"`` shard spec into a zero-based ``(index, count)``."""
+    index, separator, count = spec.partition("/")
+    try:
+        shard, total = int(index), int(count)
+    except ValueError:
+        shard = total = 0
+    if not separator or not 1 <= shard <= total:
+        msg = f"Invalid shard {spec!r}; expected i/k with 1 <= i <= k"
+        raise ValueError(msg)
+    return shard - 1, total
+
+
+def split_shard(index: int, count: int, parts: int) -> list[tuple[int, int]]:
+    """Return the ``(index, count)`` of ``parts`` consecutive shards covering exactly shard ``index`` of ``count``."""
+    return [(index * parts + part, count * parts) for part in range(parts)]
+
+
+def shard_range(
+    stream: BinaryIO,
+    index: int,
+    count: int,
+    *,
+    start: int = 0,
+    quote: bytes | None = None,
+) -> tuple[int, int]:
+    """Return the byte range ``[begin, end)`` of shard ``index`` of ``count`` over ``stream`` past ``start``.
+
+    ``start`` excludes a leading part of the file, such as a CSV header, from
+    every shard. With ``quote`` (``b'"'`` for CSV), a line start inside a
+    quoted field is not a boundary; the quotes before it are counted from
+    ``start``, which reads the file up to the boundary. The stream position
+    is left unchanged.
+    """
+    position = stream.tell()
+    try:
+        size = stream.seek(0, os.SEEK_END)
+        span = size - start
+        begin = _line_start(stream, start + span * index // count, start, quote)
+        # The end of the file needs no scan for quotes.
+        end = size if index + 1 == count else _line_start(stream, start + span * (index + 1) // count, start, quote)
+    finally:
+        stream.seek(position)
+    return begin, end
+
+
+def _line_start(stream: BinaryIO, offset: int, start: int, quote: bytes | None) -> int:
+    """Return the first line start at or after ``offset``, outside quoted fields when ``quote`` is set."""
+    if offset <= start:
+        return start
+    stream.seek(offset - 1)
+    position = offset - 1 + len(stream.readline())
+    if quote is None:
+        return position
+    # Escaped quotes are doubled, so an odd count means the line ended inside a quoted field.
+    quotes = _count(stream, quote, start, position)
+    while quotes % 2:
+        line = stream.readline()
+        if not line:
+            break
+        quotes += line.count(quote)
+        position += len(line)
+    return position
+
+
+def _count(stream: BinaryIO, quote: bytes, begin: int, end: int) -> int:
+    """Return how many ``quote`` bytes ``stream`` holds in ``[begin, end)``, leaving it positioned at ``end``."""
+    stream.seek(begin)
+    quotes = 0
+    while begin < end:
+        chunk = stream.read(min(_CHUNK_SIZE, end - begin))
+        if not chunk:
+            break
+        quotes += chunk.count(quote)
+        begin += len(chunk)
+    return quotes
+
+
+__all__ = ["parse_shard", "shard_range", "split_shard"]
@@ -0,0 +1,431 @@
+"""Local validation of model output against Lark or regex grammars.
+
+Regex grammars are checked with the third-party ``regex`` module when it is
+installed (falling back to ``re``); Lark grammars require the optional
+``lark`` package. Install both with ``gramregex[validate]``.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Iterator
+from functools import lru_cache
+from typing import Any, Protocol, cast
+
+from gramregex.llm.base import (
+    AsyncLLMClient,
+    GenerationResult,
+    GrammarSyntax,
+    LLMClient,
+    ReasoningEffort,
+    VerbosityLevel,
+)
+
+
+# A streamed prefix is rechecked once it has grown by 1/_CHECK_GROWTH of the checked length.
+_CHECK_GROWTH = 4
+
+
+class GrammarValidationError(ValueError):
+    """Raised when model output does not conform to the grammar."""
+
+
+class PartialPattern(Protocol):
+    """Compiled pattern supporting partial matches (``regex`` module)."""
+
+    def fullmatch(self, string: str, *, partial: bool = False) -> object | None:
+        """Match the whole string, or a viable prefix of a match when ``partial``."""
+        ...
+
+
+def _compile_partial(pattern: str) -> PartialPattern | None:
+    """Compile ``pattern`` with the ``regex`` module, or return None when it is unavailable."""
+    try:
+        import regex
+    except ImportError:
+        return None
+    return cast("PartialPattern", regex.compile(pattern))
+
+
+class GrammarValidator(ABC):
+    """Compiled grammar that checks complete outputs and streamed prefixes."""
+
+    @abstractmethod
+    def is_valid(self, text: str) -> bool:
+        """Return True when ``text`` is a complete sentence of the grammar."""
+
+    @abstractmethod
+    def is_viable_prefix(self, text: str) -> bool:
+        """Return False only when no continuation of ``text`` can satisfy the grammar."""
+
+    def validate(self, text: str) -> str:
+        """Return ``text`` unchanged, raising ``GrammarValidationError`` if it is invalid."""
+        if not self.is_valid(text):
+            msg = f"Output does not match the grammar: {text!r}"
+            raise GrammarValidationError(msg)
+        return text
+
+    def incremental(self) -> "IncrementalValidator":
+        """Return a validator that checks a growing prefix of streamed output."""
+        return IncrementalValidator(self)
+
+
+class IncrementalValidator:
+    """Accumulates streamed deltas and rejects the output as soon as it diverges.
+
+    A prefix check rescans the whole text, so the prefix is only rechecked
+    once it has grown by a quarter since the last check. Checking every
+    delta would make a stream of ``n`` deltas cost O(n²); this way the checks
+    add up to a few passes over the output, and a divergence is still noticed
+    within a quarter of the text received. ``finish`` always validates the
+    complete output.
+    """
+
+    def __init__(self, validator: GrammarValidator) -> None:
+        """Start with an empty prefix."""
+        self._validator = validator
+        self._chunks: list[str] = []
+        self._length = 0
+        self._checked = 0
+
+    @property
+    def text(self) -> str:
+        """Return the text received so far."""
+        if len(self._chunks) > 1:
+            self._chunks[:] = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, delta: str) -> None:
+        """Append ``delta``, raising ``GrammarValidationError`` if the prefix can no longer match."""
+        self._chunks.append(delta)
+        self._length += len(delta)
+        if self._length - self._checked < self._checked // _CHECK_GROWTH:
+            return
+        self._checked = self._length
+        prefix = self.text
+        if not self._validator.is_viable_prefix(prefix):
+            msg = f"Output diverged from the grammar: {prefix!r}"
+            raise GrammarValidationError(msg)
+
+    def finish(self) -> str:
+        """Validate and return the complete output."""
+        return self._validator.validate(self.text)
+
+
+class RegexValidator(GrammarValidator):
+    """Validator for ``regex`` grammar syntax."""
+
+    def __init__(self, pattern: str) -> None:
+        """Compile ``pattern``; prefix checks need the ``regex`` module."""
+        try:
+            self._pattern = re.compile(pattern)
+        except re.error as exc:
+            msg = f"Invalid regex grammar: {exc}"
+            raise ValueError(msg) from exc
+        self._partial = _compile_partial(pattern)
+
+    def is_valid(self, text: str) -> bool:
+        """Return True when the whole of ``text`` matches the pattern."""
+        return self._pattern.fullmatch(text) is not None
+
+    def is_viable_prefix(self, text: str) -> bool:
+        """Return True when ``text`` can still be extended into a full match."""
+        if self._partial is None:
+            return True
+        return self._partial.fullmatch(text, partial=True) is not None
+
+
+class LarkValidator(GrammarValidator):
+    """Validator for ``lark`` grammar syntax.
+
+    Full validation uses an Earley parser, so any grammar Lark accepts can be
+    checked. Prefix checks replay the lexed tokens through an LALR interactive
+    parser and are skipped (treated as viable) when the grammar is not LALR(1).
+    """
+
+    def __init__(self, grammar: str) -> None:
+        """Compile ``grammar`` with Lark."""
+        try:
+            from lark import Lark
+            from lark.exceptions import LarkError
+        except ImportError as exc:
+            msg = "Lark grammar validation requires the 'lark' package (pip install 'gramregex[validate]')"
+            raise ImportError(msg) from exc
+
+        try:
+            self._parser = Lark(grammar, parser="earley")
+        except LarkError as exc:
+            msg = f"Invalid lark grammar: {exc}"
+            raise ValueError(msg) from exc
+
+        self._lalr: Any = None
+        try:
+            self._lalr = Lark(grammar, parser="lalr", lexer="basic")
+        except LarkError:
+            self._lalr = None
+        self._terminal_patterns: dict[str, PartialPattern | None] = {}
+
+    def is_valid(self, text: str) -> bool:
+        """Return True when ``text`` parses with the grammar."""
+        from lark.exceptions import LarkError
+
+        try:
+            self._parser.parse(text)
+        except LarkError:
+            return False
+        return True
+
+    def is_viable_prefix(self, text: str) -> bool:
+        """Return True when ``text`` can still be extended into a valid parse."""
+        if self._lalr is None:
+            return True
+
+        from lark.exceptions import UnexpectedCharacters
+
+        tokens: list[Any] = []
+        stop = len(text)
+        try:
+            tokens.extend(self._lalr.lex(text))
+        except UnexpectedCharacters as exc:
+            stop = exc.pos_in_stream
+
+        if self._accepts(tokens, text[stop:]):
+            return True
+        # The last token may itself be the start of a longer terminal.
+        if tokens and tokens[-1].end_pos == stop:
+            return self._accepts(tokens[:-1], text[tokens[-1].start_pos :])
+        return False
+
+    def _accepts(self, tokens: list[Any], tail: str) -> bool:
+        from lark.exceptions import UnexpectedInput
+
+        interactive = self._lalr.parse_interactive("")
+        try:
+            for token in tokens:
+                interactive.feed_token(token)
+        except UnexpectedInput:
+            return False
+        if not tail:
+            return True
+        return any(self._terminal_accepts_prefix(name, tail) for name in interactive.accepts())
+
+    def _terminal_accepts_prefix(self, name: str, tail: str) -> bool:
+        if name.startswith("$"):
+            return False
+        pattern = self._lalr.get_terminal(name).pattern
+        if name not in self._terminal_patterns:
+            self._terminal_patterns[name] = _compile_partial(pattern.to_regexp())
+        partial = self._terminal_patterns[name]
+        if partial is not None:
+            return partial.fullmatch(tail, partial=True) is not None
+        if pattern.type == "str":
+            return cast("str", pattern.value).startswith(tail)
+        return True
+
+
+def compile_validator(grammar: str, grammar_syntax: GrammarSyntax) -> GrammarValidator:
+    """Compile ``grammar`` into a validator for the given syntax."""
+    if grammar_syntax == "regex":
+        return RegexValidator(grammar)
+    return LarkValidator(grammar)
+
+
+ValidatorCompiler = Callable[[str, GrammarSyntax], GrammarValidator]
+
+
+def validate_stream(deltas: Iterator[str], validator: GrammarValidator) -> Iterator[str]:
+    """Yield ``deltas`` while checking the growing prefix, stopping at the first divergence.
+
+    The upstream iterator is closed on divergence so the provider stops
+    generating tokens that would be discarded.
+    """
+    checker = validator.incremental()
+    try:
+        for delta in deltas:
+            checker.feed(delta)
+            yield delta
+        checker.finish()
+    finally:
+        close = getattr(deltas, "close", None)
+        if callable(close):
+            close()
+
+
+async def avalidate_stream(deltas: AsyncIterator[str], validator: GrammarValidator) -> AsyncIterator[str]:
+    """Async counterpart of ``validate_stream``."""
+    checker = validator.incremental()
+    try:
+        async for delta in deltas:
+            checker.feed(delta)
+            yield delta
+        checker.finish()
+    finally:
+        aclose = getattr(deltas, "aclose", None)
+        if callable(aclose):
+            await aclose()
+
+
+class ValidatingLLMClient(LLMClient):
+    """LLM client wrapper that rejects output not conforming to the request grammar."""
+
+    def __init__(self, client: LLMClient, *, compiler: ValidatorCompiler | None = None) -> None:
+        """Wrap ``client``; ``compiler`` returns the (ideally cached) validator for a grammar."""
+        self._client = client
+        self._validator = compiler or lru_cache(maxsize=32)(compile_validator)
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output and validate it against ``grammar``."""
+        validator = self._validator(grammar, grammar_syntax)
+        output = self._client.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return validator.validate(output)
+
+    def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result and validate its text against ``grammar``."""
+        validator = self._validator(grammar, grammar_syntax)
+        result = self._client.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        validator.validate(result.text)
+        return result
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> Iterator[str]:
+        """Stream output, aborting as soon as the prefix diverges from ``grammar``."""
+        validator = self._validator(grammar, grammar_syntax)
+        deltas = self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return validate_stream(deltas, validator)
+
+
+class AsyncValidatingLLMClient(AsyncLLMClient):
+    """Async LLM client wrapper that rejects output not conforming to the request grammar."""
+
+    def __init__(self, client: AsyncLLMClient, *, compiler: ValidatorCompiler | None = None) -> None:
+        """Wrap ``client``; ``compiler`` returns the (ideally cached) validator for a grammar."""
+        self._client = client
+        self._validator = compiler or lru_cache(maxsize=32)(compile_validator)
+
+    async def generate(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> str:
+        """Generate output and validate it against ``grammar``."""
+        validator = self._validator(grammar, grammar_syntax)
+        output = await self._client.generate(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return validator.validate(output)
+
+    async def generate_result(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> GenerationResult:
+        """Generate a result and validate its text against ``grammar``."""
+        validator = self._validator(grammar, grammar_syntax)
+        result = await self._client.generate_result(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        validator.validate(result.text)
+        return result
+
+    def stream(
+        self,
+        prompt: str,
+        *,
+        grammar: str,
+        grammar_syntax: GrammarSyntax,
+        verbosity: VerbosityLevel | None = None,
+        reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream output, aborting as soon as the prefix diverges from ``grammar``."""
+        validator = self._validator(grammar, grammar_syntax)
+        deltas = self._client.stream(
+            prompt,
+            grammar=grammar,
+            grammar_syntax=grammar_syntax,
+            verbosity=verbosity,
+            reasoning_effort=reasoning_effort,
+            instructions=instructions,
+        )
+        return avalidate_stream(deltas, validator)
+
+
+__all__ = [
+    "AsyncValidatingLLMClient",
+    "GrammarValidationError",
+    "GrammarValidator",
+    "IncrementalValidator",
+    "LarkValidator",
+    "RegexValidator",
+    "ValidatingLLMClient",
+    "ValidatorCompiler",
+    "avalidate_stream",
+    "compile_validator",
+    "validate_stream",
+]
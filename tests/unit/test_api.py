@@ -1,3 +1,4 @@
+import re
 from pathlib import Path
 
 from collections.abc import Iterator
@@ -6,8 +7,11 @@ import pytest
 
 from gramregex import api
 from gramregex import settings as settings_module
-from gramregex.api import generate
+from gramregex.api import agenerate, agenerate_many, generate, generate_many, generate_result, generate_stream
+from gramregex.cache import ResponseCache
 from gramregex.config import load_grammar_config
+from gramregex.llm import openai_client
+from gramregex.llm.base import GenerationResult
 from gramregex.settings import Settings
 
 
@@ -26,6 +30,7 @@ class DummyClient:
         grammar_syntax: str,
         verbosity: str | None = None,
         reasoning_effort: str | None = None,
+        instructions: str | None = None,
     ) -> str:
         """Record the call and return canned text."""
         self.generate_called_with = {
@@ -34,6 +39,7 @@ class DummyClient:
             "grammar_syntax": grammar_syntax,
             "verbosity": verbosity,
             "reasoning_effort": reasoning_effort,
+            "instructions": instructions,
         }
         return "library-output"
 
@@ -59,7 +65,7 @@ def test_generate_uses_factory_and_returns_output(monkeypatch: pytest.MonkeyPatc
         fake_create_client.captured_settings = settings  # type: ignore[attr-defined]
         return dummy_client
 
-    monkeypatch.setattr(api, "create_llm_client", fake_create_client)
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
 
     output = generate(
         "input text",
@@ -67,6 +73,7 @@ def test_generate_uses_factory_and_returns_output(monkeypatch: pytest.MonkeyPatc
         grammar_syntax="regex",
         verbosity="high",
         reasoning_effort="medium",
+        instructions="Answer tersely.",
     )
 
     assert output == "library-output"
@@ -76,6 +83,7 @@ def test_generate_uses_factory_and_returns_output(monkeypatch: pytest.MonkeyPatc
         "grammar_syntax": "regex",
         "verbosity": "high",
         "reasoning_effort": "medium",
+        "instructions": "Answer tersely.",
     }
 
     captured = getattr(fake_create_client, "captured_settings", None)
@@ -92,7 +100,7 @@ def test_generate_loads_default_grammar(monkeypatch: pytest.MonkeyPatch) -> None
     def fake_create_client(_: Settings) -> DummyClient:
         return dummy_client
 
-    monkeypatch.setattr(api, "create_llm_client", fake_create_client)
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
 
     output = generate("input text")
 
@@ -112,7 +120,7 @@ def test_generate_overrides_model(monkeypatch: pytest.MonkeyPatch) -> None:
         fake_create_client.captured_model = settings.openai_model  # type: ignore[attr-defined]
         return dummy_client
 
-    monkeypatch.setattr(api, "create_llm_client", fake_create_client)
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
 
     generate("input", model="custom-model", grammar="root ::= 'x'")
 
@@ -128,3 +136,232 @@ def test_generate_rejects_conflicting_grammar_inputs(monkeypatch: pytest.MonkeyP
 
     with pytest.raises(ValueError, match="--grammar と --grammar-file は同時に指定できません"):
         generate("input", grammar="root ::= 'x'", grammar_file=grammar_path)
+
+
+def test_generate_many_reuses_single_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    """複数プロンプトでもクライアントと grammar は一度だけ用意される."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    created: list[DummyClient] = []
+
+    class EchoClient(DummyClient):
+        def generate(
+            self,
+            prompt: str,
+            *,
+            grammar: str,
+            grammar_syntax: str,
+            verbosity: str | None = None,
+            reasoning_effort: str | None = None,
+            instructions: str | None = None,
+        ) -> str:
+            super().generate(
+                prompt,
+                grammar=grammar,
+                grammar_syntax=grammar_syntax,
+                verbosity=verbosity,
+                reasoning_effort=reasoning_effort,
+                instructions=instructions,
+            )
+            if prompt == "bad":
+                msg = "provider error"
+                raise RuntimeError(msg)
+            return f"{prompt}:{grammar}"
+
+    def fake_create_client(_: Settings) -> DummyClient:
+        client = EchoClient(None)
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
+
+    items = generate_many(["one", "bad", "three"], grammar="root ::= 'x'", max_in_flight=2)
+
+    assert len(created) == 1
+    assert [item.index for item in items] == [0, 1, 2]
+    assert items[0].output == "one:root ::= 'x'"
+    assert items[1].output is None
+    assert isinstance(items[1].error, RuntimeError)
+    assert items[2].output == "three:root ::= 'x'"
+
+
+def test_generate_many_packs_prompts(monkeypatch: pytest.MonkeyPatch) -> None:
+    """pack_size を指定すると複数のプロンプトを包んだ grammar で 1 リクエストにまとめる."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    requests: list[tuple[str, str]] = []
+
+    class PackingClient(DummyClient):
+        def generate(self, prompt: str, *, grammar: str, **_: object) -> str:
+            requests.append((prompt, grammar))
+            inputs = re.findall(r"<<<(\d+)>>>\n(\w+)", prompt)
+            if not inputs:
+                return prompt.upper()
+            # Items the grammar rejects are answered verbatim.
+            return "\n".join(f"<<<{n}>>>\n{text if text == 'skip' else text.upper()}" for n, text in inputs)
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: PackingClient(None))
+
+    items = generate_many(["a", "skip", "c"], grammar="[A-Z]+", grammar_syntax="regex", pack_size=2)
+
+    assert [item.output for item in items] == ["A", "SKIP", "C"]
+    assert [grammar for _, grammar in requests] == [
+        "<<<1>>>\\n(?:[A-Z]+)\\n<<<2>>>\\n(?:[A-Z]+)",
+        "[A-Z]+",
+        "[A-Z]+",
+    ]
+    assert [prompt for prompt, _ in requests[1:]] == ["skip", "c"]
+    with pytest.raises(ValueError, match="check"):
+        generate_many(["a"], grammar="[A-Z]+", grammar_syntax="regex", pack_size=2, check=bool)
+    with pytest.raises(ValueError, match="backreferences"):
+        generate_many(["a"], grammar="(a)\\1", grammar_syntax="regex", pack_size=2)
+
+
+def test_generate_many_does_not_resend_packs_on_provider_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    """まとめたリクエストのプロバイダエラーは 1 件ずつ再送せず、各項目のエラーにする."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    prompts: list[str] = []
+
+    class ThrottledClient(DummyClient):
+        def generate(self, prompt: str, **_: object) -> str:
+            prompts.append(prompt)
+            msg = "429 rate limited"
+            raise RuntimeError(msg)
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: ThrottledClient(None))
+
+    items = generate_many(["a", "b", "c", "d"], grammar="[A-Z]+", grammar_syntax="regex", pack_size=4)
+
+    assert len(prompts) == 1
+    assert [str(item.error) for item in items] == ["429 rate limited"] * 4
+
+
+class DummyAsyncClient:
+    """Async stand-in for the real LLM client."""
+
+    def __init__(self) -> None:
+        """Initialize stub storage."""
+        self.prompts: list[str] = []
+
+    async def generate(self, prompt: str, *, grammar: str, **_: object) -> str:
+        """Record the prompt and return canned text."""
+        self.prompts.append(prompt)
+        return f"async:{prompt}:{grammar}"
+
+
+@pytest.mark.asyncio
+async def test_agenerate_uses_async_factory(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Agenerate は非同期クライアント経由で出力を返す."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    dummy_client = DummyAsyncClient()
+    monkeypatch.setattr(api, "get_async_llm_client", lambda _: dummy_client)
+
+    output = await agenerate("input", grammar="root ::= 'a'")
+
+    assert output == "async:input:root ::= 'a'"
+
+
+@pytest.mark.asyncio
+async def test_agenerate_many_shares_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Agenerate_many は一つのクライアントで全プロンプトを処理する."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    created: list[DummyAsyncClient] = []
+
+    def fake_create_client(_: Settings) -> DummyAsyncClient:
+        client = DummyAsyncClient()
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(api, "get_async_llm_client", fake_create_client)
+
+    items = await agenerate_many(["a", "b"], grammar="g", max_in_flight=1)
+
+    assert len(created) == 1
+    assert [item.output for item in items] == ["async:a:g", "async:b:g"]
+
+
+def test_prepare_resolves_options_once(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Prepare は設定・grammar・クライアントを一度だけ解決し、呼び出しではプロンプトだけを渡す."""
+    grammar_path = tmp_path / "grammar.cfg"
+    grammar_path.write_text("root ::= 'lib'", encoding="utf-8")
+    dummy_client = DummyClient(None)
+    acquisitions: list[Settings] = []
+
+    def fake_get_client(settings: Settings) -> DummyClient:
+        acquisitions.append(settings)
+        return dummy_client
+
+    monkeypatch.setattr(api, "get_llm_client", fake_get_client)
+    prepared = api.prepare(
+        grammar_file=grammar_path,
+        reasoning_effort="minimal",
+        model="small",
+        settings=Settings(openai_api_key="dummy"),
+    )
+    grammar_path.unlink()
+
+    outputs = [prepared(prompt) for prompt in ("a", "b")]
+    items = list(prepared.iter_many(["c", "d"], max_in_flight=2))
+
+    assert outputs == ["library-output", "library-output"]
+    assert [item.output for item in items] == ["library-output", "library-output"]
+    assert [settings.openai_model for settings in acquisitions] == ["small"]
+    assert prepared.grammar == "root ::= 'lib'"
+    assert prepared.request_template["model"] == "small"
+    assert prepared.request_template["reasoning"] == {"effort": "minimal"}
+    assert dummy_client.generate_called_with is not None
+    assert dummy_client.generate_called_with["reasoning_effort"] == "minimal"
+
+
+def test_generate_stream_yields_client_deltas(monkeypatch: pytest.MonkeyPatch) -> None:
+    """generate_stream はクライアントのストリームをそのまま返す."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class StreamingClient(DummyClient):
+        def stream(self, prompt: str, *, grammar: str, **_: object) -> Iterator[str]:
+            yield from (prompt, grammar)
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: StreamingClient(None))
+
+    assert list(generate_stream("input", grammar="g")) == ["input", "g"]
+
+
+def test_prepared_stream_uses_prepared_template(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Prepare したジェネレータのストリームも事前に組み立てたテンプレートで送り、呼び出し元には漏らさない."""
+    active: list[object] = []
+
+    class StreamingClient(DummyClient):
+        def stream(self, prompt: str, **_: object) -> Iterator[str]:
+            for delta in (prompt, "!"):
+                active.append(openai_client._prepared.get())  # noqa: SLF001
+                yield delta
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: StreamingClient(None))
+    prepared = api.prepare(grammar="g", settings=Settings(openai_api_key="dummy"))
+
+    for _ in prepared.stream("input"):
+        assert openai_client._prepared.get() is None  # noqa: SLF001
+
+    assert list(prepared.stream("input")) == ["input", "!"]
+    assert active == [prepared._template] * 4  # noqa: SLF001
+
+
+def test_generate_result_marks_cache_hits(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """generate_result は使用量を返し、キャッシュから返した結果には from_cache を立てる."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class UsageClient(DummyClient):
+        def generate_result(self, prompt: str, **_: object) -> GenerationResult:
+            return GenerationResult(text=prompt, model="m-2024", response_id="resp_1", input_tokens=3, latency=0.5)
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: UsageClient(None))
+
+    with ResponseCache(directory=tmp_path) as cache:
+        miss = generate_result("input", grammar="g", cache=cache)
+        hit = generate_result("input", grammar="g", cache=cache)
+
+    assert miss == GenerationResult(text="input", model="m-2024", response_id="resp_1", input_tokens=3, latency=0.5)
+    assert (hit.text, hit.model) == ("input", Settings().openai_model)
+    assert hit.from_cache
+    assert hit.input_tokens is None
@@ -0,0 +1,216 @@
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+
+from gramregex.llm.balancer import (
+    AsyncBalancedLLMClient,
+    BalancedLLMClient,
+    Balancer,
+    CircuitBreaker,
+    NoHealthyEndpointError,
+)
+from gramregex.llm.base import AsyncLLMClient, LLMClient
+from gramregex.llm.factory import _endpoint_settings, create_async_llm_client, create_llm_client
+from gramregex.settings import OpenAIEndpoint, Settings
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
+
+
+class EndpointClient(LLMClient):
+    """Client answering with its name, or raising the queued errors first."""
+
+    def __init__(self, name: str, *errors: Exception) -> None:
+        """Raise ``errors`` in order, then answer with ``name``."""
+        self.name = name
+        self.errors = list(errors)
+        self.calls = 0
+
+    def generate(self, _prompt: str, **_: object) -> str:  # type: ignore[override]
+        """Answer or raise the next queued error."""
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.name
+
+    def stream(self, _prompt: str, **_: object) -> Iterator[str]:  # type: ignore[override]
+        """Yield the name."""
+        yield self.name
+
+
+class AsyncEndpointClient(AsyncLLMClient):
+    """Async client answering with its name, or raising the queued errors first."""
+
+    def __init__(self, name: str, *errors: Exception) -> None:
+        """Raise ``errors`` in order, then answer with ``name``."""
+        self.name = name
+        self.errors = list(errors)
+
+    async def generate(self, _prompt: str, **_: object) -> str:  # type: ignore[override]
+        """Answer or raise the next queued error."""
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.name
+
+    async def stream(self, _prompt: str, **_: object) -> AsyncIterator[str]:  # type: ignore[override]
+        """Yield the name."""
+        yield self.name
+
+
+def _generate(client: LLMClient) -> str:
+    return client.generate("p", grammar="g", grammar_syntax="lark")
+
+
+def test_weighted_round_robin_spreads_turns() -> None:
+    """重み付きラウンドロビンは重みの比率で、偏りなく順番を回す."""
+    balancer = Balancer([2, 1])
+    picks = []
+    for _ in range(6):
+        index = balancer.acquire(set())
+        balancer.release(index, None)
+        picks.append(index)
+
+    assert picks == [0, 1, 0, 0, 1, 0]
+
+
+def test_least_outstanding_prefers_idle_endpoint() -> None:
+    """least_outstanding は重みあたりの処理中リクエストが最も少ないエンドポイントを選ぶ."""
+    balancer = Balancer([1, 2], strategy="least_outstanding")
+
+    assert [balancer.acquire(set()) for _ in range(3)] == [0, 1, 1]
+    balancer.release(0, None)
+    assert balancer.acquire(set()) == 0
+
+
+def test_circuit_opens_and_recovers_after_trial() -> None:
+    """連続した失敗で回路を開き、リセット時間後の試験リクエストが成功すれば閉じる."""
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open
+
+
+def test_failover_on_transient_errors_only() -> None:
+    """一時的なエラーは次のエンドポイントで再送し、その他のエラーはそのまま送出する."""
+    flaky = EndpointClient("a", ConnectionError("down"))
+    client = BalancedLLMClient([flaky, EndpointClient("b")], Balancer([1, 1]))
+
+    assert _generate(client) == "b"
+
+    invalid = BalancedLLMClient([EndpointClient("a", ValueError("bad")), EndpointClient("b")], Balancer([1, 1]))
+    with pytest.raises(ValueError, match="bad"):
+        _generate(invalid)
+
+
+def test_open_circuits_are_skipped_until_all_fail() -> None:
+    """回路が開いたエンドポイントには送らず、全滅したら NoHealthyEndpointError、リセット後は試験的に送る."""
+    clock = FakeClock()
+    down = EndpointClient("a", *(ConnectionError("down") for _ in range(3)))
+    up = EndpointClient("b", ConnectionError("down"))
+    client = BalancedLLMClient([down, up], Balancer([1, 1], failure_threshold=1, reset_timeout=5, clock=clock))
+
+    with pytest.raises(ConnectionError):
+        _generate(client)
+    with pytest.raises(NoHealthyEndpointError):
+        _generate(client)
+
+    clock.now = 5
+    assert _generate(client) == "b"
+    assert client._balancer.open_endpoints() == [0]  # noqa: SLF001
+    assert (down.calls, up.calls) == (1, 2)
+
+
+def test_recovered_endpoint_rejoins_while_others_are_healthy() -> None:
+    """他のエンドポイントが健全でも、リセット時間後の試験リクエストで回復したエンドポイントは順番に戻る."""
+    clock = FakeClock()
+    balancer = Balancer([1, 1, 1], failure_threshold=1, reset_timeout=5, clock=clock)
+    first = balancer.acquire(set())
+    balancer.release(first, ConnectionError("down"))
+    assert balancer.open_endpoints() == [first]
+
+    picks = set()
+    for _ in range(30):
+        index = balancer.acquire(set())
+        balancer.release(index, None)
+        picks.add(index)
+    assert first not in picks
+
+    clock.now = 5
+    picks.clear()
+    for _ in range(30):
+        index = balancer.acquire(set())
+        balancer.release(index, None)
+        picks.add(index)
+
+    assert picks == {0, 1, 2}
+    assert balancer.open_endpoints() == []
+
+
+@pytest.mark.asyncio
+async def test_async_failover() -> None:
+    """非同期クライアントも一時的なエラーで次のエンドポイントに切り替える."""
+    client = AsyncBalancedLLMClient(
+        [AsyncEndpointClient("a", TimeoutError()), AsyncEndpointClient("b")],
+        Balancer([1, 1]),
+    )
+
+    result = await client.generate_result("p", grammar="g", grammar_syntax="lark")
+
+    assert result.text == "b"
+    assert client._balancer.open_endpoints() == []  # noqa: SLF001
+
+
+def test_settings_parse_endpoints(monkeypatch: pytest.MonkeyPatch) -> None:
+    """GRAMREGEX_ENDPOINTS は JSON 配列で、空文字は未設定として扱う."""
+    monkeypatch.setenv("GRAMREGEX_ENDPOINTS", '[{"base_url": "https://a.example/v1", "weight": 2}]')
+    settings = Settings(openai_api_key="dummy")
+    assert settings.openai_endpoints == (OpenAIEndpoint(base_url="https://a.example/v1", weight=2),)
+
+    monkeypatch.setenv("GRAMREGEX_ENDPOINTS", "")
+    assert Settings(openai_api_key="dummy").openai_endpoints == ()
+
+
+def test_factory_builds_balanced_clients() -> None:
+    """エンドポイントを設定するとファクトリが負荷分散クライアントを返す."""
+    endpoints = (OpenAIEndpoint(base_url="https://a.example/v1"), OpenAIEndpoint(base_url="https://b.example/v1"))
+    settings = Settings(openai_api_key="dummy", openai_endpoints=endpoints)
+
+    client = create_llm_client(settings)
+    async_client = create_async_llm_client(settings)
+
+    assert isinstance(client, BalancedLLMClient)
+    assert isinstance(async_client, AsyncBalancedLLMClient)
+    client.close()
+
+
+def test_balanced_endpoints_fail_over_without_retrying() -> None:
+    """複数のエンドポイントではエンドポイントごとの再試行をせず、負荷分散側で次のエンドポイントへ切り替える."""
+    endpoints = (OpenAIEndpoint(base_url="https://a.example/v1"), OpenAIEndpoint(base_url="https://b.example/v1"))
+    settings = Settings(openai_api_key="dummy", openai_endpoints=endpoints, retry_max_attempts=4)
+
+    assert [_endpoint_settings(settings, endpoint).retry_max_attempts for endpoint in endpoints] == [1, 1]
+    single = settings.model_copy(update={"openai_endpoints": endpoints[:1]})
+    assert _endpoint_settings(single, endpoints[0]).retry_max_attempts == 4
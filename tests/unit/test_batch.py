@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+
+import pytest
+
+from gramregex.batch import agather_bounded, iter_bounded, iter_packed
+
+
+def test_iter_bounded_preserves_input_order() -> None:
+    """完了順に関わらず入力順で結果を返す."""
+
+    def slow_for_first(prompt: str) -> str:
+        if prompt == "a":
+            time.sleep(0.05)
+        return prompt.upper()
+
+    items = list(iter_bounded(slow_for_first, ["a", "b", "c"], max_in_flight=3))
+
+    assert [item.index for item in items] == [0, 1, 2]
+    assert [item.output for item in items] == ["A", "B", "C"]
+    assert all(item.ok for item in items)
+
+
+def test_iter_bounded_captures_errors_per_item() -> None:
+    """個々の失敗はバッチ全体を止めずに結果へ記録される."""
+
+    def fail_on_b(prompt: str) -> str:
+        if prompt == "b":
+            msg = "boom"
+            raise RuntimeError(msg)
+        return prompt
+
+    items = list(iter_bounded(fail_on_b, ["a", "b", "c"], max_in_flight=2))
+
+    assert [item.ok for item in items] == [True, False, True]
+    assert isinstance(items[1].error, RuntimeError)
+    assert items[1].output is None
+    assert items[2].output == "c"
+
+
+def test_iter_packed_sends_packs_and_falls_back_per_prompt() -> None:
+    """まとめて渡し、None の項目だけ 1 件ずつ呼び出し、まとまりの例外は全項目に記録する."""
+    packs: list[list[str]] = []
+    singles: list[str] = []
+
+    def pack_fn(prompts: list[str]) -> list[str | None]:
+        packs.append(prompts)
+        if "boom" in prompts:
+            msg = "rate limited"
+            raise RuntimeError(msg)
+        return [None if prompt == "retry" else prompt.upper() for prompt in prompts]
+
+    def fn(prompt: str) -> str:
+        singles.append(prompt)
+        return prompt
+
+    items = list(iter_packed(fn, pack_fn, ["a", "retry", "boom", "d", "e"], pack_size=2, max_in_flight=2))
+
+    assert packs == [["a", "retry"], ["boom", "d"]]
+    assert singles == ["retry", "e"]
+    assert [item.index for item in items] == [0, 1, 2, 3, 4]
+    assert [item.output for item in items] == ["A", "retry", None, None, "e"]
+    assert [str(item.error) for item in items[2:4]] == ["rate limited", "rate limited"]
+
+
+def test_iter_bounded_limits_in_flight_calls() -> None:
+    """同時実行数は max_in_flight を超えない."""
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def track(prompt: str) -> str:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+        return prompt
+
+    list(iter_bounded(track, [str(i) for i in range(20)], max_in_flight=3))
+
+    assert 1 <= peak <= 3
+
+
+def test_iter_bounded_consumes_input_lazily() -> None:
+    """入力は必要な分だけ読み進められる."""
+    pulled: list[int] = []
+
+    def prompts() -> Iterator[str]:
+        for i in range(100):
+            pulled.append(i)
+            yield str(i)
+
+    results = iter_bounded(lambda prompt: prompt, prompts(), max_in_flight=2)
+    first = next(results)
+
+    assert first.output == "0"
+    assert len(pulled) <= 3
+
+
+def test_iter_bounded_rejects_invalid_limit() -> None:
+    """max_in_flight は 1 以上でなければならない."""
+    with pytest.raises(ValueError, match="max_in_flight"):
+        list(iter_bounded(lambda prompt: prompt, ["a"], max_in_flight=0))
+
+
+@pytest.mark.asyncio
+async def test_agather_bounded_orders_results_and_limits_concurrency() -> None:
+    """非同期版も入力順を保ち、同時実行数を制限する."""
+    active = 0
+    peak = 0
+
+    async def echo(prompt: str) -> str:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01 if prompt == "0" else 0)
+        active -= 1
+        if prompt == "3":
+            msg = "boom"
+            raise RuntimeError(msg)
+        return prompt
+
+    items = await agather_bounded(echo, [str(i) for i in range(6)], max_in_flight=2)
+
+    assert [item.index for item in items] == list(range(6))
+    assert [item.output for item in items] == ["0", "1", "2", None, "4", "5"]
+    assert isinstance(items[3].error, RuntimeError)
+    assert peak <= 2
+
+
+@pytest.mark.asyncio
+async def test_agather_bounded_reads_input_lazily() -> None:
+    """非同期版も入力を少しずつ読み、未完了の呼び出しを max_in_flight 件までに抑える."""
+    pulled = 0
+    completed = 0
+    ahead: list[int] = []
+
+    def prompts() -> Iterator[str]:
+        nonlocal pulled
+        for index in range(50):
+            pulled += 1
+            yield str(index)
+
+    async def echo(prompt: str) -> str:
+        nonlocal completed
+        ahead.append(pulled - completed)
+        await asyncio.sleep(0)
+        completed += 1
+        return prompt
+
+    items = await agather_bounded(echo, prompts(), max_in_flight=3)
+
+    assert [item.output for item in items] == [str(index) for index in range(50)]
+    assert max(ahead) <= 3
@@ -0,0 +1,68 @@
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+import pytest
+
+from gramregex import api
+from gramregex.llm.factory import close_llm_clients
+from gramregex.settings import Settings
+
+BENCHMARKS = Path(__file__).resolve().parents[2] / "benchmarks"
+
+
+def _load(name: str) -> ModuleType:
+    spec = importlib.util.spec_from_file_location(name, BENCHMARKS / f"{name}.py")
+    assert spec is not None
+    assert spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def fake_responses() -> ModuleType:
+    """Load the fake endpoint module from the benchmarks directory."""
+    return _load("fake_responses")
+
+
+def test_fake_endpoint_serves_generate_and_stream(fake_responses: ModuleType) -> None:
+    """ベンチマーク用の疑似エンドポイントは実際の SDK から通常・ストリーミングの両方で使える."""
+    config = fake_responses.FakeConfig(payload_size=12, stream_chunks=3)
+    with fake_responses.FakeResponsesServer(config) as server:
+        settings = Settings(openai_api_key="bench", openai_base_url=server.base_url)
+        try:
+            output = api.generate("p", grammar="start: /x+/", settings=settings)
+            deltas = list(api.generate_stream("p", grammar="start: /x+/", settings=settings))
+        finally:
+            close_llm_clients()
+
+    assert output == "x" * 12
+    assert deltas == ["xxxx"] * 3
+    assert server.requests == 2
+
+
+def test_fake_endpoint_failures_are_retried(fake_responses: ModuleType) -> None:
+    """疑似エンドポイントの失敗は再試行可能なエラーとして扱われる."""
+    config = fake_responses.FakeConfig(error_rate=1.0)
+    with fake_responses.FakeResponsesServer(config) as server:
+        settings = Settings(openai_api_key="bench", openai_base_url=server.base_url, retry_max_attempts=2)
+        try:
+            with pytest.raises(Exception, match="simulated failure"):
+                api.generate("p", grammar="start: /x+/", settings=settings)
+        finally:
+            close_llm_clients()
+
+    assert server.requests == 2
+
+
+def test_percentile_uses_nearest_rank() -> None:
+    """パーセンタイルは最近傍順位法で計算する."""
+    bench = _load("bench_generate")
+    samples = [float(value) for value in range(1, 101)]
+
+    assert bench.percentile(samples, 0.5) == 50.0
+    assert bench.percentile(samples, 0.99) == 99.0
+    assert bench.percentile([3.0], 0.95) == 3.0
@@ -0,0 +1,243 @@
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from gramregex import api, cli
+from gramregex import settings as settings_module
+from gramregex.cache import (
+    CachedLLMClient,
+    ResponseCache,
+    cache_key,
+    cached_client,
+    endpoint_identity,
+    get_response_cache,
+)
+from gramregex.settings import Settings
+from gramregex.validator import compile_validator
+
+
+class CountingClient:
+    """Stub client counting provider calls."""
+
+    def __init__(self) -> None:
+        """Initialize the call counter."""
+        self.calls = 0
+
+    def generate(self, prompt: str, *, grammar: str, **_: object) -> str:
+        """Return a deterministic output and count the call."""
+        self.calls += 1
+        return f"{prompt}:{grammar}"
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests."""
+
+    def __init__(self) -> None:
+        """Start at time zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current fake time."""
+        return self.now
+
+
+def _key(prompt: str = "p", **overrides: object) -> str:
+    fields: dict[str, object] = {
+        "grammar": "root ::= 'x'",
+        "grammar_syntax": "lark",
+        "verbosity": None,
+        "reasoning_effort": None,
+    }
+    fields.update(overrides)
+    return cache_key("model", prompt, **fields)  # type: ignore[arg-type]
+
+
+def test_cache_key_changes_with_every_request_field() -> None:
+    """キーはモデル・プロンプト・grammar・各オプションで変化する."""
+    base = _key()
+
+    assert base == _key()
+    assert base != _key("other")
+    assert base != _key(grammar="root ::= 'y'")
+    assert base != _key(grammar_syntax="regex")
+    assert base != _key(verbosity="low")
+    assert base != _key(reasoning_effort="high")
+    assert base != cache_key(
+        "other-model",
+        "p",
+        grammar="root ::= 'x'",
+        grammar_syntax="lark",
+        verbosity=None,
+        reasoning_effort=None,
+    )
+
+
+def test_cached_client_serves_repeated_requests() -> None:
+    """同一リクエストはキャッシュから返し、ヒット/ミスを数える."""
+    inner = CountingClient()
+    cache = ResponseCache()
+    client = CachedLLMClient(inner, cache, model="model")  # type: ignore[arg-type]
+
+    first = client.generate("p", grammar="g", grammar_syntax="lark")
+    second = client.generate("p", grammar="g", grammar_syntax="lark")
+    client.generate("p", grammar="g", grammar_syntax="regex")
+
+    assert first == second == "p:g"
+    assert inner.calls == 2
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 2
+
+
+def test_cache_key_includes_instructions() -> None:
+    """共通の指示はキーに含め、指示なしのキーは従来と変わらない."""
+    assert _key() == _key(instructions=None)
+    assert _key() != _key(instructions="Label rows.")
+    assert _key(instructions="Label rows.") != _key(instructions="Other.")
+
+
+def test_cache_key_distinguishes_endpoints() -> None:
+    """同じモデル名でもエンドポイントが異なればキーが変わり、公開 API のキーは従来どおり."""
+    public = Settings(openai_api_key="dummy")
+    hosted = Settings(openai_api_key="dummy", openai_base_url="https://llm.example.com/v1")
+
+    assert endpoint_identity(public) is None
+    assert _key() == _key(endpoint=endpoint_identity(public))
+    assert _key(endpoint=endpoint_identity(hosted)) != _key()
+    assert endpoint_identity(Settings(openai_api_key="dummy", hedge_model="other")) is not None
+
+    cache = ResponseCache()
+    inner = CountingClient()
+    cached_client(inner, public, cache).generate("p", grammar="g", grammar_syntax="lark")  # type: ignore[arg-type]
+    cached_client(inner, hosted, cache).generate("p", grammar="g", grammar_syntax="lark")  # type: ignore[arg-type]
+    assert inner.calls == 2
+
+
+def test_validating_lookup_ignores_invalid_cached_output() -> None:
+    """検証付きのリクエストは、検証なしで保存された文法に合わない出力を返さず生成し直し、ミスとして数える."""
+    cache = ResponseCache()
+    inner = CountingClient()
+    CachedLLMClient(inner, cache, model="model").generate("p", grammar="p:x", grammar_syntax="regex")  # type: ignore[arg-type]
+    validating = CachedLLMClient(inner, cache, model="model", compiler=compile_validator)  # type: ignore[arg-type]
+
+    assert validating.generate("p", grammar="p:x", grammar_syntax="regex") == "p:p:x"
+    assert inner.calls == 2
+    assert validating.generate("q", grammar="q:.*", grammar_syntax="regex") == "q:q:.*"
+    assert validating.generate("q", grammar="q:.*", grammar_syntax="regex") == "q:q:.*"
+    assert inner.calls == 3
+    assert (cache.stats.hits, cache.stats.memory_hits, cache.stats.misses) == (1, 1, 3)
+
+
+def test_memory_tier_evicts_least_recently_used() -> None:
+    """メモリ層は上限を超えると最も古く使われたエントリを捨てる."""
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_entries_expire_after_ttl(tmp_path: Path) -> None:
+    """TTL を過ぎたエントリはメモリ・ディスクともにミスになる."""
+    clock = FakeClock()
+    with ResponseCache(directory=tmp_path, ttl=10, clock=clock) as cache:
+        cache.set("k", "v")
+        clock.now = 5
+        assert cache.get("k") == "v"
+
+        clock.now = 11
+        assert cache.get("k") is None
+
+
+def test_disk_tier_persists_between_instances(tmp_path: Path) -> None:
+    """ディスク層は別インスタンス (別プロセス) からも参照できる."""
+    with ResponseCache(directory=tmp_path) as cache:
+        cache.set("k", "persisted")
+
+    with ResponseCache(directory=tmp_path) as reopened:
+        assert reopened.get("k") == "persisted"
+        assert reopened.stats.disk_hits == 1
+        assert reopened.get("k") == "persisted"
+        assert reopened.stats.memory_hits == 1
+
+
+def test_disk_tier_evicts_by_size(tmp_path: Path) -> None:
+    """ディスク層は容量上限を超えると最も古く使われた行から削除する."""
+    clock = FakeClock()
+    with ResponseCache(directory=tmp_path, max_bytes=10, clock=clock) as cache:
+        cache.set("a", "aaaa")
+        clock.now = 1
+        cache.set("b", "bbbb")
+        clock.now = 2
+        cache.set("c", "cccc")
+
+    with ResponseCache(directory=tmp_path) as reopened:
+        assert reopened.get("a") is None
+        assert reopened.get("b") == "bbbb"
+        assert reopened.get("c") == "cccc"
+
+
+def test_get_response_cache_follows_settings(tmp_path: Path) -> None:
+    """設定で無効なら None、有効なら同じキャッシュを共有する."""
+    disabled = Settings(openai_api_key="dummy")
+    enabled = Settings(openai_api_key="dummy", cache_enabled=True, cache_dir=tmp_path)
+
+    assert get_response_cache(disabled) is None
+    cache = get_response_cache(enabled)
+    assert cache is not None
+    assert get_response_cache(enabled.model_copy()) is cache
+    cache.close()
+
+
+def test_cli_cache_dir_reuses_disk_cache(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """--cache-dir を指定すると同じ入力で二度目はモデルを呼ばない、--no-cache で無効化できる."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    settings_module.get_settings.cache_clear()
+
+    inner = CountingClient()
+    monkeypatch.setattr(api, "get_llm_client", lambda _: inner)
+
+    cache_dir = tmp_path / "cache"
+    args = ["generate", "--grammar", "root ::= 'a'", "--cache-dir", str(cache_dir), "input"]
+
+    first = runner.invoke(cli.app, args)
+    second = runner.invoke(cli.app, args)
+    bypass = runner.invoke(cli.app, [*args[:-1], "--no-cache", "input"])
+
+    assert first.exit_code == 0, first.stdout
+    assert second.stdout == first.stdout
+    assert bypass.exit_code == 0, bypass.stdout
+    assert inner.calls == 2
+    settings_module.get_settings.cache_clear()
+
+
+class StreamingClient(CountingClient):
+    """Stub client streaming its output in two chunks."""
+
+    def stream(self, prompt: str, *, grammar: str, **_: object) -> Iterator[str]:
+        """Yield the output in pieces and count the call."""
+        self.calls += 1
+        yield prompt
+        yield f":{grammar}"
+
+
+def test_cached_client_stream_stores_complete_output() -> None:
+    """ストリーミング結果は結合して保存され、次回は一括で返る."""
+    inner = StreamingClient()
+    client = CachedLLMClient(inner, ResponseCache(), model="model")  # type: ignore[arg-type]
+
+    first = list(client.stream("p", grammar="g", grammar_syntax="lark"))
+    second = list(client.stream("p", grammar="g", grammar_syntax="lark"))
+
+    assert first == ["p", ":g"]
+    assert second == ["p:g"]
+    assert inner.calls == 1
+    assert client.generate("p", grammar="g", grammar_syntax="lark") == "p:g"
+    assert inner.calls == 1
@@ -0,0 +1,56 @@
+import csv
+import io
+from pathlib import Path
+
+import pytest
+
+from gramregex.checkpoint import Checkpoint, LineReader, Progress, truncate
+
+
+def test_checkpoint_saves_atomically_and_throttles(tmp_path: Path) -> None:
+    """進捗は保存間隔ごとに書き出し、読み直すと同じ値になる."""
+    now = [0.0]
+    checkpoint = Checkpoint(tmp_path / "out.jsonl.checkpoint", interval=5, clock=lambda: now[0])
+
+    assert checkpoint.load() is None
+    assert checkpoint.due()
+    checkpoint.save(Progress(records=2, input_offset=10, output_offset=20))
+    assert not checkpoint.due()
+    now[0] = 5
+    assert checkpoint.due()
+
+    assert checkpoint.load() == Progress(records=2, input_offset=10, output_offset=20)
+    assert [path.name for path in tmp_path.iterdir()] == ["out.jsonl.checkpoint"]
+
+
+def test_checkpoint_rejects_corrupt_file(tmp_path: Path) -> None:
+    """壊れた進捗ファイルは ValueError になる."""
+    path = tmp_path / "checkpoint"
+    path.write_text('{"records": 1}', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="Corrupt checkpoint"):
+        Checkpoint(path).load()
+
+
+def test_line_reader_tracks_byte_offsets_through_csv() -> None:
+    """行の読み取り位置はバイト単位で、複数行にまたがる CSV のレコードでも正しく進む."""
+    data = 'text\r\n"ä\nb"\r\nc\r\n'.encode()
+    stream = io.BytesIO(data)
+    reader = LineReader(stream)
+    rows = csv.reader(reader)
+
+    offsets = [(row, reader.offset) for row in rows]
+
+    assert offsets == [(["text"], 6), (["ä\nb"], 14), (["c"], len(data))]
+
+
+def test_truncate_refuses_to_grow(tmp_path: Path) -> None:
+    """出力ファイルが進捗より短い場合は切り詰めずにエラーにする."""
+    path = tmp_path / "out.jsonl"
+    path.write_bytes(b"0123456789")
+
+    truncate(path, 4)
+
+    assert path.read_bytes() == b"0123"
+    with pytest.raises(ValueError, match="shorter than its checkpoint"):
+        truncate(path, 8)
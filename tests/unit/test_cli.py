@@ -1,15 +1,18 @@
+import json
+import pickle
 from pathlib import Path
 
 
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import pytest
 from typer.testing import CliRunner
 
-from gramregex import cli
+from gramregex import api, cli
 from gramregex import settings as settings_module
 from gramregex.config import load_grammar_config
-from gramregex.llm.base import GrammarSyntax, ReasoningEffort, VerbosityLevel
+from gramregex.llm.base import GenerationResult, GrammarSyntax, ReasoningEffort, VerbosityLevel
 
 
 class DummyClient:
@@ -27,6 +30,7 @@ class DummyClient:
         grammar_syntax: GrammarSyntax,
         verbosity: VerbosityLevel | None = None,
         reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
     ) -> str:
         """Record the call and return canned text."""
         self.generate_called_with = {
@@ -35,6 +39,7 @@ class DummyClient:
             "grammar_syntax": grammar_syntax,
             "verbosity": verbosity,
             "reasoning_effort": reasoning_effort,
+            "instructions": instructions,
         }
         return "grammar-output"
 
@@ -60,7 +65,7 @@ def test_cli_uses_factory_and_outputs_result(monkeypatch: pytest.MonkeyPatch, tm
     def fake_create_client(_: object) -> DummyClient:
         return dummy_client
 
-    monkeypatch.setattr(cli, "create_llm_client", fake_create_client)
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
 
     result = runner.invoke(
         cli.app,
@@ -73,6 +78,8 @@ def test_cli_uses_factory_and_outputs_result(monkeypatch: pytest.MonkeyPatch, tm
             "medium",
             "--grammar-syntax",
             "regex",
+            "--instructions",
+            "Answer tersely.",
             "input text",
         ],
     )
@@ -85,6 +92,7 @@ def test_cli_uses_factory_and_outputs_result(monkeypatch: pytest.MonkeyPatch, tm
         "grammar_syntax": "regex",
         "verbosity": "high",
         "reasoning_effort": "medium",
+        "instructions": "Answer tersely.",
     }
 
 
@@ -98,7 +106,7 @@ def test_cli_defaults_grammar_syntax(monkeypatch: pytest.MonkeyPatch) -> None:
     def fake_create_client(_: object) -> DummyClient:
         return dummy_client
 
-    monkeypatch.setattr(cli, "create_llm_client", fake_create_client)
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
 
     result = runner.invoke(
         cli.app,
@@ -126,7 +134,7 @@ def test_cli_loads_default_config_when_no_grammar(monkeypatch: pytest.MonkeyPatc
     def fake_create_client(_: object) -> DummyClient:
         return dummy_client
 
-    monkeypatch.setattr(cli, "create_llm_client", fake_create_client)
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
 
     result = runner.invoke(cli.app, ["input text"])
 
@@ -138,6 +146,7 @@ def test_cli_loads_default_config_when_no_grammar(monkeypatch: pytest.MonkeyPatc
         "grammar_syntax": "lark",
         "verbosity": None,
         "reasoning_effort": None,
+        "instructions": None,
     }
 
 
@@ -163,10 +172,379 @@ content: |
     def fake_create_client(_: object) -> DummyClient:
         return dummy_client
 
-    monkeypatch.setattr(cli, "create_llm_client", fake_create_client)
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
 
     result = runner.invoke(cli.app, ["input text"])
 
     assert result.exit_code == 0, result.stdout
     assert dummy_client.generate_called_with is not None
     assert dummy_client.generate_called_with["grammar"] == 'root ::= "from-config"'
+
+
+def test_cli_generate_subcommand_is_explicitly_available(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Generate サブコマンドを明示しても従来通り動作する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    dummy_client = DummyClient(None)
+
+    def fake_create_client(_: object) -> DummyClient:
+        return dummy_client
+
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
+
+    result = runner.invoke(cli.app, ["generate", "--grammar", "root ::= 'a'", "input text"])
+
+    assert result.exit_code == 0, result.stdout
+    assert dummy_client.generate_called_with is not None
+    assert dummy_client.generate_called_with["prompt"] == "input text"
+
+
+def test_cli_generate_json_outputs_result(monkeypatch: pytest.MonkeyPatch) -> None:
+    """--json は出力テキストとメタデータを JSON で出力し、--stream とは併用できない."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class UsageClient(DummyClient):
+        def generate_result(self, prompt: str, **_: object) -> GenerationResult:
+            return GenerationResult(text=prompt, model="m", response_id="resp_1", output_tokens=2, latency=0.25)
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: UsageClient(None))
+
+    result = runner.invoke(cli.app, ["generate", "--no-daemon", "--json", "--grammar", "g", "出力"])
+    rejected = runner.invoke(cli.app, ["generate", "--no-daemon", "--json", "--stream", "--grammar", "g", "x"])
+
+    assert result.exit_code == 0, result.output
+    payload = json.loads(result.stdout)
+    assert payload["text"] == "出力"
+    assert payload["response_id"] == "resp_1"
+    assert payload["output_tokens"] == 2
+    assert payload["from_cache"] is False
+    assert rejected.exit_code == 2
+
+
+def test_cli_batch_outputs_jsonl_in_order(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Batch コマンドは JSONL を読み、入力順に結果を出力する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class EchoClient(DummyClient):
+        def generate(self, prompt: str, **_: object) -> str:
+            if prompt == "bad":
+                msg = "provider error"
+                raise RuntimeError(msg)
+            return prompt.upper()
+
+    def fake_create_client(_: object) -> DummyClient:
+        return EchoClient(None)
+
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
+
+    input_path = tmp_path / "prompts.jsonl"
+    input_path.write_text(
+        '"first"\n\n{"id": "row-2", "prompt": "bad"}\n{"prompt": "third"}\n',
+        encoding="utf-8",
+    )
+
+    result = runner.invoke(cli.app, ["batch", str(input_path), "--grammar", "root ::= 'a'", "-j", "2"])
+
+    assert result.exit_code == 1
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    assert lines == [
+        {"index": 0, "output": "FIRST"},
+        {"index": 1, "id": "row-2", "error": "provider error"},
+        {"index": 2, "output": "THIRD"},
+    ]
+
+
+def test_cli_batch_starts_at_prompt_through_line_index(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """--start は行インデックスで途中のプロンプトから始め、--limit の件数だけ処理する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class EchoClient(DummyClient):
+        def generate(self, prompt: str, **_: object) -> str:
+            return prompt.upper()
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: EchoClient(None))
+    input_path = tmp_path / "prompts.jsonl"
+    input_path.write_text('"a"\n\n"b"\n"c"\n"d"\n', encoding="utf-8")
+
+    result = runner.invoke(cli.app, ["batch", str(input_path), "-g", "root ::= 'a'", "--start", "1", "--limit", "2"])
+    from_stdin = runner.invoke(cli.app, ["batch", "-g", "root ::= 'a'", "--start", "1"], input='"a"\n')
+
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")] == [
+        {"index": 1, "output": "B"},
+        {"index": 2, "output": "C"},
+    ]
+    assert (tmp_path / "prompts.jsonl.idx").exists()
+    assert from_stdin.exit_code == 2
+
+
+def test_cli_batch_reads_stdin(monkeypatch: pytest.MonkeyPatch) -> None:
+    """入力ファイルを省略した場合は標準入力から読む."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    dummy_client = DummyClient(None)
+
+    def fake_create_client(_: object) -> DummyClient:
+        return dummy_client
+
+    monkeypatch.setattr(api, "get_llm_client", fake_create_client)
+
+    result = runner.invoke(cli.app, ["batch", "--grammar", "root ::= 'a'"], input='"from stdin"\n')
+
+    assert result.exit_code == 0, result.stdout
+    assert json.loads(result.stdout) == {"index": 0, "output": "grammar-output"}
+
+
+def test_cli_batch_reads_instructions_file(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """--instructions-file の内容を全入力に共通の指示として渡し、--instructions との併用は拒否する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    dummy_client = DummyClient(None)
+    monkeypatch.setattr(api, "get_llm_client", lambda _: dummy_client)
+    instructions_path = tmp_path / "instructions.txt"
+    instructions_path.write_text("Label each row.", encoding="utf-8")
+
+    args = ["batch", "--grammar", "root ::= 'a'", "--instructions-file", str(instructions_path)]
+    result = runner.invoke(cli.app, args, input='"row"\n')
+    conflict = runner.invoke(cli.app, [*args, "--instructions", "other"], input='"row"\n')
+
+    assert result.exit_code == 0, result.stdout
+    assert dummy_client.generate_called_with is not None
+    assert dummy_client.generate_called_with["instructions"] == "Label each row."
+    assert conflict.exit_code == 2
+
+
+def test_cli_batch_rejects_invalid_jsonl(monkeypatch: pytest.MonkeyPatch) -> None:
+    """不正な JSONL 行はエラーになる."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: DummyClient(None))
+
+    result = runner.invoke(cli.app, ["batch", "--grammar", "root ::= 'a'"], input="{not json}\n")
+
+    assert result.exit_code != 0
+
+
+def test_cli_map_streams_csv_to_output_file(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Map コマンドは CSV の各行に出力を付けて JSONL ファイルへ書き出す."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class EchoClient(DummyClient):
+        def generate(self, prompt: str, **_: object) -> str:
+            if prompt == "bad":
+                msg = "provider error"
+                raise RuntimeError(msg)
+            return prompt.upper()
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: EchoClient(None))
+    input_path = tmp_path / "rows.csv"
+    input_path.write_text('id,text\n1,first\n2,bad\n3,"multi\nline"\n', encoding="utf-8")
+    output_path = tmp_path / "out.jsonl"
+
+    args = ["map", str(input_path), "-o", str(output_path), "--prompt-field", "text", "-g", "root ::= 'a'", "-j", "2"]
+    result = runner.invoke(cli.app, args)
+
+    assert result.exit_code == 1
+    assert [json.loads(line) for line in output_path.read_text(encoding="utf-8").splitlines()] == [
+        {"id": "1", "text": "first", "output": "FIRST"},
+        {"id": "2", "text": "bad", "error": "provider error"},
+        {"id": "3", "text": "multi\nline", "output": "MULTI\nLINE"},
+    ]
+
+
+def test_cli_map_reads_jsonl_and_rejects_missing_field(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """JSONL の行はそのまま引き継ぎ、プロンプトの列がない CSV はエラーになる."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    monkeypatch.setattr(api, "get_llm_client", lambda _: DummyClient(None))
+    jsonl_path = tmp_path / "rows.jsonl"
+    jsonl_path.write_text('"plain"\n{"prompt": "p", "meta": {"k": 1}}\n', encoding="utf-8")
+    csv_path = tmp_path / "rows.csv"
+    csv_path.write_text("id,text\n1,x\n", encoding="utf-8")
+
+    result = runner.invoke(cli.app, ["map", str(jsonl_path), "-g", "root ::= 'a'"])
+    missing = runner.invoke(cli.app, ["map", str(csv_path), "-g", "root ::= 'a'"])
+
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")] == [
+        {"prompt": "plain", "output": "grammar-output"},
+        {"prompt": "p", "meta": {"k": 1}, "output": "grammar-output"},
+    ]
+    assert missing.exit_code == 2
+
+
+def test_cli_map_resumes_interrupted_run(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """中断した map は --resume で完了済みの行を飛ばして続きから処理する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    prompts: list[str] = []
+
+    class InterruptingClient(DummyClient):
+        interrupt = True
+
+        def generate(self, prompt: str, **_: object) -> str:
+            if prompt == "stop" and self.interrupt:
+                raise KeyboardInterrupt
+            prompts.append(prompt)
+            return prompt.upper()
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: InterruptingClient(None))
+    input_path = tmp_path / "rows.csv"
+    input_path.write_text("text\na\nstop\nb\n", encoding="utf-8")
+    output_path = tmp_path / "out.jsonl"
+    args = ["map", str(input_path), "-o", str(output_path), "--prompt-field", "text", "-g", "root ::= 'a'", "-j", "1"]
+
+    interrupted = runner.invoke(cli.app, args)
+    InterruptingClient.interrupt = False
+    resumed = runner.invoke(cli.app, [*args, "--resume"])
+
+    assert interrupted.exit_code != 0
+    assert resumed.exit_code == 0, resumed.stdout
+    assert prompts == ["a", "stop", "b"]
+    assert [json.loads(line)["output"] for line in output_path.read_text(encoding="utf-8").splitlines()] == [
+        "A",
+        "STOP",
+        "B",
+    ]
+
+
+def test_cli_map_resume_requires_checkpoint(tmp_path: Path) -> None:
+    """進捗ファイルのない既存の出力や標準出力への出力では --resume を拒否する."""
+    runner = CliRunner()
+    input_path = tmp_path / "rows.jsonl"
+    input_path.write_text('"a"\n', encoding="utf-8")
+    output_path = tmp_path / "out.jsonl"
+    output_path.write_text('{"output": "A"}\n', encoding="utf-8")
+
+    to_stdout = runner.invoke(cli.app, ["map", str(input_path), "-g", "g", "--resume"])
+    no_checkpoint = runner.invoke(cli.app, ["map", str(input_path), "-o", str(output_path), "-g", "g", "--resume"])
+
+    assert to_stdout.exit_code == 2
+    assert no_checkpoint.exit_code == 2
+
+
+def test_cli_map_shards_concatenate_to_full_output(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """--shard i/k の出力を順に連結すると、分割しない実行の出力と一致する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class EchoClient(DummyClient):
+        def generate(self, prompt: str, **_: object) -> str:
+            return prompt.upper()
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: EchoClient(None))
+    input_path = tmp_path / "rows.csv"
+    input_path.write_text("text\n" + "".join(f"row{index}\n" for index in range(10)), encoding="utf-8")
+    args = ["map", str(input_path), "--prompt-field", "text", "-g", "root ::= 'a'"]
+
+    full = runner.invoke(cli.app, [*args, "-o", str(tmp_path / "full.jsonl")])
+    shards = [
+        runner.invoke(cli.app, [*args, "--shard", f"{index}/3", "-o", str(tmp_path / f"{index}.jsonl")])
+        for index in (1, 2, 3)
+    ]
+    invalid = runner.invoke(cli.app, [*args, "--shard", "4/3"])
+
+    assert [result.exit_code for result in [full, *shards]] == [0, 0, 0, 0]
+    merged = "".join((tmp_path / f"{index}.jsonl").read_text(encoding="utf-8") for index in (1, 2, 3))
+    assert merged == (tmp_path / "full.jsonl").read_text(encoding="utf-8")
+    assert all((tmp_path / f"{index}.jsonl").stat().st_size for index in (1, 2, 3))
+    assert invalid.exit_code == 2
+
+
+def test_cli_map_workers_merge_parts_in_order(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """--workers は分割した入力を別々に処理し、入力順に 1 つの出力へまとめる."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class EchoClient(DummyClient):
+        def generate(self, prompt: str, **_: object) -> str:
+            return prompt.upper()
+
+    class PicklingPool(ThreadPoolExecutor):
+        """Thread pool that round-trips each job through pickle, as a process pool would."""
+
+        def submit(self, fn: Callable[..., object], /, *args: object, **kwargs: object) -> Future[object]:
+            fn, args, kwargs = pickle.loads(pickle.dumps((fn, args, kwargs)))  # noqa: S301
+            return super().submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: EchoClient(None))
+    monkeypatch.setattr(cli, "_process_pool", PicklingPool)
+    input_path = tmp_path / "rows.jsonl"
+    input_path.write_text("".join(f'"row{index}"\n' for index in range(9)), encoding="utf-8")
+    output_path = tmp_path / "out.jsonl"
+    args = ["map", str(input_path), "-g", "root ::= 'a'", "-o", str(output_path), "--workers", "4"]
+
+    result = runner.invoke(cli.app, args)
+    resumed = runner.invoke(cli.app, [*args, "--resume"])
+
+    assert result.exit_code == 0, result.stdout
+    assert [json.loads(line)["output"] for line in output_path.read_text(encoding="utf-8").splitlines()] == [
+        f"ROW{index}" for index in range(9)
+    ]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["out.jsonl", "out.jsonl.checkpoint", "rows.jsonl"]
+    assert resumed.exit_code == 0
+    assert "0 record(s) written" in resumed.stdout
+
+
+def test_cli_map_workers_resume_after_failed_part(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """ワーカーが失敗した実行では完了の進捗を残さず、--resume で未完了のパートを処理する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class EchoClient(DummyClient):
+        def generate(self, prompt: str, **_: object) -> str:
+            return prompt.upper()
+
+    run_map = cli._run_map  # noqa: SLF001
+    failing = [True]
+
+    def flaky_run_map(*args: object, shard: tuple[int, int], **kwargs: object) -> object:
+        if shard[0] == 1 and failing:
+            failing.clear()
+            msg = "worker crashed"
+            raise RuntimeError(msg)
+        return run_map(*args, shard=shard, **kwargs)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: EchoClient(None))
+    monkeypatch.setattr(cli, "_process_pool", ThreadPoolExecutor)
+    input_path = tmp_path / "rows.jsonl"
+    input_path.write_text("".join(f'"row{index}"\n' for index in range(9)), encoding="utf-8")
+    output_path = tmp_path / "out.jsonl"
+    args = ["map", str(input_path), "-g", "root ::= 'a'", "-o", str(output_path), "--workers", "3"]
+
+    assert runner.invoke(cli.app, args).exit_code == 0
+    monkeypatch.setattr(cli, "_run_map", flaky_run_map)
+    failed = runner.invoke(cli.app, args)
+    resumed = runner.invoke(cli.app, [*args, "--resume"])
+
+    assert failed.exit_code != 0
+    assert resumed.exit_code == 0, resumed.stdout
+    assert "3 record(s) written" in resumed.stdout
+    assert [json.loads(line)["output"] for line in output_path.read_text(encoding="utf-8").splitlines()] == [
+        f"ROW{index}" for index in range(9)
+    ]
+
+
+def test_cli_stream_prints_deltas(monkeypatch: pytest.MonkeyPatch) -> None:
+    """--stream を指定するとクライアントのストリームを逐次出力する."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    class StreamingClient(DummyClient):
+        def stream(self, prompt: str, **_: object) -> Iterator[str]:
+            yield from (prompt, "-", "streamed")
+
+    monkeypatch.setattr(api, "get_llm_client", lambda _: StreamingClient(None))
+
+    result = runner.invoke(cli.app, ["--grammar", "root ::= 'a'", "--stream", "input"])
+
+    assert result.exit_code == 0, result.stdout
+    assert result.stdout == "input-streamed\n"
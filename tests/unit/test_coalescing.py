@@ -0,0 +1,168 @@
+import asyncio
+import threading
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from gramregex import instrumentation
+from gramregex.coalescing import (
+    AsyncCoalescingLLMClient,
+    AsyncSingleFlight,
+    CoalescingLLMClient,
+    SingleFlight,
+    coalesced_client,
+)
+from gramregex.instrumentation import CallEvent, InstrumentedLLMClient
+from gramregex.llm.base import AsyncLLMClient, LLMClient
+from gramregex.settings import Settings
+
+
+class GatedClient(LLMClient):
+    """Client answering once ``release`` is set, counting the requests it receives."""
+
+    def __init__(self, release: threading.Event, *, error: Exception | None = None) -> None:
+        """Block every request on ``release``."""
+        self.release = release
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+
+    def generate(self, prompt: str, **_: object) -> str:  # type: ignore[override]
+        """Wait for the release, then answer or raise."""
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return prompt.upper()
+
+    def stream(self, prompt: str, **_: object) -> Iterator[str]:  # type: ignore[override]
+        """Yield the prompt."""
+        yield prompt
+
+
+class SlowAsyncClient(AsyncLLMClient):
+    """Async client answering after a short sleep, counting the requests it receives."""
+
+    def __init__(self) -> None:
+        """Start with no requests."""
+        self.calls = 0
+
+    async def generate(self, prompt: str, **_: object) -> str:  # type: ignore[override]
+        """Sleep briefly, then answer."""
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return prompt.upper()
+
+    async def stream(self, prompt: str, **_: object) -> AsyncIterator[str]:  # type: ignore[override]
+        """Yield the prompt."""
+        yield prompt
+
+
+def _run_concurrently(client: LLMClient, prompts: list[str], gate: GatedClient) -> list[object]:
+    with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+        futures = [executor.submit(client.generate, prompt, grammar="g", grammar_syntax="lark") for prompt in prompts]
+        gate.started.wait(timeout=5)
+        threading.Timer(0.1, gate.release.set).start()
+        outcomes: list[object] = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except RuntimeError as error:
+                outcomes.append(error)
+        return outcomes
+
+
+def test_identical_concurrent_calls_send_one_request() -> None:
+    """同時に届いた同一のリクエストは 1 回だけ送り、全員に同じ結果を返す."""
+    gate = GatedClient(threading.Event())
+    flight = SingleFlight()
+    events: list[CallEvent] = []
+
+    class Collecting:
+        def emit(self, event: CallEvent) -> None:
+            events.append(event)
+
+    sink = Collecting()
+    instrumentation.add_sink(sink)
+    try:
+        client = InstrumentedLLMClient(CoalescingLLMClient(gate, flight, model="m", scope="k"), model="m")
+        outputs = _run_concurrently(client, ["same"] * 4, gate)
+    finally:
+        instrumentation.remove_sink(sink)
+
+    assert outputs == ["SAME"] * 4
+    assert gate.calls == 1
+    assert sorted(event.coalesced for event in events) == [False, True, True, True]
+    assert len(flight) == 0
+
+
+def test_different_requests_are_not_coalesced() -> None:
+    """プロンプトやオプションが異なるリクエストはそれぞれ送る."""
+    gate = GatedClient(threading.Event())
+    client = CoalescingLLMClient(gate, SingleFlight(), model="m", scope="k")
+
+    outputs = _run_concurrently(client, ["a", "b"], gate)
+
+    assert outputs == ["A", "B"]
+    assert gate.calls == 2
+
+
+def test_errors_are_shared_and_not_remembered() -> None:
+    """送信中のリクエストのエラーは待っている全員に返し、完了後は新しく送り直す."""
+    gate = GatedClient(threading.Event(), error=RuntimeError("provider error"))
+    client = CoalescingLLMClient(gate, SingleFlight(), model="m", scope="k")
+
+    outcomes = _run_concurrently(client, ["same"] * 3, gate)
+    gate.error = None
+
+    assert [str(outcome) for outcome in outcomes] == ["provider error"] * 3
+    assert client.generate("same", grammar="g", grammar_syntax="lark") == "SAME"
+    assert gate.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_async_calls_coalesce_and_survive_cancelled_waiter() -> None:
+    """非同期でも同一リクエストをまとめ、待機側のキャンセルは共有リクエストを止めない."""
+    backend = SlowAsyncClient()
+    client = AsyncCoalescingLLMClient(backend, AsyncSingleFlight(), model="m", scope="k")
+
+    first = asyncio.ensure_future(client.generate("same", grammar="g", grammar_syntax="lark"))
+    await asyncio.sleep(0)
+    others = [asyncio.ensure_future(client.generate("same", grammar="g", grammar_syntax="lark")) for _ in range(2)]
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await asyncio.gather(*others) == ["SAME", "SAME"]
+    assert backend.calls == 1
+
+
+def test_coalescing_is_opt_in() -> None:
+    """coalesce_requests は既定で無効で、有効にした場合だけクライアントを包む."""
+    gate = GatedClient(threading.Event())
+
+    assert coalesced_client(gate, Settings(openai_api_key="dummy")) is gate
+    assert isinstance(
+        coalesced_client(gate, Settings(openai_api_key="dummy", coalesce_requests=True)),
+        CoalescingLLMClient,
+    )
+
+
+def test_clients_with_different_credentials_are_not_coalesced() -> None:
+    """API キーや送り先が異なるクライアントの同一リクエストは共有しない."""
+    gate = GatedClient(threading.Event())
+    first = coalesced_client(gate, Settings(openai_api_key="key-a", coalesce_requests=True))
+    second = coalesced_client(
+        gate,
+        Settings(openai_api_key="key-b", openai_base_url="https://other.example/v1", coalesce_requests=True),
+    )
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(client.generate, "same", grammar="g", grammar_syntax="lark") for client in (first, second)
+        ]
+        threading.Timer(0.1, gate.release.set).start()
+        assert [future.result() for future in futures] == ["SAME", "SAME"]
+
+    assert gate.calls == 2
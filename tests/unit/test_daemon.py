@@ -0,0 +1,161 @@
+import json
+import tempfile
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from gramregex import api, cli, daemon
+from gramregex import settings as settings_module
+from gramregex.llm.base import GenerationResult
+from gramregex.settings import Settings
+
+
+class EchoClient:
+    """Stub client echoing the prompt and counting calls."""
+
+    def __init__(self) -> None:
+        """Initialize the call counter."""
+        self.calls = 0
+
+    def generate(self, prompt: str, **_: object) -> str:
+        """Return the prompt in upper case."""
+        self.calls += 1
+        return prompt.upper()
+
+    def generate_result(self, prompt: str, **_: object) -> GenerationResult:
+        """Return the upper-cased prompt with a response id."""
+        self.calls += 1
+        return GenerationResult(text=prompt.upper(), model="m", response_id="resp_1")
+
+    def stream(self, prompt: str, **_: object) -> Iterator[str]:
+        """Yield the prompt one character at a time."""
+        self.calls += 1
+        yield from prompt.upper()
+
+
+@pytest.fixture
+def socket_path() -> Iterator[Path]:
+    """Provide a short socket path (Unix socket paths are limited to ~100 bytes)."""
+    with tempfile.TemporaryDirectory(prefix="gramregex-") as directory:
+        yield Path(directory) / "daemon.sock"
+
+
+@pytest.fixture
+def server(socket_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[EchoClient]:
+    """Run a daemon in a background thread with a stub LLM client."""
+    client = EchoClient()
+    monkeypatch.setattr(api, "get_llm_client", lambda _: client)
+    monkeypatch.setenv(daemon.SOCKET_ENV, str(socket_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    settings_module.get_settings.cache_clear()
+
+    generation_server = daemon.GenerationServer(socket_path, Settings(openai_api_key="dummy"))
+    thread = threading.Thread(target=generation_server.serve_forever, daemon=True)
+    thread.start()
+    yield client
+    generation_server.shutdown()
+    generation_server.server_close()
+    thread.join()
+    settings_module.get_settings.cache_clear()
+
+
+def test_request_returns_output_and_stream(server: EchoClient) -> None:
+    """デーモンは通常出力とストリーミング出力の両方を返す."""
+    output = list(daemon.request({"prompt": "ok", "grammar": "root ::= 'OK'"}))
+    streamed = list(daemon.request({"prompt": "ab", "grammar": "g", "stream": True}))
+
+    assert output == [{"output": "OK"}]
+    assert streamed == [{"delta": "A"}, {"delta": "B"}, {"end": True}]
+    assert server.calls == 2
+
+
+def test_request_reports_validation_errors(server: EchoClient) -> None:
+    """検証エラーは種類付きでクライアントに返る."""
+    responses = list(daemon.request({"prompt": "no", "grammar": "yes", "grammar_syntax": "regex", "validate": True}))
+
+    assert responses[-1]["kind"] == daemon.ERROR_VALIDATION
+    assert server.calls == 1
+
+
+def test_cli_generate_forwards_to_running_daemon(server: EchoClient, socket_path: Path) -> None:
+    """デーモン起動中は generate がソケット経由で処理される."""
+    runner = CliRunner()
+
+    result = runner.invoke(cli.app, ["generate", "--grammar", "g", "hello"])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout == "HELLO\n"
+    assert server.calls == 1
+    assert socket_path.exists()
+
+
+def test_cli_generate_json_through_daemon(server: EchoClient) -> None:
+    """--json の結果もデーモン経由で JSON として出力される."""
+    result = CliRunner().invoke(cli.app, ["generate", "--json", "--grammar", "g", "hello"])
+
+    assert result.exit_code == 0, result.output
+    payload = json.loads(result.stdout)
+    assert (payload["text"], payload["response_id"]) == ("HELLO", "resp_1")
+    assert server.calls == 1
+
+
+def test_daemon_with_other_settings_is_not_used(server: EchoClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    """クライアントの設定がデーモン起動時と異なる場合は転送せず、その場で実行する."""
+    monkeypatch.setenv("OPENAI_BASE_URL", "https://other.example.com/v1")
+    with pytest.raises(daemon.DaemonUnavailableError, match="settings differ"):
+        daemon.request({"prompt": "x", "grammar": "g", "fingerprint": daemon.settings_fingerprint()})
+
+    local = EchoClient()
+    monkeypatch.setattr(api, "get_llm_client", lambda _: local)
+    result = CliRunner().invoke(cli.app, ["generate", "--grammar", "g", "hello"])
+
+    assert result.exit_code == 0, result.output
+    assert result.stdout == "HELLO\n"
+    assert (server.calls, local.calls) == (0, 1)
+
+
+def test_settings_fingerprint_tracks_settings_sources(tmp_path: Path) -> None:
+    """フィンガープリントは設定の環境変数と .env だけで決まる."""
+    environ = {"OPENAI_API_KEY": "a", "PATH": "/bin", daemon.SOCKET_ENV: "a.sock"}
+    base = daemon.settings_fingerprint(environ, tmp_path)
+
+    assert daemon.settings_fingerprint({**environ, "PATH": "/usr/bin", daemon.SOCKET_ENV: "b.sock"}, tmp_path) == base
+    assert daemon.settings_fingerprint({**environ, "OPENAI_API_KEY": "b"}, tmp_path) != base
+    (tmp_path / ".env").write_text("OPENAI_MODEL=other\n")
+    assert daemon.settings_fingerprint(environ, tmp_path) != base
+
+
+def test_settings_fingerprint_covers_unprefixed_settings(tmp_path: Path) -> None:
+    """接頭辞のない設定名 (ROUTE や CACHE_ENABLED など、大文字小文字を問わない) もフィンガープリントに含める."""
+    environ = {"OPENAI_API_KEY": "a"}
+    base = daemon.settings_fingerprint(environ, tmp_path)
+
+    for name, value in [("ROUTE", "m1,m2"), ("cache_enabled", "true"), ("Rate_Limit_Rpm", "5"), ("PROVIDER", "x")]:
+        assert daemon.settings_fingerprint({**environ, name: value}, tmp_path) != base
+    assert settings_module.settings_env_names() == daemon._SETTINGS_ENV_NAMES  # noqa: SLF001
+
+
+def test_request_without_daemon_is_unavailable(socket_path: Path) -> None:
+    """ソケットがなければ DaemonUnavailableError になり、CLI はローカル実行に戻る."""
+    with pytest.raises(daemon.DaemonUnavailableError):
+        daemon.request({"prompt": "x"}, socket_path)
+
+    socket_path.touch()
+    with pytest.raises(daemon.DaemonUnavailableError):
+        daemon.request({"prompt": "x"}, socket_path)
+
+
+def test_server_removes_stale_socket_and_cleans_up(socket_path: Path) -> None:
+    """残った古いソケットファイルは置き換え、終了時に削除する."""
+    socket_path.touch()
+
+    generation_server = daemon.GenerationServer(socket_path, Settings(openai_api_key="dummy"))
+    assert socket_path.is_socket()
+    with pytest.raises(ValueError, match="already listening"):
+        daemon.GenerationServer(socket_path, Settings(openai_api_key="dummy"))
+
+    generation_server.server_close()
+    assert not socket_path.exists()
@@ -1,7 +1,17 @@
+import asyncio
+
 import pytest
 
 from gramregex.llm.base import GrammarSyntax, ReasoningEffort, VerbosityLevel
-from gramregex.llm.factory import create_llm_client
+from gramregex.llm.factory import (
+    ClientPool,
+    aclose_llm_clients,
+    close_llm_clients,
+    create_async_llm_client,
+    create_llm_client,
+    get_async_llm_client,
+    get_llm_client,
+)
 from gramregex.settings import Settings
 
 
@@ -20,9 +30,10 @@ class DummyClient:
         grammar_syntax: GrammarSyntax,
         verbosity: VerbosityLevel | None = None,
         reasoning_effort: ReasoningEffort | None = None,
+        instructions: str | None = None,
     ) -> str:  # pragma: no cover - not used here
         """Return canned content for compatibility."""
-        return f"{prompt}:{grammar}:{grammar_syntax}:{verbosity}:{reasoning_effort}"
+        return f"{prompt}:{grammar}:{grammar_syntax}:{verbosity}:{reasoning_effort}:{instructions}"
 
 
 def test_create_llm_client_openai(monkeypatch: pytest.MonkeyPatch) -> None:
@@ -49,3 +60,123 @@ def test_create_llm_client_unsupported_provider(monkeypatch: pytest.MonkeyPatch)
 
     with pytest.raises(ValueError, match="Unsupported LLM provider"):
         create_llm_client(settings)
+
+
+def test_create_async_llm_client_openai(monkeypatch: pytest.MonkeyPatch) -> None:
+    """非同期ファクトリは openai プロバイダで AsyncOpenAIResponsesClient を返す."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    settings = Settings()
+
+    monkeypatch.setattr("gramregex.llm.factory.AsyncOpenAIResponsesClient", DummyClient)
+
+    client = create_async_llm_client(settings)
+
+    assert isinstance(client, DummyClient)
+    assert client.settings is settings
+
+
+def test_create_async_llm_client_unsupported_provider() -> None:
+    """非同期ファクトリも未知のプロバイダでは ValueError を投げる."""
+    settings = Settings(provider="unknown", openai_api_key="dummy", openai_model="model")
+
+    with pytest.raises(ValueError, match="Unsupported LLM provider"):
+        create_async_llm_client(settings)
+
+
+class ClosableClient(DummyClient):
+    """Stub client that records close calls."""
+
+    def __init__(self, settings: Settings) -> None:
+        """Store settings and initialize close flag."""
+        super().__init__(settings)
+        self.closed = False
+
+    def close(self) -> None:
+        """Record that the client was closed."""
+        self.closed = True
+
+    async def aclose(self) -> None:
+        """Record that the client was closed asynchronously."""
+        self.closed = True
+
+
+def test_client_pool_reuses_clients_per_settings_key(monkeypatch: pytest.MonkeyPatch) -> None:
+    """同じ設定ではクライアントを再利用し、モデルが違えば別のクライアントを作る."""
+    settings = Settings(openai_api_key="dummy")
+    monkeypatch.setattr("gramregex.llm.factory.OpenAIResponsesClient", ClosableClient)
+
+    with ClientPool() as pool:
+        first = pool.get(settings)
+        again = pool.get(settings.model_copy())
+        other = pool.get(settings.model_copy(update={"openai_model": "other-model"}))
+
+        assert first is again
+        assert other is not first
+        assert len(pool) == 2
+
+    assert isinstance(first, ClosableClient)
+    assert isinstance(other, ClosableClient)
+    assert first.closed
+    assert other.closed
+    assert len(pool) == 0
+
+
+def test_client_pool_separates_timeout_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    """タイムアウトや接続数の設定が異なれば別のクライアントになる."""
+    settings = Settings(openai_api_key="dummy")
+    monkeypatch.setattr("gramregex.llm.factory.OpenAIResponsesClient", ClosableClient)
+
+    pool = ClientPool()
+
+    assert pool.get(settings) is not pool.get(settings.model_copy(update={"openai_timeout": 5.0}))
+    assert pool.get(settings) is not pool.get(settings.model_copy(update={"openai_max_connections": 10}))
+
+
+def test_get_llm_client_uses_process_wide_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    """get_llm_client はプロセス全体で同じクライアントを返し、close で破棄する."""
+    settings = Settings(openai_api_key="pooled")
+    monkeypatch.setattr("gramregex.llm.factory.OpenAIResponsesClient", ClosableClient)
+
+    client = get_llm_client(settings)
+    try:
+        assert get_llm_client(settings) is client
+    finally:
+        close_llm_clients()
+
+    assert isinstance(client, ClosableClient)
+    assert client.closed
+    assert get_llm_client(settings) is not client
+    close_llm_clients()
+
+
+@pytest.mark.asyncio
+async def test_get_async_llm_client_pools_per_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    """非同期クライアントはイベントループごとにプールされる."""
+    settings = Settings(openai_api_key="dummy")
+    monkeypatch.setattr("gramregex.llm.factory.AsyncOpenAIResponsesClient", ClosableClient)
+
+    client = get_async_llm_client(settings)
+
+    assert get_async_llm_client(settings) is client
+
+    await aclose_llm_clients()
+
+    assert isinstance(client, ClosableClient)
+    assert client.closed
+
+
+def test_async_pool_is_closed_when_its_loop_shuts_down(monkeypatch: pytest.MonkeyPatch) -> None:
+    """asyncio.run のループが終了すると、そのループのプールのクライアントを閉じる."""
+    settings = Settings(openai_api_key="dummy")
+    monkeypatch.setattr("gramregex.llm.factory.AsyncOpenAIResponsesClient", ClosableClient)
+
+    async def use_client() -> object:
+        client = get_async_llm_client(settings)
+        assert isinstance(client, ClosableClient)
+        assert not client.closed
+        return client
+
+    client = asyncio.run(use_client())
+
+    assert isinstance(client, ClosableClient)
+    assert client.closed
@@ -0,0 +1,82 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from gramregex.config import GrammarConfig
+from gramregex.grammar import GrammarRegistry, load_grammar
+
+
+class FakeClock:
+    """Manually advanced clock for revalidation tests."""
+
+    def __init__(self) -> None:
+        """Start at time zero."""
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        """Return the current fake time."""
+        return self.now
+
+
+def _rewrite(path: Path, text: str) -> None:
+    path.write_text(text, encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_registry_skips_filesystem_within_check_interval(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """確認間隔内の再読み込みではファイルシステムに触れない."""
+    clock = FakeClock()
+    registry = GrammarRegistry(check_interval=5, clock=clock)
+    path = tmp_path / "grammar.cfg"
+    path.write_text("root ::= 'a'", encoding="utf-8")
+
+    assert load_grammar(None, path, config_path=None, registry=registry) == "root ::= 'a'"
+
+    def fail(*_: object, **__: object) -> None:
+        pytest.fail("filesystem accessed")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(Path, "stat", fail)
+        patched.setattr(Path, "read_text", fail)
+        assert load_grammar(None, path, config_path=None, registry=registry) == "root ::= 'a'"
+
+
+def test_registry_reloads_changed_file_after_interval(tmp_path: Path) -> None:
+    """確認間隔を過ぎると mtime の変化を検出して再読み込みする."""
+    clock = FakeClock()
+    registry = GrammarRegistry(check_interval=5, clock=clock)
+    path = tmp_path / "grammar.cfg"
+    path.write_text("root ::= 'a'", encoding="utf-8")
+    registry.read_file(path)
+
+    _rewrite(path, "root ::= 'b'")
+    assert registry.read_file(path) == "root ::= 'a'"
+
+    clock.now = 6
+    assert registry.read_file(path) == "root ::= 'b'"
+
+
+def test_registry_caches_parsed_config(tmp_path: Path) -> None:
+    """YAML config は変更されるまで同じオブジェクトを返す."""
+    registry = GrammarRegistry(check_interval=0)
+    path = tmp_path / "grammar.yaml"
+    path.write_text("name: a\ndescription: d\ncontent: first\n", encoding="utf-8")
+
+    first = registry.load_config(path)
+    assert registry.load_config(path) is first
+    assert isinstance(registry.load_config(None), GrammarConfig)
+
+    _rewrite(path, "name: a\ndescription: d\ncontent: second\n")
+    assert registry.load_config(path).content == "second"
+
+
+def test_registry_reuses_compiled_validators() -> None:
+    """同じ内容と syntax の grammar はコンパイル済みの検証器を共有する."""
+    registry = GrammarRegistry(max_validators=1)
+
+    validator = registry.validator("a+", "regex")
+    assert registry.validator("a" + "+", "regex") is validator
+    registry.validator("b+", "regex")
+    assert registry.validator("a+", "regex") is not validator
@@ -0,0 +1,223 @@
+import asyncio
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+
+from gramregex import instrumentation
+from gramregex.instrumentation import CallEvent, InstrumentedLLMClient
+from gramregex.llm.base import AsyncLLMClient, LLMClient
+from gramregex.llm.factory import create_async_llm_client, create_llm_client
+from gramregex.llm.hedging import AsyncHedgedLLMClient, HedgedLLMClient, LatencyTracker
+from gramregex.settings import Settings
+from gramregex.validator import GrammarValidationError, compile_validator
+
+
+class BlockingClient(LLMClient):
+    """Client returning ``output`` once ``release`` is set (immediately when it is None)."""
+
+    def __init__(self, output: str, release: threading.Event | None = None, *, error: Exception | None = None) -> None:
+        """Answer with ``output`` or raise ``error``."""
+        self.output = output
+        self.release = release
+        self.error = error
+        self.calls = 0
+
+    def generate(self, _prompt: str, **_: object) -> str:  # type: ignore[override]
+        """Wait for the release event, then answer."""
+        self.calls += 1
+        if self.release is not None:
+            self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return self.output
+
+    def stream(self, _prompt: str, **_: object) -> Iterator[str]:  # type: ignore[override]
+        """Yield the output."""
+        yield self.output
+
+
+class SleepingClient(AsyncLLMClient):
+    """Async client answering after ``delay`` seconds and recording cancellation."""
+
+    def __init__(self, output: str, delay: float) -> None:
+        """Answer with ``output`` after ``delay``."""
+        self.output = output
+        self.delay = delay
+        self.cancelled = False
+
+    async def generate(self, _prompt: str, **_: object) -> str:  # type: ignore[override]
+        """Sleep, then answer."""
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.output
+
+    async def stream(self, _prompt: str, **_: object) -> AsyncIterator[str]:  # type: ignore[override]
+        """Yield the output."""
+        yield self.output
+
+
+def _tracker(delay: float = 0.01) -> LatencyTracker:
+    return LatencyTracker(95, initial_delay=delay)
+
+
+def test_latency_tracker_percentile_over_window() -> None:
+    """遅延は十分な観測が集まるまで初期値、その後は直近の観測のパーセンタイルになる."""
+    tracker = LatencyTracker(90, initial_delay=5.0, window=10, min_samples=10)
+    for seconds in range(1, 10):
+        tracker.observe(float(seconds))
+    assert tracker.delay() == 5.0
+
+    tracker.observe(10.0)
+    assert tracker.delay() == 10.0
+    for _ in range(9):
+        tracker.observe(0.5)
+    assert tracker.delay() == 10.0
+    tracker.observe(0.5)
+    assert tracker.delay() == 0.5
+    with pytest.raises(ValueError, match="percentile"):
+        LatencyTracker(100, initial_delay=1.0)
+
+
+def test_fast_calls_are_not_hedged() -> None:
+    """遅延内に完了した呼び出しは複製しない."""
+    primary, secondary = BlockingClient("fast"), BlockingClient("hedge")
+    client = HedgedLLMClient(primary, secondary, tracker=_tracker(delay=5.0))
+
+    assert client.generate("p", grammar="g", grammar_syntax="lark") == "fast"
+    assert secondary.calls == 0
+    client.close()
+
+
+def test_slow_call_returns_hedged_result_and_records_it() -> None:
+    """遅い呼び出しは複製リクエストを送り、先に届いた結果を返す."""
+    release = threading.Event()
+    primary, secondary = BlockingClient("slow", release), BlockingClient("hedge")
+    client = HedgedLLMClient(primary, secondary, tracker=_tracker())
+    events: list[CallEvent] = []
+
+    class Collecting:
+        def emit(self, event: CallEvent) -> None:
+            events.append(event)
+
+    sink = Collecting()
+    instrumentation.add_sink(sink)
+    try:
+        result = InstrumentedLLMClient(client, model="m").generate("p", grammar="g", grammar_syntax="lark")
+    finally:
+        instrumentation.remove_sink(sink)
+        release.set()
+        client.close()
+
+    assert result == "hedge"
+    assert events[0].hedges == 1
+
+
+def test_failed_hedge_falls_back_to_primary() -> None:
+    """先に失敗したリクエストは無視し、もう一方の成功を待つ. 両方失敗すれば最初のエラーを送出する."""
+    release = threading.Event()
+    primary = BlockingClient("slow", release)
+    client = HedgedLLMClient(primary, BlockingClient("", error=RuntimeError("hedge")), tracker=_tracker())
+    threading.Timer(0.05, release.set).start()
+
+    assert client.generate("p", grammar="g", grammar_syntax="lark") == "slow"
+
+    failing_release = threading.Event()
+    threading.Timer(0.05, failing_release.set).start()
+    failing = HedgedLLMClient(
+        BlockingClient("", failing_release, error=RuntimeError("primary")),
+        BlockingClient("", error=RuntimeError("hedge")),
+        tracker=_tracker(),
+    )
+    with pytest.raises(RuntimeError, match="hedge"):
+        failing.generate("p", grammar="g", grammar_syntax="lark")
+    client.close()
+    failing.close()
+
+
+class AnsweringAfterClient(BlockingClient):
+    """Client releasing ``unblock`` when called and answering ``delay`` seconds later."""
+
+    def __init__(self, output: str, unblock: threading.Event, delay: float) -> None:
+        """Answer with ``output``."""
+        super().__init__(output)
+        self.unblock = unblock
+        self.delay = delay
+
+    def generate(self, prompt: str, **options: object) -> str:  # type: ignore[override]
+        """Let the blocked client answer first, then answer."""
+        self.unblock.set()
+        time.sleep(self.delay)
+        return super().generate(prompt, **options)
+
+
+def test_invalid_output_loses_the_race() -> None:
+    """検証付きでは文法に合わない出力を負けとして扱い、遅れて届いた正しい出力を返す."""
+    release = threading.Event()
+    client = HedgedLLMClient(
+        BlockingClient("bad", release),
+        AnsweringAfterClient("good", release, 0.05),
+        tracker=_tracker(),
+    )
+    validated = client.validating(compile_validator)
+
+    assert validated.generate("p", grammar="good", grammar_syntax="regex") == "good"
+
+    release.clear()
+    invalid = HedgedLLMClient(
+        BlockingClient("bad", release),
+        AnsweringAfterClient("worse", release, 0.0),
+        tracker=_tracker(),
+    ).validating(compile_validator)
+    with pytest.raises(GrammarValidationError):
+        invalid.generate("p", grammar="good", grammar_syntax="regex")
+    client.close()
+    invalid.close()
+
+
+@pytest.mark.asyncio
+async def test_async_invalid_output_loses_the_race() -> None:
+    """非同期版も文法に合わない出力では勝たない."""
+    client = AsyncHedgedLLMClient(SleepingClient("bad", 0.05), SleepingClient("good", 0.1), tracker=_tracker())
+
+    result = await client.validating(compile_validator).generate_result("p", grammar="good", grammar_syntax="regex")
+
+    assert result.text == "good"
+
+
+@pytest.mark.asyncio
+async def test_async_hedge_cancels_loser() -> None:
+    """非同期版は先に完了した結果を返し、遅いリクエストをキャンセルする."""
+    primary, secondary = SleepingClient("slow", 5.0), SleepingClient("hedge", 0.0)
+    client = AsyncHedgedLLMClient(primary, secondary, tracker=_tracker())
+
+    result = await client.generate_result("p", grammar="g", grammar_syntax="lark")
+    await asyncio.sleep(0)
+
+    assert result.text == "hedge"
+    assert primary.cancelled
+
+
+def test_factory_wraps_clients_when_hedging_is_enabled() -> None:
+    """hedge_percentile を設定するとファクトリが複製リクエスト用のクライアントを返す."""
+    settings = Settings(openai_api_key="dummy", hedge_percentile=99, hedge_model="other")
+
+    client = create_llm_client(settings)
+
+    assert isinstance(client, HedgedLLMClient)
+    assert client._executor._max_workers == settings.hedge_max_workers  # noqa: SLF001
+    assert not isinstance(create_llm_client(Settings(openai_api_key="dummy")), HedgedLLMClient)
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_factory_wraps_async_clients_when_hedging_is_enabled() -> None:
+    """非同期クライアントも同様に複製リクエスト用のクライアントになる."""
+    client = create_async_llm_client(Settings(openai_api_key="dummy", hedge_percentile=99))
+
+    assert isinstance(client, AsyncHedgedLLMClient)
+    await client.aclose()
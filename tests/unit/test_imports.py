@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import gramregex
+
+SRC = Path(__file__).resolve().parents[2] / "src"
+
+
+@pytest.mark.parametrize("module", ["gramregex", "gramregex.api", "gramregex.cli", "gramregex.grammar"])
+def test_light_entry_points_do_not_import_heavy_dependencies(module: str) -> None:
+    """パッケージ・API・CLI・grammar の import では OpenAI SDK や YAML を読み込まない."""
+    code = (
+        f"import sys, {module}; print(','.join(m for m in ('openai', 'pydantic_settings', 'yaml') if m in sys.modules))"
+    )
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": str(SRC)},
+    )
+
+    assert result.stdout.strip() == ""
+
+
+def test_lazy_attributes_resolve_on_access() -> None:
+    """遅延属性はアクセス時に実体へ解決される."""
+    from gramregex import api
+    from gramregex import settings as settings_module
+
+    assert gramregex.generate is api.generate
+    assert "generate_many" in dir(gramregex)
+    with pytest.raises(AttributeError):
+        _ = gramregex.missing  # type: ignore[attr-defined]
+    assert api.Settings is settings_module.Settings
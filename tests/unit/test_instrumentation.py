@@ -0,0 +1,289 @@
+import logging
+from collections.abc import AsyncIterator, Iterator
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from gramregex import api, instrumentation
+from gramregex import settings as settings_module
+from gramregex.cache import ResponseCache
+from gramregex.instrumentation import (
+    STAGE_BACKOFF,
+    STAGE_CLIENT_ACQUIRE,
+    STAGE_FIRST_TOKEN,
+    STAGE_GRAMMAR_LOAD,
+    STAGE_REQUEST,
+    STAGE_TOTAL,
+    AsyncInstrumentedLLMClient,
+    CallEvent,
+    InstrumentedLLMClient,
+    LoggingSink,
+    OpenTelemetrySink,
+    PrometheusSink,
+)
+from gramregex.settings import Settings
+
+
+class CollectingSink:
+    """Sink keeping every emitted event."""
+
+    def __init__(self) -> None:
+        """Start with no events."""
+        self.events: list[CallEvent] = []
+
+    def emit(self, event: CallEvent) -> None:
+        """Store the event."""
+        self.events.append(event)
+
+
+class StubClient:
+    """Client returning canned output and streaming it in two deltas."""
+
+    def generate(self, prompt: str, **_: object) -> str:
+        """Return the prompt reversed."""
+        return prompt[::-1]
+
+    def stream(self, prompt: str, **_: object) -> Iterator[str]:
+        """Yield the reversed prompt in two halves."""
+        output = prompt[::-1]
+        yield output[:1]
+        yield output[1:]
+
+
+@pytest.fixture
+def sink() -> Iterator[CollectingSink]:
+    """Register a collecting sink for the duration of a test."""
+    collecting = CollectingSink()
+    instrumentation.add_sink(collecting)
+    yield collecting
+    instrumentation.remove_sink(collecting)
+
+
+@pytest.fixture(autouse=True)
+def clear_settings_cache() -> Iterator[None]:
+    """Ensure settings cache does not leak between tests."""
+    settings_module.get_settings.cache_clear()
+    yield
+    settings_module.get_settings.cache_clear()
+
+
+def _status_error(status: int) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://example.invalid/v1/responses")
+    response = httpx.Response(status, headers={"retry-after-ms": "0"}, request=request)
+    return openai.APIStatusError("error", response=response, body=None)
+
+
+def _response(text: str) -> SimpleNamespace:
+    usage = SimpleNamespace(
+        input_tokens=10,
+        output_tokens=5,
+        total_tokens=15,
+        input_tokens_details=SimpleNamespace(cached_tokens=4),
+    )
+    return SimpleNamespace(output_text=text, usage=usage)
+
+
+def test_sinks_registered_after_wrapping_receive_calls() -> None:
+    """シンク未登録の間は記録せず、クライアント作成後に登録したシンクにも以降の呼び出しを送る."""
+    client = instrumentation.instrumented_client(StubClient(), model="m")  # type: ignore[arg-type]
+    assert not instrumentation.enabled()
+    assert client.generate("ab", grammar="g", grammar_syntax="lark") == "ba"
+    assert list(client.stream("ab", grammar="g", grammar_syntax="lark")) == ["b", "a"]
+
+    collecting = CollectingSink()
+    instrumentation.add_sink(collecting)
+    try:
+        assert client.generate("ab", grammar="g", grammar_syntax="lark") == "ba"
+        assert list(client.stream("ab", grammar="g", grammar_syntax="lark")) == ["b", "a"]
+    finally:
+        instrumentation.remove_sink(collecting)
+
+    assert [event.stream for event in collecting.events] == [False, True]
+
+
+def test_api_generate_reports_stages_and_cache_hits(
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    sink: CollectingSink,
+) -> None:
+    """API 呼び出しで各段階の所要時間とキャッシュヒットを記録する."""
+    monkeypatch.setattr(api, "get_llm_client", lambda _: StubClient())
+    settings = Settings(openai_api_key="dummy", openai_model="m")
+
+    with ResponseCache(directory=tmp_path) as cache:
+        assert api.generate("ab", grammar="start: /.+/", settings=settings, cache=cache) == "ba"
+        assert api.generate("ab", grammar="start: /.+/", settings=settings, cache=cache) == "ba"
+
+    miss, hit = sink.events
+    assert (miss.cache_hit, hit.cache_hit) == (False, True)
+    assert miss.model == "m"
+    assert miss.error is None
+    assert {STAGE_GRAMMAR_LOAD, STAGE_CLIENT_ACQUIRE, STAGE_TOTAL} <= miss.stages.keys()
+
+
+def test_openai_client_reports_usage_retries_and_request_time(
+    monkeypatch: pytest.MonkeyPatch,
+    sink: CollectingSink,
+) -> None:
+    """プロバイダのトークン使用量・再試行回数・リクエスト時間を記録する."""
+    from gramregex.llm.openai_client import OpenAIResponsesClient
+
+    outcomes: list[object] = [_status_error(429), _response("ok")]
+
+    def create(**_: object) -> object:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(
+        "gramregex.llm.openai_client.OpenAI",
+        lambda **_: SimpleNamespace(responses=SimpleNamespace(create=create)),
+    )
+    client = InstrumentedLLMClient(OpenAIResponsesClient(Settings(openai_api_key="dummy")), model="m")
+
+    assert client.generate("p", grammar="g", grammar_syntax="lark") == "ok"
+
+    (event,) = sink.events
+    assert event.retries == 1
+    assert (event.input_tokens, event.output_tokens, event.cached_tokens, event.total_tokens) == (10, 5, 4, 15)
+    assert {STAGE_REQUEST, STAGE_BACKOFF, STAGE_TOTAL} <= event.stages.keys()
+    assert event.stages[STAGE_REQUEST] <= event.stages[STAGE_TOTAL]
+
+
+def test_stream_reports_first_token_and_errors(sink: CollectingSink) -> None:
+    """ストリームは最初のデルタまでの時間と失敗を記録する."""
+
+    class FailingClient(StubClient):
+        def stream(self, prompt: str, **_: object) -> Iterator[str]:
+            yield prompt
+            msg = "boom"
+            raise ValueError(msg)
+
+    completed_stream = InstrumentedLLMClient(StubClient(), model="m").stream("ab", grammar="g", grammar_syntax="lark")
+    assert "".join(completed_stream) == "ba"
+    with pytest.raises(ValueError, match="boom"):
+        list(InstrumentedLLMClient(FailingClient(), model="m").stream("ab", grammar="g", grammar_syntax="lark"))
+
+    completed, failed = sink.events
+    assert completed.stream
+    assert completed.stages[STAGE_FIRST_TOKEN] <= completed.stages[STAGE_TOTAL]
+    assert failed.error == "ValueError"
+
+
+def test_stream_event_is_not_current_between_deltas(sink: CollectingSink) -> None:
+    """呼び出し側のコードはストリームの計測対象に含めない."""
+    stream = InstrumentedLLMClient(StubClient(), model="m").stream("ab", grammar="g", grammar_syntax="lark")
+
+    for _ in stream:
+        assert instrumentation.current_event() is None
+    assert len(sink.events) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_reports_events(sink: CollectingSink) -> None:
+    """非同期クライアントでも生成とストリームを記録する."""
+
+    class AsyncStub:
+        async def generate(self, prompt: str, **_: object) -> str:
+            instrumentation.record_cache(hit=False)
+            return prompt
+
+        async def stream(self, prompt: str, **_: object) -> AsyncIterator[str]:
+            yield prompt
+
+    client = AsyncInstrumentedLLMClient(AsyncStub(), model="m", stages={STAGE_GRAMMAR_LOAD: 0.5})  # type: ignore[arg-type]
+
+    assert await client.generate("p", grammar="g", grammar_syntax="lark") == "p"
+    assert [delta async for delta in client.stream("q", grammar="g", grammar_syntax="lark")] == ["q"]
+
+    generated, streamed = sink.events
+    assert generated.cache_hit is False
+    assert generated.stages[STAGE_GRAMMAR_LOAD] == 0.5
+    assert STAGE_FIRST_TOKEN in streamed.stages
+
+
+def test_failing_sink_does_not_break_generation(caplog: pytest.LogCaptureFixture, sink: CollectingSink) -> None:
+    """シンクの例外は記録のみで生成結果に影響しない."""
+
+    class BrokenSink:
+        def emit(self, event: CallEvent) -> None:
+            raise RuntimeError(event.model)
+
+    broken = BrokenSink()
+    client = InstrumentedLLMClient(StubClient(), model="m")
+    instrumentation.add_sink(broken)
+    try:
+        with caplog.at_level(logging.ERROR, logger="gramregex.instrumentation"):
+            assert client.generate("ab", grammar="g", grammar_syntax="lark") == "ba"
+    finally:
+        instrumentation.remove_sink(broken)
+
+    assert len(sink.events) == 1
+    assert "sink" in caplog.text
+
+
+def test_logging_sink_writes_json(caplog: pytest.LogCaptureFixture) -> None:
+    """LoggingSink はイベントを JSON で出力する."""
+    event = CallEvent(model="m", grammar_syntax="lark", stages={STAGE_TOTAL: 0.25}, retries=2)
+
+    with caplog.at_level(logging.INFO, logger="gramregex.instrumentation"):
+        LoggingSink().emit(event)
+
+    assert '"retries": 2' in caplog.text
+    assert '"total": 0.25' in caplog.text
+
+
+def test_prometheus_sink_renders_text_exposition() -> None:
+    """PrometheusSink は呼び出し数・トークン・段階別ヒストグラムを出力する."""
+    metrics = PrometheusSink(buckets=(0.1, 1.0))
+    metrics.emit(CallEvent(model="m", grammar_syntax="lark", stages={STAGE_TOTAL: 0.5}, input_tokens=3, cache_hit=True))
+    metrics.emit(CallEvent(model="m", grammar_syntax="lark", stages={STAGE_TOTAL: 2.0}, retries=1, error="ValueError"))
+
+    text = metrics.render()
+
+    assert 'gramregex_calls_total{model="m",status="ok"} 1' in text
+    assert 'gramregex_calls_total{model="m",status="error"} 1' in text
+    assert 'gramregex_retries_total{model="m"} 1' in text
+    assert 'gramregex_cache_requests_total{model="m",result="hit"} 1' in text
+    assert 'gramregex_tokens_total{model="m",kind="input"} 3' in text
+    assert 'gramregex_stage_seconds_bucket{model="m",stage="total",le="0.1"} 0' in text
+    assert 'gramregex_stage_seconds_bucket{model="m",stage="total",le="1.0"} 1' in text
+    assert 'gramregex_stage_seconds_bucket{model="m",stage="total",le="+Inf"} 2' in text
+    assert 'gramregex_stage_seconds_sum{model="m",stage="total"} 2.5' in text
+    assert "# TYPE gramregex_stage_seconds histogram" in text
+
+
+def test_opentelemetry_sink_records_span() -> None:
+    """OpenTelemetrySink は呼び出しを属性付きの span として出力する."""
+    spans: list[dict[str, object]] = []
+
+    class FakeSpan:
+        def __init__(self, attributes: dict[str, object]) -> None:
+            self.record: dict[str, object] = {"attributes": attributes}
+            spans.append(self.record)
+
+        def end(self, end_time: int) -> None:
+            self.record["end_time"] = end_time
+
+    class FakeTracer:
+        def start_span(self, name: str, *, start_time: int, attributes: dict[str, object]) -> FakeSpan:
+            span = FakeSpan(attributes)
+            span.record.update(name=name, start_time=start_time)
+            return span
+
+    OpenTelemetrySink(FakeTracer()).emit(
+        CallEvent(model="m", grammar_syntax="lark", stages={STAGE_TOTAL: 1.0}, output_tokens=7),
+    )
+
+    (span,) = spans
+    attributes = span["attributes"]
+    assert isinstance(attributes, dict)
+    assert span["name"] == "gramregex.generate"
+    assert attributes["gen_ai.request.model"] == "m"
+    assert attributes["gen_ai.usage.output_tokens"] == 7
+    assert attributes["gramregex.stage.total_ms"] == 1000.0
+    assert span["end_time"] - span["start_time"] == 1_000_000_000  # type: ignore[operator]
@@ -0,0 +1,68 @@
+import os
+from itertools import accumulate
+from pathlib import Path
+
+import pytest
+
+from gramregex import line_index
+from gramregex.line_index import LineIndex
+
+
+def test_index_skips_blank_lines_and_reads_any_line(tmp_path: Path) -> None:
+    """空行を除いた N 行目を直接読み出せ、最終行に改行がなくてもよい."""
+    path = tmp_path / "prompts.jsonl"
+    path.write_bytes('"a"\r\n\n  \n{"prompt": "ä"}\n"last"'.encode())
+
+    with LineIndex(path) as index:
+        assert len(index) == 3
+        assert index.line(1) == '{"prompt": "ä"}\n'
+        assert index.offset(2) == path.read_bytes().index(b'"last"')
+        assert list(index.lines(1)) == ['{"prompt": "ä"}\n', '"last"']
+        assert list(index.lines(0, 1)) == ['"a"\r\n']
+
+
+def test_index_is_persisted_and_rebuilt_when_file_changes(tmp_path: Path) -> None:
+    """インデックスはファイルの隣に保存して再利用し、ファイルが変わると作り直す."""
+    path = tmp_path / "prompts.txt"
+    path.write_text("a\nb\n", encoding="utf-8")
+    with LineIndex(path):
+        pass
+    index_path = tmp_path / "prompts.txt.idx"
+    built = index_path.stat().st_mtime_ns
+
+    with LineIndex(path) as index:
+        assert len(index) == 2
+    assert index_path.stat().st_mtime_ns == built
+
+    path.write_text("a\nb\nc\n", encoding="utf-8")
+    os.utime(path, ns=(built + 10**9, built + 10**9))
+    with LineIndex(path) as index:
+        assert list(index.lines(2)) == ["c\n"]
+
+
+def test_index_builds_across_chunks(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """チャンクの境界をまたぐ行も正しく索引付けし、チャンクごとに書き出したインデックスを再利用できる."""
+    monkeypatch.setattr(line_index, "_CHUNK_SIZE", 4)
+    lines = [f"line {number}\n" for number in range(20)]
+    path = tmp_path / "prompts.txt"
+    path.write_text("".join(lines), encoding="utf-8")
+
+    with LineIndex(path, persist=False) as index:
+        assert list(index.lines()) == lines
+    assert not (tmp_path / "prompts.txt.idx").exists()
+    with LineIndex(path) as index:
+        assert list(index.lines()) == lines
+    offsets = list(accumulate(map(len, lines[:-1]), initial=0))
+    with LineIndex(path) as index:
+        assert [index.offset(number) for number in range(len(lines))] == offsets
+
+
+def test_index_of_empty_file(tmp_path: Path) -> None:
+    """空のファイルは 0 件として扱う."""
+    path = tmp_path / "empty.jsonl"
+    path.touch()
+
+    for _ in range(2):
+        with LineIndex(path) as index:
+            assert len(index) == 0
+            assert list(index.lines()) == []
@@ -0,0 +1,235 @@
+import json
+from collections.abc import Iterator
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from typer.testing import CliRunner
+
+from gramregex import cli
+from gramregex import settings as settings_module
+from gramregex.llm import openai_batch
+from gramregex.llm.openai_batch import (
+    BATCH_ENDPOINT,
+    BatchJobError,
+    OpenAIBatchRunner,
+    batch_request_line,
+    parse_result_line,
+    response_output_text,
+)
+from gramregex.llm.openai_client import _build_response_kwargs
+from gramregex.settings import Settings
+
+
+def _body(text: str) -> dict[str, object]:
+    content = [{"type": "output_text", "text": text, "annotations": []}]
+    return {"status": "completed", "output": [{"type": "message", "role": "assistant", "content": content}]}
+
+
+class FakeBatchClient:
+    """In-memory files/batches API answering each request with the upper-cased prompt.
+
+    Jobs stay ``in_progress`` for ``polls`` retrievals. Prompts equal to
+    ``bad`` get an HTTP 400 in the error file; results are written in reverse
+    order to check re-ordering.
+    """
+
+    def __init__(self, *, polls: int = 1, final_status: str = "completed") -> None:
+        """Start with no files or jobs."""
+        self.files = SimpleNamespace(create=self._create_file, content=self._content)
+        self.batches = SimpleNamespace(create=self._create_batch, retrieve=self._retrieve)
+        self.uploads: list[bytes] = []
+        self.batch_requests: list[dict[str, object]] = []
+        self.closed = False
+        self._files: dict[str, bytes] = {}
+        self._jobs: dict[str, dict[str, object]] = {}
+        self._polls = polls
+        self._final_status = final_status
+
+    def _create_file(self, *, file: tuple[str, bytes, str], purpose: str) -> SimpleNamespace:
+        assert purpose == "batch"
+        file_id = f"file-{len(self._files)}"
+        self._files[file_id] = file[1]
+        self.uploads.append(file[1])
+        return SimpleNamespace(id=file_id)
+
+    def _content(self, file_id: str) -> SimpleNamespace:
+        return SimpleNamespace(content=self._files[file_id])
+
+    def _create_batch(self, **kwargs: object) -> SimpleNamespace:
+        self.batch_requests.append(kwargs)
+        batch_id = f"batch-{len(self._jobs)}"
+        self._jobs[batch_id] = {"input": kwargs["input_file_id"], "polls": 0}
+        return SimpleNamespace(id=batch_id, status="validating")
+
+    def _finish(self, input_file_id: str) -> tuple[str, str]:
+        outputs: list[str] = []
+        errors: list[str] = []
+        for line in reversed(self._files[input_file_id].splitlines()):
+            request = json.loads(line)
+            prompt = request["body"]["input"]
+            if prompt == "bad":
+                response = {"status_code": 400, "body": {"error": {"message": "invalid grammar"}}}
+                errors.append(json.dumps({"custom_id": request["custom_id"], "response": response, "error": None}))
+            else:
+                response = {"status_code": 200, "body": _body(prompt.upper())}
+                outputs.append(json.dumps({"custom_id": request["custom_id"], "response": response, "error": None}))
+        output_id, error_id = f"file-{len(self._files)}", f"file-{len(self._files) + 1}"
+        self._files[output_id] = "\n".join(outputs).encode()
+        self._files[error_id] = "\n".join(errors).encode()
+        return output_id, error_id
+
+    def _retrieve(self, batch_id: str) -> SimpleNamespace:
+        job = self._jobs[batch_id]
+        job["polls"] = int(str(job["polls"])) + 1
+        if int(str(job["polls"])) <= self._polls:
+            return SimpleNamespace(id=batch_id, status="in_progress", request_counts=None)
+        if self._final_status != "completed":
+            return SimpleNamespace(id=batch_id, status=self._final_status, output_file_id=None, error_file_id=None)
+        output_id, error_id = self._finish(str(job["input"]))
+        counts = SimpleNamespace(completed=1, total=1)
+        return SimpleNamespace(
+            id=batch_id,
+            status="completed",
+            request_counts=counts,
+            output_file_id=output_id,
+            error_file_id=error_id,
+        )
+
+    def close(self) -> None:
+        """Record that the client was closed."""
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def clear_settings_cache() -> Iterator[None]:
+    """Ensure settings cache does not leak between tests."""
+    settings_module.get_settings.cache_clear()
+    yield
+    settings_module.get_settings.cache_clear()
+
+
+def test_request_line_matches_online_request() -> None:
+    """バッチ入力の各行はオンライン呼び出しと同じリクエスト本文を持つ."""
+    line = json.loads(batch_request_line(7, "p", model="m", grammar="start: /x/", grammar_syntax="lark"))
+
+    assert line == {
+        "custom_id": "gramregex-7",
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": _build_response_kwargs(
+            "m",
+            "p",
+            grammar="start: /x/",
+            grammar_syntax="lark",
+            verbosity=None,
+            reasoning_effort=None,
+        ),
+    }
+
+
+def test_response_output_text_reads_messages_and_tool_calls() -> None:
+    """出力テキストはメッセージ、なければ grammar ツール呼び出しの入力から取り出す."""
+    assert response_output_text(_body("hello")) == "hello"
+    assert response_output_text({"output": [{"type": "custom_tool_call", "input": "tool"}]}) == "tool"
+    with pytest.raises(ValueError, match="did not contain text output"):
+        response_output_text({"output": []})
+
+
+def test_parse_result_line_maps_errors() -> None:
+    """失敗した行はエラーとして対応付け、無関係な行は無視する."""
+    failed = parse_result_line(json.dumps({"custom_id": "gramregex-3", "error": {"code": "c", "message": "m"}}))
+
+    assert failed is not None
+    assert failed[0] == 3
+    assert isinstance(failed[1], BatchJobError)
+    assert parse_result_line(json.dumps({"custom_id": "other", "response": {}})) is None
+
+
+def test_runner_splits_jobs_and_restores_input_order() -> None:
+    """大きな入力は複数ジョブに分割し、結果を入力順に戻す."""
+    client = FakeBatchClient(polls=2)
+    sleeps: list[float] = []
+    messages: list[str] = []
+    runner = OpenAIBatchRunner(
+        Settings(openai_api_key="dummy", openai_model="m"),
+        client=client,
+        poll_interval=5,
+        max_requests_per_batch=2,
+        sleep=sleeps.append,
+        on_status=messages.append,
+    )
+
+    with runner:
+        items = list(runner.run(["a", "bad", "c"], grammar="start: /.+/", grammar_syntax="lark"))
+
+    outputs = [(item.index, item.prompt, item.output) for item in items]
+    assert outputs == [(0, "a", "A"), (1, "bad", None), (2, "c", "C")]
+    assert isinstance(items[1].error, BatchJobError)
+    assert "invalid grammar" in str(items[1].error)
+    assert [len(upload.splitlines()) for upload in client.uploads[:2]] == [2, 1]
+    assert all(request["endpoint"] == BATCH_ENDPOINT for request in client.batch_requests)
+    assert sleeps == [5, 5, 5, 5]
+    assert "batch batch-0: submitted 2 request(s)" in messages
+    assert client.closed
+
+
+def test_runner_reports_missing_results_of_expired_jobs() -> None:
+    """期限切れなどで結果のない入力はエラーになる."""
+    runner = OpenAIBatchRunner(
+        Settings(openai_api_key="dummy"),
+        client=FakeBatchClient(polls=0, final_status="expired"),
+        sleep=lambda _: None,
+    )
+
+    (item,) = runner.run(["a"], grammar="start: /.+/", grammar_syntax="lark")
+
+    assert isinstance(item.error, BatchJobError)
+    assert "expired" in str(item.error)
+
+
+def test_runner_reattaches_to_recorded_jobs(tmp_path: Path) -> None:
+    """ジョブファイルに記録したジョブには再実行時に再接続し、入力を再投入しない."""
+    client = FakeBatchClient()
+    job_file = tmp_path / "jobs.json"
+    settings = Settings(openai_api_key="dummy", openai_model="m")
+    runner = partial(OpenAIBatchRunner, settings, client=client, max_requests_per_batch=2, sleep=lambda _: None)
+
+    interrupted = runner(job_file=job_file).run(["a", "b", "c"], grammar="start: /.+/", grammar_syntax="lark")
+    assert next(interrupted).output == "A"
+    interrupted.close()
+    assert len(client.uploads) == 2
+    assert job_file.exists()
+
+    with pytest.raises(ValueError, match="different model"):
+        next(runner(job_file=job_file).run(["a", "b", "c"], grammar="start: /x/", grammar_syntax="lark"))
+
+    messages: list[str] = []
+    resumed = runner(job_file=job_file, on_status=messages.append)
+    items = list(resumed.run(["a", "b", "c"], grammar="start: /.+/", grammar_syntax="lark"))
+
+    assert [(item.index, item.output) for item in items] == [(0, "A"), (1, "B"), (2, "C")]
+    assert len(client.uploads) == 2
+    assert "batch batch-1: reattached to 1 request(s)" in messages
+    assert not job_file.exists()
+
+
+def test_cli_batch_async_job(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Batch --async-job は Batch API のジョブ経由で入力順に JSONL を出力する."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    client = FakeBatchClient()
+    runner = partial(OpenAIBatchRunner, client=client, sleep=lambda _: None)
+    monkeypatch.setattr(openai_batch, "OpenAIBatchRunner", runner)
+
+    input_path = tmp_path / "prompts.jsonl"
+    input_path.write_text('{"id": "row-1", "prompt": "first"}\n"bad"\n', encoding="utf-8")
+
+    result = CliRunner().invoke(cli.app, ["batch", str(input_path), "--grammar", "start: /.+/", "--async-job"])
+
+    assert result.exit_code == 1
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.startswith("{")]
+    assert lines[0] == {"index": 0, "id": "row-1", "output": "FIRST"}
+    assert lines[1]["index"] == 1
+    assert "invalid grammar" in lines[1]["error"]
+    assert len(client.uploads) == 1
@@ -1,9 +1,21 @@
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
 from types import SimpleNamespace
+from typing import Any
 
 
 import pytest
 
-from gramregex.llm.openai_client import OpenAIResponsesClient
+from gramregex.llm import openai_client
+from gramregex.llm.openai_client import (
+    AsyncOpenAIResponsesClient,
+    OpenAIResponsesClient,
+    _build_response_kwargs,
+    prepare_template,
+    prompt_cache_key,
+    request_template,
+    using_template,
+)
+from gramregex.llm.scheduler import estimate_tokens
 from gramregex.settings import Settings
 
 
@@ -60,10 +72,71 @@ def test_openai_client_calls_responses(monkeypatch: pytest.MonkeyPatch) -> None:
             },
         ],
         "parallel_tool_calls": False,
+        "prompt_cache_key": prompt_cache_key("root ::= 'hello'", "lark"),
         "reasoning": {"effort": "minimal"},
     }
 
 
+def test_openai_client_keeps_instructions_out_of_input(monkeypatch: pytest.MonkeyPatch) -> None:
+    """共通の指示は input と分けて送り、同じ指示と grammar には同じキャッシュキーを使う."""
+    dummy_responses = DummyResponses()
+    monkeypatch.setattr("gramregex.llm.openai_client.OpenAI", lambda **_: SimpleNamespace(responses=dummy_responses))
+    client = OpenAIResponsesClient(Settings(openai_api_key="dummy"))
+
+    requests: list[dict[str, object]] = []
+    for prompt, instructions in (("first", "Label rows."), ("second", "Label rows."), ("third", "Other.")):
+        client.generate(prompt, grammar="g", grammar_syntax="lark", instructions=instructions)
+        assert dummy_responses.create_called_with is not None
+        requests.append(dummy_responses.create_called_with)
+
+    first, second, other = requests
+    assert first["input"] == "first"
+    assert first["instructions"] == "Label rows."
+    assert first["prompt_cache_key"] == second["prompt_cache_key"] != other["prompt_cache_key"]
+    assert {key: value for key, value in first.items() if key != "input"} == {
+        key: value for key, value in second.items() if key != "input"
+    }
+
+
+def test_request_template_is_built_once_per_option_set() -> None:
+    """プロンプト以外のリクエスト内容はオプションごとに一度だけ組み立て、変更できない."""
+    options: dict[str, Any] = {"model": "m", "grammar": "g", "grammar_syntax": "lark", "verbosity": None}
+    first = request_template(**options, reasoning_effort="minimal", instructions="Label rows.")
+    second = request_template(**options, reasoning_effort="minimal", instructions="Label rows.")
+
+    assert first is second
+    assert request_template(**options, reasoning_effort="high", instructions="Label rows.") is not first
+    assert "input" not in first
+    with pytest.raises(TypeError):
+        first["model"] = "other"  # type: ignore[index]
+
+
+def test_openai_client_generate_result_reports_usage(monkeypatch: pytest.MonkeyPatch) -> None:
+    """generate_result はレスポンス ID・モデル・トークン使用量を返す."""
+    usage = SimpleNamespace(
+        input_tokens=120,
+        output_tokens=30,
+        total_tokens=150,
+        input_tokens_details=SimpleNamespace(cached_tokens=100),
+        output_tokens_details=SimpleNamespace(reasoning_tokens=20),
+    )
+    response = SimpleNamespace(output_text="ok", id="resp_123", model="gpt-5-2025-08-07", usage=usage)
+    responses = SimpleNamespace(create=lambda **_: response)
+    monkeypatch.setattr("gramregex.llm.openai_client.OpenAI", lambda **_: SimpleNamespace(responses=responses))
+
+    result = OpenAIResponsesClient(Settings(openai_api_key="dummy")).generate_result(
+        "p",
+        grammar="g",
+        grammar_syntax="lark",
+    )
+
+    assert (result.text, result.model, result.response_id) == ("ok", "gpt-5-2025-08-07", "resp_123")
+    assert (result.input_tokens, result.cached_tokens) == (120, 100)
+    assert (result.output_tokens, result.reasoning_tokens, result.total_tokens) == (30, 20, 150)
+    assert result.latency >= 0
+    assert not result.from_cache
+
+
 def test_openai_client_extracts_from_output_list(monkeypatch: pytest.MonkeyPatch) -> None:
     """Output 配列からテキストを取り出せる."""
     monkeypatch.setenv("OPENAI_API_KEY", "dummy")
@@ -96,3 +169,251 @@ def test_openai_client_extracts_from_output_list(monkeypatch: pytest.MonkeyPatch
     output = client.generate("hello", grammar="grammar", grammar_syntax="lark")
 
     assert output == "list text"
+
+
+class DummyAsyncResponses:
+    """Stub async responses client for assertions."""
+
+    def __init__(self) -> None:
+        """Initialize captured call store."""
+        self.create_called_with: dict[str, object] | None = None
+
+    async def create(self, **kwargs: object) -> object:
+        """Capture arguments and return canned response."""
+        self.create_called_with = kwargs
+        return SimpleNamespace(output_text="async text")
+
+
+@pytest.mark.asyncio
+async def test_async_openai_client_calls_responses(monkeypatch: pytest.MonkeyPatch) -> None:
+    """AsyncOpenAIResponsesClient が非同期に responses.create を呼ぶ."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    settings = Settings()
+
+    dummy_responses = DummyAsyncResponses()
+    dummy_client = SimpleNamespace(responses=dummy_responses)
+
+    def fake_async_openai_client(**_: object) -> SimpleNamespace:
+        return dummy_client
+
+    monkeypatch.setattr("gramregex.llm.openai_client.AsyncOpenAI", fake_async_openai_client)
+
+    client = AsyncOpenAIResponsesClient(settings)
+    output = await client.generate(
+        "hello",
+        grammar="root ::= 'hello'",
+        grammar_syntax="regex",
+        reasoning_effort="high",
+    )
+
+    assert output == "async text"
+    assert dummy_responses.create_called_with is not None
+    assert dummy_responses.create_called_with["input"] == "hello"
+    assert dummy_responses.create_called_with["text"] == {"format": {"type": "text"}}
+    assert dummy_responses.create_called_with["reasoning"] == {"effort": "high"}
+    tools = dummy_responses.create_called_with["tools"]
+    assert isinstance(tools, list)
+    assert tools[0]["format"]["syntax"] == "regex"  # type: ignore[index]
+
+
+def test_openai_client_configures_connection_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    """接続プールの上限とタイムアウトが SDK クライアントへ渡され、close で解放される."""
+    settings = Settings(
+        openai_api_key="dummy",
+        openai_timeout=12.5,
+        openai_max_connections=10,
+        openai_max_keepalive_connections=4,
+        openai_keepalive_expiry=30.0,
+    )
+
+    captured: dict[str, object] = {}
+    closed: list[bool] = []
+
+    def fake_http_client(**kwargs: object) -> object:
+        captured["http_client_kwargs"] = kwargs
+        return "http-client"
+
+    def fake_openai_client(**kwargs: object) -> SimpleNamespace:
+        captured.update(kwargs)
+        return SimpleNamespace(responses=DummyResponses(), close=lambda: closed.append(True))
+
+    monkeypatch.setattr("gramregex.llm.openai_client.DefaultHttpxClient", fake_http_client)
+    monkeypatch.setattr("gramregex.llm.openai_client.OpenAI", fake_openai_client)
+
+    with OpenAIResponsesClient(settings):
+        pass
+
+    assert captured["timeout"] == 12.5
+    assert captured["http_client"] == "http-client"
+    http_kwargs = captured["http_client_kwargs"]
+    assert isinstance(http_kwargs, dict)
+    limits = http_kwargs["limits"]  # type: ignore[index]
+    assert limits.max_connections == 10
+    assert limits.max_keepalive_connections == 4
+    assert limits.keepalive_expiry == 30.0
+    assert closed == [True]
+
+
+class DummyStream:
+    """Stub SSE stream yielding canned events."""
+
+    def __init__(self, events: list[object]) -> None:
+        """Store events and initialize the close flag."""
+        self._events = events
+        self.closed = False
+
+    def __iter__(self) -> Iterator[object]:
+        """Yield the canned events."""
+        return iter(self._events)
+
+    async def _aiter(self) -> AsyncIterator[object]:
+        for event in self._events:
+            yield event
+
+    def __aiter__(self) -> AsyncIterator[object]:
+        """Yield the canned events asynchronously."""
+        return self._aiter()
+
+    def close(self) -> None:
+        """Record that the stream was closed."""
+        self.closed = True
+
+
+class DummyStreamingResponses(DummyResponses):
+    """Responses mock returning an event stream when stream=True."""
+
+    def __init__(self, events: list[object]) -> None:
+        """Prepare the stream returned by create."""
+        super().__init__()
+        self.stream = DummyStream(events)
+
+    def create(self, **kwargs: object) -> object:
+        """Capture arguments and return the stream."""
+        super().create(**kwargs)
+        return self.stream
+
+
+STREAM_EVENTS: list[object] = [
+    SimpleNamespace(type="response.created"),
+    SimpleNamespace(type="response.output_text.delta", delta="he"),
+    SimpleNamespace(type="response.custom_tool_call_input.delta", delta="llo"),
+    SimpleNamespace(type="response.completed"),
+]
+
+
+def test_openai_client_streams_text_deltas(monkeypatch: pytest.MonkeyPatch) -> None:
+    """stream=True で受け取ったイベントからテキスト差分を逐次返す."""
+    settings = Settings(openai_api_key="dummy")
+    dummy_responses = DummyStreamingResponses(STREAM_EVENTS)
+
+    monkeypatch.setattr(
+        "gramregex.llm.openai_client.OpenAI",
+        lambda **_: SimpleNamespace(responses=dummy_responses),
+    )
+
+    client = OpenAIResponsesClient(settings)
+    chunks = list(client.stream("hello", grammar="root ::= 'hello'", grammar_syntax="lark"))
+
+    assert chunks == ["he", "llo"]
+    assert dummy_responses.create_called_with is not None
+    assert dummy_responses.create_called_with["stream"] is True
+    assert dummy_responses.stream.closed
+
+
+def test_openai_client_stream_records_usage(monkeypatch: pytest.MonkeyPatch) -> None:
+    """ストリームでも完了イベントの使用量でトークン予算を補正する."""
+    settings = Settings(openai_api_key="dummy")
+    response = SimpleNamespace(usage=SimpleNamespace(total_tokens=500))
+    completed = SimpleNamespace(type="response.completed", response=response)
+    dummy_responses = DummyStreamingResponses([*STREAM_EVENTS[:-1], completed])
+    monkeypatch.setattr(
+        "gramregex.llm.openai_client.OpenAI",
+        lambda **_: SimpleNamespace(responses=dummy_responses),
+    )
+    client = OpenAIResponsesClient(settings)
+    recorded: list[tuple[int, int | None]] = []
+    monkeypatch.setattr(client._scheduler, "record_usage", lambda *usage: recorded.append(usage))  # noqa: SLF001
+
+    assert list(client.stream("hello", grammar="g", grammar_syntax="lark")) == ["he", "llo"]
+    assert recorded == [(estimate_tokens("hello", "g", ""), 500)]
+
+
+def test_openai_client_stream_raises_on_failure_event(monkeypatch: pytest.MonkeyPatch) -> None:
+    """失敗イベントを受け取ると ValueError を送出しストリームを閉じる."""
+    settings = Settings(openai_api_key="dummy")
+    failure = SimpleNamespace(type="response.failed", response=SimpleNamespace(error=SimpleNamespace(message="bad")))
+    dummy_responses = DummyStreamingResponses([SimpleNamespace(type="response.output_text.delta", delta="x"), failure])
+
+    monkeypatch.setattr(
+        "gramregex.llm.openai_client.OpenAI",
+        lambda **_: SimpleNamespace(responses=dummy_responses),
+    )
+
+    client = OpenAIResponsesClient(settings)
+
+    with pytest.raises(ValueError, match="The response stream failed: bad"):
+        list(client.stream("hello", grammar="g", grammar_syntax="lark"))
+    assert dummy_responses.stream.closed
+
+
+@pytest.mark.asyncio
+async def test_async_openai_client_streams_text_deltas(monkeypatch: pytest.MonkeyPatch) -> None:
+    """非同期クライアントもテキスト差分を逐次返す."""
+    settings = Settings(openai_api_key="dummy")
+    stream = DummyStream(STREAM_EVENTS)
+
+    async def aclose() -> None:
+        stream.closed = True
+
+    class AsyncStreamingResponses:
+        async def create(self, **kwargs: object) -> object:
+            assert kwargs["stream"] is True
+            return AsyncStreamWrapper(stream, aclose)
+
+    monkeypatch.setattr(
+        "gramregex.llm.openai_client.AsyncOpenAI",
+        lambda **_: SimpleNamespace(responses=AsyncStreamingResponses()),
+    )
+
+    client = AsyncOpenAIResponsesClient(settings)
+    chunks = [chunk async for chunk in client.stream("hello", grammar="g", grammar_syntax="lark")]
+
+    assert chunks == ["he", "llo"]
+    assert stream.closed
+
+
+class AsyncStreamWrapper:
+    """Async iterable stream with an awaitable close."""
+
+    def __init__(self, stream: DummyStream, aclose: Callable[[], Awaitable[None]]) -> None:
+        """Wrap a dummy stream."""
+        self._stream = stream
+        self._aclose = aclose
+
+    def __aiter__(self) -> AsyncIterator[object]:
+        """Delegate iteration to the wrapped stream."""
+        return self._stream.__aiter__()
+
+    async def close(self) -> None:
+        """Close the wrapped stream."""
+        await self._aclose()
+
+
+def test_prepared_template_is_used_for_matching_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    """事前に組み立てたテンプレートは同じオプションのリクエストで共有キャッシュを引かずに使い、別モデルには使わない."""
+    prepared = prepare_template(model="m", grammar="g", grammar_syntax="lark", verbosity=None, reasoning_effort=None)
+    lookups: list[object] = []
+
+    def counting_template(**options: object) -> object:
+        lookups.append(options)
+        return request_template(**options)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(openai_client, "request_template", counting_template)
+    options: dict[str, Any] = {"grammar": "g", "grammar_syntax": "lark", "verbosity": None, "reasoning_effort": None}
+    with using_template(prepared):
+        request = _build_response_kwargs("m", "p", **options)
+        other_model = _build_response_kwargs("other", "p", **options)
+
+    assert request == {**prepared.template, "input": "p"}
+    assert other_model["model"] == "other"
+    assert len(lookups) == 1
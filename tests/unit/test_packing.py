@@ -0,0 +1,58 @@
+import re
+
+import pytest
+
+from gramregex.packing import PACK_ITEM_RULE, PackingError, pack_grammar, pack_prompts, split_output
+
+
+def test_pack_lark_grammar_renames_start_only_outside_literals() -> None:
+    """Lark grammar の start 規則だけを改名し、文字列・正規表現・コメント中の start はそのままにする."""
+    lark = pytest.importorskip("lark")
+    grammar = 'start: LABEL  // start here\nLABEL: "start" | "stop" | /start+/\n'
+
+    packed = pack_grammar(grammar, "lark", 3)
+
+    assert f'{PACK_ITEM_RULE}: LABEL  // start here\nLABEL: "start" | "stop" | /start+/' in packed
+    parser = lark.Lark(packed)
+    parser.parse("<<<1>>>\nstart\n<<<2>>>\nstop\n<<<3>>>\nstartt")
+    with pytest.raises(lark.exceptions.LarkError):
+        parser.parse("<<<1>>>\nstart\n<<<2>>>\nstop")
+
+
+def test_pack_lark_grammar_requires_start_rule() -> None:
+    """Start 規則のない lark grammar はまとめられない."""
+    with pytest.raises(ValueError, match="'start' rule"):
+        pack_grammar("root ::= 'a'", "lark", 2)
+
+
+def test_pack_regex_grammar() -> None:
+    """Regex grammar は各項目で全体を繰り返す."""
+    packed = pack_grammar("yes|no", "regex", 2)
+
+    assert re.fullmatch(packed, "<<<1>>>\nyes\n<<<2>>>\nno")
+    assert not re.fullmatch(packed, "<<<1>>>\nyes\n<<<2>>>\nmaybe")
+
+
+def test_pack_regex_grammar_rejects_backreferences_and_anchors() -> None:
+    """後方参照・アンカー・名前付きグループを含む regex grammar はまとめられない."""
+    for grammar in [r"(a|b)\1", "^yes", "yes$", r"\Ayes", "(?P<x>a)"]:
+        with pytest.raises(ValueError, match="Cannot pack"):
+            pack_grammar(grammar, "regex", 2)
+    assert pack_grammar(r"[$^]\\1(?<=a)", "regex", 1) == r"<<<1>>>\n(?:[$^]\\1(?<=a))"
+
+
+def test_split_output_round_trips_and_rejects_missing_markers() -> None:
+    """まとめた出力を項目ごとに分け、印が欠けていれば PackingError になる."""
+    assert split_output("<<<1>>>\na\nb\n<<<2>>>\n\n<<<3>>>\nc", 3) == ["a\nb", "", "c"]
+    with pytest.raises(PackingError, match="item 3"):
+        split_output("<<<1>>>\na\n<<<2>>>\nb", 3)
+    with pytest.raises(PackingError, match="first marker"):
+        split_output("a", 1)
+
+
+def test_pack_prompts_numbers_each_prompt() -> None:
+    """まとめたプロンプトは件数の指示と番号付きの各入力からなる."""
+    prompt = pack_prompts(["first", "second\nline"])
+
+    assert prompt.startswith("Respond to each of the 2 numbered inputs")
+    assert prompt.endswith("<<<1>>>\nfirst\n\n<<<2>>>\nsecond\nline")
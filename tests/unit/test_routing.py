@@ -0,0 +1,156 @@
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+from typer.testing import CliRunner
+
+from gramregex import api, cli, instrumentation
+from gramregex import settings as settings_module
+from gramregex.instrumentation import CallEvent
+from gramregex.llm.base import AsyncLLMClient, LLMClient
+from gramregex.routing import (
+    AsyncRoutingLLMClient,
+    OutputCheckError,
+    RouteTier,
+    RoutingLLMClient,
+    parse_route,
+)
+from gramregex.settings import Settings
+from gramregex.validator import GrammarValidationError, compile_validator
+
+
+class TierClient(LLMClient):
+    """Client answering with a fixed output and recording the requested efforts."""
+
+    def __init__(self, output: str) -> None:
+        """Answer every request with ``output``."""
+        self.output = output
+        self.efforts: list[str | None] = []
+
+    def generate(self, _prompt: str, **options: object) -> str:  # type: ignore[override]
+        """Record the effort and return the canned output."""
+        self.efforts.append(options.get("reasoning_effort"))  # type: ignore[arg-type]
+        return self.output
+
+    def stream(self, _prompt: str, **options: object) -> Iterator[str]:  # type: ignore[override]
+        """Stream the canned output one character at a time."""
+        self.efforts.append(options.get("reasoning_effort"))  # type: ignore[arg-type]
+        yield from self.output
+
+
+class AsyncTierClient(AsyncLLMClient):
+    """Async client answering with a fixed output."""
+
+    def __init__(self, output: str) -> None:
+        """Answer every request with ``output``."""
+        self.output = output
+        self.calls = 0
+
+    async def generate(self, _prompt: str, **_: object) -> str:  # type: ignore[override]
+        """Return the canned output."""
+        self.calls += 1
+        return self.output
+
+    async def stream(self, _prompt: str, **_: object) -> AsyncIterator[str]:  # type: ignore[override]
+        """Stream the canned output."""
+        yield self.output
+
+
+@pytest.fixture(autouse=True)
+def clear_settings_cache() -> Iterator[None]:
+    """Ensure settings cache does not leak between tests."""
+    settings_module.get_settings.cache_clear()
+    yield
+    settings_module.get_settings.cache_clear()
+
+
+def test_parse_route() -> None:
+    """ルートは model[:effort] のカンマ区切りで、モデル省略時は設定のモデルを使う."""
+    assert parse_route("small:minimal, large:high,:medium") == (
+        RouteTier(model="small", reasoning_effort="minimal"),
+        RouteTier(model="large", reasoning_effort="high"),
+        RouteTier(model=None, reasoning_effort="medium"),
+    )
+    assert parse_route("large") == (RouteTier(model="large"),)
+    with pytest.raises(ValueError, match="Invalid reasoning effort"):
+        parse_route("small:extreme")
+    with pytest.raises(ValueError, match="at least one tier"):
+        parse_route(" , ")
+
+
+def test_router_escalates_only_on_rejected_output() -> None:
+    """検証を通った段の出力を返し、失敗したときだけ次の段に進む."""
+    cheap, strong = TierClient("abc"), TierClient("123")
+    client = RoutingLLMClient(
+        [(RouteTier(reasoning_effort="minimal"), cheap), (RouteTier(reasoning_effort="high"), strong)],
+        compiler=compile_validator,
+    )
+
+    assert client.generate("p", grammar="[0-9]+", grammar_syntax="regex", reasoning_effort="medium") == "123"
+    assert client.generate("p", grammar="[a-z]+", grammar_syntax="regex") == "abc"
+    assert cheap.efforts == ["minimal", "minimal"]
+    assert strong.efforts == ["high"]
+
+
+def test_router_raises_last_tier_rejection() -> None:
+    """全段で拒否された場合は最後の段のエラーを送出する."""
+    client = RoutingLLMClient(
+        [(RouteTier(), TierClient("a")), (RouteTier(), TierClient("b"))],
+        check=lambda text: text == "c",
+    )
+
+    with pytest.raises(OutputCheckError, match="'b'"):
+        client.generate("p", grammar="g", grammar_syntax="lark")
+
+
+def test_router_streams_validated_output_from_strongest_tier() -> None:
+    """ストリームは切り替えられないため最上位の段から検証付きで返す."""
+    cheap, strong = TierClient("12"), TierClient("1x")
+    client = RoutingLLMClient([(RouteTier(), cheap), (RouteTier(), strong)], compiler=compile_validator)
+
+    with pytest.raises(GrammarValidationError):
+        list(client.stream("p", grammar="[0-9]+", grammar_syntax="regex"))
+    assert cheap.efforts == []
+
+
+def test_api_routes_through_tier_models(monkeypatch: pytest.MonkeyPatch) -> None:
+    """設定の route に従ってモデルごとのクライアントを使い、切り替え回数を計測する."""
+    clients = {"small": TierClient("draft"), "large": TierClient("FINAL")}
+    monkeypatch.setattr(api, "get_llm_client", lambda settings: clients[settings.openai_model])
+    settings = Settings(openai_api_key="dummy", route="small:minimal,large:high")
+    events: list[CallEvent] = []
+
+    class Collecting:
+        def emit(self, event: CallEvent) -> None:
+            events.append(event)
+
+    sink = Collecting()
+    instrumentation.add_sink(sink)
+    try:
+        output = api.generate("p", grammar="[A-Za-z]+", grammar_syntax="regex", settings=settings, check=str.isupper)
+    finally:
+        instrumentation.remove_sink(sink)
+
+    assert output == "FINAL"
+    assert clients["small"].efforts == ["minimal"]
+    assert events[0].escalations == 1
+
+
+@pytest.mark.asyncio
+async def test_async_router_escalates() -> None:
+    """非同期クライアントでも拒否された出力を次の段で再生成する."""
+    cheap, strong = AsyncTierClient("no"), AsyncTierClient("yes")
+    client = AsyncRoutingLLMClient([(RouteTier(), cheap), (RouteTier(), strong)], check=lambda text: text == "yes")
+
+    result = await client.generate_result("p", grammar="g", grammar_syntax="lark")
+
+    assert result.text == "yes"
+    assert (cheap.calls, strong.calls) == (1, 1)
+
+
+def test_cli_rejects_invalid_route(monkeypatch: pytest.MonkeyPatch) -> None:
+    """不正な --route は引数エラーになる."""
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+
+    result = CliRunner().invoke(cli.app, ["generate", "--no-daemon", "--route", "m:turbo", "--grammar", "g", "p"])
+
+    assert result.exit_code == 2
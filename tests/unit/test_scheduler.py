@@ -0,0 +1,192 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from gramregex.llm.scheduler import (
+    RateBudget,
+    RequestScheduler,
+    RetryPolicy,
+    TokenBucket,
+    is_retryable,
+    retry_after,
+    shared_budget,
+)
+from gramregex.settings import Settings
+
+
+class FakeClock:
+    """Clock advanced by the fake sleep."""
+
+    def __init__(self) -> None:
+        """Start at time zero and record sleeps."""
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        """Return the current fake time."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Advance time instead of blocking."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _status_error(status: int, headers: dict[str, str] | None = None, code: str | None = None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://example.invalid/v1/responses")
+    response = httpx.Response(status, headers=headers, request=request)
+    return openai.APIStatusError("error", response=response, body={"code": code} if code else None)
+
+
+def test_retryable_errors_are_classified() -> None:
+    """429/5xx/接続エラーは再試行し、4xx とクォータ不足は再試行しない."""
+    assert is_retryable(_status_error(429))
+    assert is_retryable(_status_error(503))
+    assert is_retryable(openai.APIConnectionError(request=httpx.Request("POST", "https://example.invalid")))
+    assert not is_retryable(_status_error(400))
+    assert not is_retryable(_status_error(429, code="insufficient_quota"))
+    assert not is_retryable(ValueError("bad"))
+
+
+def test_retry_after_headers_are_parsed() -> None:
+    """retry-after-ms・秒数・HTTP 日付形式の Retry-After を解釈する."""
+    assert retry_after(_status_error(429, {"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(_status_error(429, {"retry-after": "3"})) == 3.0
+    assert retry_after(_status_error(429, {"retry-after": "Thu, 01 Jan 1970 00:00:10 GMT"}), now=4) == 6.0
+    assert retry_after(_status_error(429)) is None
+
+
+def test_scheduler_retries_and_honors_retry_after() -> None:
+    """Retry-After を待ってから再試行し、成功すれば結果を返す."""
+    clock = FakeClock()
+    scheduler = RequestScheduler(RetryPolicy(max_attempts=3), clock=clock, sleep=clock.sleep)
+    outcomes: list[Exception | str] = [_status_error(429, {"retry-after": "2"}), _status_error(500), "ok"]
+
+    def call() -> str:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.run(call) == "ok"
+    assert clock.sleeps[0] == 2.0
+    assert len(clock.sleeps) == 2
+    assert clock.sleeps[1] <= 1.0
+
+
+def test_scheduler_gives_up_after_max_attempts() -> None:
+    """試行回数の上限に達したら最後の例外を送出する."""
+    clock = FakeClock()
+    scheduler = RequestScheduler(RetryPolicy(max_attempts=2), clock=clock, sleep=clock.sleep)
+    calls = 0
+
+    def call() -> str:
+        nonlocal calls
+        calls += 1
+        raise _status_error(503)
+
+    with pytest.raises(openai.APIStatusError):
+        scheduler.run(call)
+    assert calls == 2
+
+
+def test_token_bucket_spaces_requests_at_budget() -> None:
+    """予算を使い切ると補充されるまでの待ち時間を返す."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock)
+
+    assert bucket.reserve(60) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    clock.now = 2
+    assert bucket.reserve(1) == 0
+
+
+def test_scheduler_enforces_token_budget_and_usage() -> None:
+    """TPM 予算を超える呼び出しは待たされ、実使用量で予算を補正する."""
+    clock = FakeClock()
+    scheduler = RequestScheduler(tokens_per_minute=600, clock=clock, sleep=clock.sleep)
+
+    scheduler.run(lambda: None, tokens=600)
+    scheduler.record_usage(600, 300)
+    scheduler.run(lambda: None, tokens=300)
+    assert clock.sleeps == []
+
+    scheduler.run(lambda: None, tokens=100)
+    assert clock.sleeps == [pytest.approx(10.0)]
+
+
+def test_retries_reserve_tokens_once_and_failures_refund_them() -> None:
+    """再試行ではトークンを再度予約せず、最終的に失敗した呼び出しの予約は払い戻す."""
+    clock = FakeClock()
+    budget = RateBudget(tokens_per_minute=600, clock=clock)
+    scheduler = RequestScheduler(RetryPolicy(max_attempts=3, base_delay=0), budget=budget, sleep=clock.sleep)
+    outcomes: list[Exception | str] = [_status_error(500), _status_error(500), "ok"]
+
+    def call() -> str:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.run(call, tokens=600) == "ok"
+    assert budget.reserve(0) == 0
+
+    def fail() -> str:
+        raise _status_error(400)
+
+    clock.now += 60
+    with pytest.raises(openai.APIStatusError):
+        scheduler.run(fail, tokens=600)
+    assert budget.reserve(600) == 0
+
+
+def test_schedulers_of_one_account_share_a_budget() -> None:
+    """同じ API キーとベース URL のクライアントは RPM/TPM の予算と一時停止を共有する."""
+    settings = Settings(openai_api_key="shared-key", rate_limit_rpm=60)
+    other = Settings(openai_api_key="shared-key", openai_base_url="https://other.example/v1", rate_limit_rpm=60)
+
+    assert shared_budget(settings) is shared_budget(settings.model_copy())
+    assert shared_budget(settings) is not shared_budget(other)
+
+
+@pytest.mark.asyncio
+async def test_async_scheduler_retries() -> None:
+    """非同期でも再試行可能なエラーを再試行する."""
+    scheduler = RequestScheduler(RetryPolicy(max_attempts=2, base_delay=0))
+    outcomes: list[Exception | str] = [_status_error(502), "ok"]
+
+    async def call() -> str:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert await scheduler.arun(call) == "ok"
+
+
+def test_openai_client_disables_sdk_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    """SDK の再試行は無効化し、スケジューラ経由で再試行する."""
+    from gramregex.llm.openai_client import OpenAIResponsesClient
+
+    captured: dict[str, object] = {}
+    attempts: list[int] = []
+
+    def create(**_: object) -> object:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise _status_error(429, {"retry-after-ms": "0"})
+        return SimpleNamespace(output_text="ok")
+
+    def fake_openai_client(**kwargs: object) -> SimpleNamespace:
+        captured.update(kwargs)
+        return SimpleNamespace(responses=SimpleNamespace(create=create))
+
+    monkeypatch.setattr("gramregex.llm.openai_client.OpenAI", fake_openai_client)
+
+    client = OpenAIResponsesClient(Settings(openai_api_key="dummy"))
+
+    assert client.generate("p", grammar="g", grammar_syntax="lark") == "ok"
+    assert captured["max_retries"] == 0
+    assert len(attempts) == 2
@@ -17,3 +17,27 @@ def test_settings_loads_env(monkeypatch: pytest.MonkeyPatch) -> None:
     assert settings.provider == "openai"
     assert settings.openai_model == "example-model"
     assert settings.grammar_config_path == Path("./config.yml")
+
+
+def test_settings_connection_pool_options(monkeypatch: pytest.MonkeyPatch) -> None:
+    """接続プールとタイムアウトの設定を環境変数から読み込み、GRAMREGEX_ 付きの名前を優先する."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_TIMEOUT", "")
+    monkeypatch.setenv("OPENAI_MAX_CONNECTIONS", "20")
+
+    settings = Settings()
+
+    assert settings.openai_timeout is None
+    assert settings.openai_max_connections == 20
+
+    monkeypatch.setenv("OPENAI_TIMEOUT", "7.5")
+
+    assert Settings().openai_timeout == 7.5
+
+    monkeypatch.setenv("GRAMREGEX_OPENAI_TIMEOUT", "3")
+    monkeypatch.setenv("GRAMREGEX_OPENAI_KEEPALIVE_EXPIRY", "1.5")
+
+    settings = Settings()
+
+    assert settings.openai_timeout == 3
+    assert settings.openai_keepalive_expiry == 1.5
@@ -0,0 +1,75 @@
+import csv
+import io
+from itertools import pairwise
+
+import pytest
+
+from gramregex.sharding import parse_shard, shard_range, split_shard
+
+
+def _shard_lines(data: bytes, count: int, *, start: int = 0) -> list[list[bytes]]:
+    stream = io.BytesIO(data)
+    shards = []
+    for index in range(count):
+        begin, end = shard_range(stream, index, count, start=start)
+        shards.append(data[begin:end].splitlines(keepends=True))
+    return shards
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 7, 20])
+def test_shards_cover_every_line_once_in_order(count: int) -> None:
+    """各シャードは行の先頭で区切られ、順に連結すると全行を 1 回ずつ含む."""
+    lines = [f'{{"prompt": "{"x" * (index % 5)}"}}\n'.encode() for index in range(11)]
+    data = b"".join(lines)
+
+    shards = _shard_lines(data, count)
+
+    assert [line for shard in shards for line in shard] == lines
+
+
+def test_shard_range_skips_header_and_keeps_position() -> None:
+    """ヘッダ行はどのシャードにも含めず、ストリームの位置は変えない."""
+    data = b"text\na\nb\nc\nd\n"
+    stream = io.BytesIO(data)
+    stream.seek(5)
+
+    assert shard_range(stream, 0, 2, start=5) == (5, 9)
+    assert shard_range(stream, 1, 2, start=5) == (9, len(data))
+    assert stream.tell() == 5
+
+
+@pytest.mark.parametrize("count", [2, 3, 5, 8])
+def test_csv_shards_keep_quoted_newlines_together(count: int) -> None:
+    """CSV ではクォート内の改行でシャードを区切らず、各レコードがちょうど 1 つのシャードに入る."""
+    rows = [[str(index), 'a\n"b"\nc' if index % 2 else "plain"] for index in range(12)]
+    body = io.StringIO(newline="")
+    csv.writer(body, lineterminator="\n").writerows(rows)
+    header = b"id,text\n"
+    data = header + body.getvalue().encode()
+    stream = io.BytesIO(data)
+
+    ranges = [shard_range(stream, index, count, start=len(header), quote=b'"') for index in range(count)]
+
+    shards = [list(csv.reader(io.StringIO(data[begin:end].decode(), newline=""))) for begin, end in ranges]
+    assert [row for shard in shards for row in shard] == rows
+
+
+def test_split_shard_subdivides_exactly() -> None:
+    """シャードをさらに分割すると、元のシャードと同じ範囲を順に覆う."""
+    data = b"".join(f"{index}\n".encode() for index in range(100))
+    stream = io.BytesIO(data)
+
+    parts = [shard_range(stream, *part) for part in split_shard(1, 3, 4)]
+
+    assert parts[0][0] == shard_range(stream, 1, 3)[0]
+    assert parts[-1][1] == shard_range(stream, 1, 3)[1]
+    assert all(left[1] == right[0] for left, right in pairwise(parts))
+
+
+def test_parse_shard() -> None:
+    """シャード指定は 1 始まりの i/k で、範囲外や不正な形式は ValueError になる."""
+    assert parse_shard("1/4") == (0, 4)
+    assert parse_shard("4/4") == (3, 4)
+    for spec in ["0/4", "5/4", "a/b", "3"]:
+        with pytest.raises(ValueError, match="Invalid shard"):
+            parse_shard(spec)
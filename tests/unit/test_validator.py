@@ -0,0 +1,134 @@
+from collections.abc import Iterator
+
+import pytest
+from typer.testing import CliRunner
+
+from gramregex import api, cli
+from gramregex import settings as settings_module
+from gramregex.validator import (
+    GrammarValidationError,
+    RegexValidator,
+    ValidatingLLMClient,
+    compile_validator,
+    validate_stream,
+)
+
+LARK_GRAMMAR = """
+start: "yes" | "no" | NUMBER
+NUMBER: /[0-9]+/
+"""
+
+
+class ChunkedClient:
+    """Stub client returning a fixed output, streamed in the given chunks."""
+
+    def __init__(self, *chunks: str) -> None:
+        """Store the chunks to emit."""
+        self.chunks = chunks
+        self.emitted = 0
+        self.closed = False
+
+    def generate(self, _prompt: str, **_: object) -> str:
+        """Return the whole output."""
+        return "".join(self.chunks)
+
+    def stream(self, _prompt: str, **_: object) -> Iterator[str]:
+        """Yield chunks, recording how many were sent and whether the stream was closed."""
+        try:
+            for chunk in self.chunks:
+                self.emitted += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def test_regex_validator_checks_full_match_and_prefix() -> None:
+    """正規表現は全体一致と接頭辞の成立可否を判定する."""
+    pytest.importorskip("regex")
+    validator = RegexValidator(r"[a-c]{3}")
+
+    assert validator.is_valid("abc")
+    assert not validator.is_valid("ab")
+    assert validator.is_viable_prefix("ab")
+    assert not validator.is_viable_prefix("ax")
+
+
+def test_invalid_grammars_raise_value_error() -> None:
+    """不正な grammar は ValueError になる."""
+    with pytest.raises(ValueError, match="Invalid regex grammar"):
+        compile_validator("(", "regex")
+
+
+def test_lark_validator_checks_full_parse_and_prefix() -> None:
+    """Lark grammar は構文解析と LALR による接頭辞判定で検証する."""
+    pytest.importorskip("lark")
+    pytest.importorskip("regex")
+    validator = compile_validator(LARK_GRAMMAR, "lark")
+
+    assert validator.is_valid("yes")
+    assert validator.is_valid("42")
+    assert not validator.is_valid("maybe")
+    assert validator.is_viable_prefix("ye")
+    assert validator.is_viable_prefix("4")
+    assert not validator.is_viable_prefix("ma")
+    assert not validator.is_viable_prefix("yes!")
+
+
+def test_validate_stream_stops_at_divergence() -> None:
+    """接頭辞が外れた時点で上流ストリームを閉じて失敗する."""
+    pytest.importorskip("regex")
+    upstream = ChunkedClient("ab", "x", "c", "d")
+    validator = compile_validator(r"abcd", "regex")
+    received: list[str] = []
+
+    with pytest.raises(GrammarValidationError, match="diverged"):
+        received.extend(validate_stream(upstream.stream("p"), validator))
+
+    assert received == ["ab"]
+    assert upstream.emitted == 2
+    assert upstream.closed
+
+
+def test_incremental_prefix_checks_are_throttled() -> None:
+    """接頭辞の検査はテキストが一定の割合で伸びたときだけ行い、呼び出し回数は対数的に抑えられる."""
+
+    class CountingValidator(RegexValidator):
+        checks = 0
+
+        def is_viable_prefix(self, text: str) -> bool:
+            type(self).checks += 1
+            return super().is_viable_prefix(text)
+
+    checker = CountingValidator("a*").incremental()
+    for _ in range(10_000):
+        checker.feed("a")
+
+    assert checker.finish() == "a" * 10_000
+    assert CountingValidator.checks < 50
+
+
+def test_validating_client_rejects_invalid_output() -> None:
+    """ラッパーは grammar に一致しない出力を GrammarValidationError にする."""
+    client = ValidatingLLMClient(ChunkedClient("no"))  # type: ignore[arg-type]
+
+    with pytest.raises(GrammarValidationError):
+        client.generate("p", grammar=r"yes", grammar_syntax="regex")
+    valid = ValidatingLLMClient(ChunkedClient("y", "es"))  # type: ignore[arg-type]
+    assert list(valid.stream("p", grammar=r"yes", grammar_syntax="regex")) == ["y", "es"]
+
+
+def test_cli_validate_flag_fails_on_mismatch(monkeypatch: pytest.MonkeyPatch) -> None:
+    """--validate 指定時に一致しない出力は終了コード 1 になる."""
+    runner = CliRunner()
+    monkeypatch.setenv("OPENAI_API_KEY", "dummy")
+    settings_module.get_settings.cache_clear()
+    monkeypatch.setattr(api, "get_llm_client", lambda _: ChunkedClient("nope"))
+
+    args = ["generate", "--grammar", "yes", "--grammar-syntax", "regex", "input"]
+    unchecked = runner.invoke(cli.app, args)
+    checked = runner.invoke(cli.app, [*args[:-1], "--validate", "input"])
+
+    assert unchecked.exit_code == 0
+    assert checked.exit_code == 1
+    assert "does not match" in checked.output
+    settings_module.get_settings.cache_clear()